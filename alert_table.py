@@ -0,0 +1,204 @@
+"""
+Índice de alertas ya ordenado por score para la tabla paginada del
+dashboard. Las alertas se guardan como posiciones en el dataset y sus
+scores; las páginas, el orden y los filtros de la tabla (sintaxis de
+filter_query de dash_table) se resuelven sobre esos arreglos y solo se
+arman los registros de la página pedida.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_loader import INDICATOR_FLAGS, get_indicator_flags
+
+# Columnas de la tabla: (id, nombre, tipo de dash_table)
+ALERT_TABLE_COLUMNS = [
+    ('customerId', 'Cliente ID', 'text'),
+    ('transactionDateTime', 'Fecha/Hora', 'datetime'),
+    ('transactionAmount', 'Monto', 'numeric'),
+    ('merchantName', 'Comercio', 'text'),
+    ('merchantCountryCode', 'País', 'text'),
+    ('risk_score', 'Score de Riesgo', 'numeric'),
+    ('indicators', 'Indicadores', 'text'),
+]
+ALERT_COLUMN_TYPES = {col: kind for col, _, kind in ALERT_TABLE_COLUMNS}
+
+# Texto de los indicadores de cada combinación de bits (0-15)
+INDICATOR_TEXT = np.array([
+    ', '.join(name for name, flag in INDICATOR_FLAGS if combo & flag) for combo in range(16)
+], dtype=object)
+
+# Operadores de filter_query: palabra o símbolo de la sintaxis -> operador normalizado
+FILTER_OPERATORS = {
+    'ge': '>=', '>=': '>=',
+    'le': '<=', '<=': '<=',
+    'lt': '<', '<': '<',
+    'gt': '>', '>': '>',
+    'ne': '!=', '!=': '!=',
+    'eq': '=', '=': '=',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+# Condición '{columna} operador valor': el operador es solo el token que sigue a la
+# columna (con el prefijo opcional i/s de sensibilidad a mayúsculas de dash_table)
+_FILTER_PART = re.compile(r'^\s*\{(.+?)\}\s*([is]?(?:[<>!]?=|[<>])|[a-z]+)\s*(.*?)\s*$', re.DOTALL)
+
+_QUOTES = ("'", '"', '`')
+
+# Comparaciones de los operadores sobre números y fechas
+_COMPARISONS = {
+    '=': np.equal, '!=': np.not_equal, '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+}
+
+def split_filter_part(filter_part):
+    """(columna, operador, valor) de una condición de filter_query ('{col} op valor')"""
+    match = _FILTER_PART.match(filter_part)
+    if match is None:
+        return None, None, None
+    name, word, value_part = match.groups()
+    operator = FILTER_OPERATORS.get(word)
+    if operator is None and word[:1] in ('i', 's'):
+        operator = FILTER_OPERATORS.get(word[1:])
+    if operator is None or not value_part:
+        return None, None, None
+
+    quote = value_part[:1]
+    if len(value_part) >= 2 and quote in _QUOTES and value_part[-1] == quote:
+        value = value_part[1:-1].replace('\\' + quote, quote)
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    return name, operator, value
+
+def _split_conditions(filter_query):
+    """Partes de un filter_query unidas por ' && ', sin cortar los valores entre comillas"""
+    parts, start, quote, i = [], 0, None, 0
+    while i < len(filter_query):
+        char = filter_query[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in _QUOTES:
+            quote = char
+        elif filter_query.startswith(' && ', i):
+            parts.append(filter_query[start:i])
+            start = i + len(' && ')
+            i = start
+            continue
+        i += 1
+    parts.append(filter_query[start:])
+    return parts
+
+def parse_filter_query(filter_query):
+    """Condiciones de un filter_query con varias partes unidas por ' && '"""
+    if not filter_query:
+        return []
+    conditions = [split_filter_part(part) for part in _split_conditions(filter_query)]
+    return [condition for condition in conditions if condition[0] is not None]
+
+def _text_mask(values, operator, value):
+    """Máscara de una condición sobre textos; en categóricas se evalúa una vez por categoría"""
+    if isinstance(values, pd.Categorical):
+        categories = pd.Series(values.categories.astype(str))
+        matches = _text_mask(categories.to_numpy(dtype=object), operator, value)
+        codes = values.codes
+        return np.where(codes >= 0, matches[np.maximum(codes, 0)], False)
+
+    text = pd.Series(values, dtype=object).astype(str)
+    value = str(value) if not isinstance(value, float) or not value.is_integer() else str(int(value))
+    if operator == 'contains':
+        return text.str.contains(value, case=False, regex=False).to_numpy()
+    if operator == 'datestartswith':
+        return text.str.startswith(value).to_numpy()
+    compare = {'=': text.eq, '!=': text.ne, '<': text.lt, '<=': text.le, '>': text.gt, '>=': text.ge}[operator]
+    return compare(value).to_numpy()
+
+def _sort_key(values, descending):
+    """Clave numérica de orden de una columna (textos por orden alfabético)"""
+    if isinstance(values, pd.Categorical):
+        ranks = np.argsort(np.argsort(values.categories.astype(str).to_numpy(), kind='stable'))
+        key = np.where(values.codes >= 0, ranks[np.maximum(values.codes, 0)], -1).astype(np.float64)
+    elif np.issubdtype(values.dtype, np.datetime64):
+        key = values.view('i8').astype(np.float64)
+    elif np.issubdtype(values.dtype, np.number) or values.dtype == bool:
+        key = values.astype(np.float64)
+    else:
+        key = pd.factorize(pd.Series(values, dtype=object).astype(str), sort=True)[0].astype(np.float64)
+    return -key if descending else key
+
+class RankedAlerts:
+    """
+    Alertas de un estado de filtros: posiciones en `df` y scores, ya
+    ordenadas por score de mayor a menor.
+    """
+
+    def __init__(self, df, positions, scores):
+        self.df = df
+        self.positions = positions
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.positions)
+
+    def column(self, col, order=None):
+        """Valores de `col` para las alertas (o para `order`, índices sobre las alertas)"""
+        positions = self.positions if order is None else self.positions[order]
+        if col == 'risk_score':
+            return self.scores if order is None else self.scores[order]
+        if col == 'indicators':
+            return INDICATOR_TEXT[get_indicator_flags(self.df)[positions] & 15]
+        series = self.df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return pd.Categorical.from_codes(series.cat.codes.to_numpy()[positions], dtype=series.dtype)
+        return series.to_numpy()[positions]
+
+    def view(self, sort_by=None, filter_query=None):
+        """Índices sobre las alertas que cumplen filter_query, en el orden de sort_by (o por score)"""
+        order = np.arange(len(self))
+        for col, operator, value in parse_filter_query(filter_query):
+            if col not in ALERT_COLUMN_TYPES:
+                continue
+            values = self.column(col, order)
+            # Las condiciones que no aplican al tipo de la columna se ignoran, como en dash_table
+            try:
+                if isinstance(values, pd.Categorical) or values.dtype == object or operator in ('contains', 'datestartswith'):
+                    mask = _text_mask(values, operator, value)
+                elif np.issubdtype(values.dtype, np.datetime64):
+                    mask = _COMPARISONS[operator](values, np.datetime64(pd.Timestamp(value)))
+                else:
+                    mask = _COMPARISONS[operator](values, float(value))
+            except ValueError:
+                continue
+            order = order[mask]
+
+        if sort_by:
+            # lexsort es estable: los empates conservan el orden por score
+            keys = [_sort_key(self.column(spec['column_id'], order), spec['direction'] == 'desc')
+                    for spec in reversed(sort_by)]
+            order = order[np.lexsort(keys)]
+        return order
+
+    def page(self, order, page_current, page_size):
+        """Registros de la página `page_current` (base 0) de `order` para la tabla"""
+        rows = order[page_current * page_size:(page_current + 1) * page_size]
+        records = pd.DataFrame({col: self.column(col, rows) for col, _, _ in ALERT_TABLE_COLUMNS})
+        records['transactionDateTime'] = records['transactionDateTime'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        # Valores nulos como None para que la tabla los muestre vacíos
+        records = records.astype(object).where(records.notna(), None)
+        return records.to_dict('records')
+
+    def frame(self, high_risk_threshold=None):
+        """Alertas como DataFrame con risk_score (solo las de alto riesgo si se da el umbral)"""
+        positions, scores = self.positions, self.scores
+        if high_risk_threshold is not None:
+            keep = scores > high_risk_threshold
+            positions, scores = positions[keep], scores[keep]
+        alerts = self.df.iloc[positions].copy()
+        alerts['risk_score'] = scores
+        return alerts
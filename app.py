@@ -4,17 +4,36 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import dash
-from dash import dcc, html, Input, Output, State
+from dash import dcc, html, dash_table, Input, Output, State
+from flask import request, jsonify
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from datetime import datetime, timedelta
 import json
 import re
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Importamos las funciones desde nuestro módulo data_loader
 from data_loader import (
     load_data_from_mongodb,
-    calculate_identity_theft_kpis,
-    prepare_visualization_data
+    get_mongo_collection,
+    calculate_kpis_by,
+    breakdown_columns,
+    BREAKDOWN_DIMENSIONS
+)
+from data_store import DataStore, DataRefresher
+from file_source import load_data_from_files
+from result_cache import ResultCache, normalize_filters
+from trend_sampling import bucket_fraud_trend, downsample_lines
+from risk_rules import RiskScorer
+from alert_table import RankedAlerts, ALERT_TABLE_COLUMNS
+import mongo_aggregations
+from config import (
+    REFRESH_ENABLED, KPI_BACKEND, MONGO_ALERTS_LIMIT, DATA_SOURCE, LIVE_KPI_INTERVAL_MS,
+    SAMPLE_MODE_ENABLED, SAMPLE_MODE_MIN_ROWS, ALERT_PAGE_SIZE
 )
 
 # Importamos el email sender (manejamos el import con try/except)
@@ -25,8 +44,62 @@ except ImportError:
     EmailAlertSender = None
     send_dashboard_alerts = None
 
-# Cargamos los datos al iniciar la aplicación
-df = load_data_from_mongodb()
+logger = logging.getLogger(__name__)
+
+_startup_time = time.perf_counter()
+
+# Los datos se cargan en un hilo en segundo plano para que el servidor pueda
+# responder (con un estado de carga) mientras MongoDB responde
+data_store = DataStore()
+# Resultados por estado de filtros, compartidos por todos los callbacks
+result_cache = ResultCache()
+# Cálculos exactos en curso de las selecciones mostradas con la muestra: estado
+# de filtros -> future con los resultados sobre el dataset del momento en que se lanzó
+refine_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refine')
+pending_refinements = {}
+# Reglas del score de riesgo (se recargan si cambia el archivo de reglas)
+risk_scorer = RiskScorer()
+mongo_collection = get_mongo_collection() if REFRESH_ENABLED or KPI_BACKEND == 'mongo' else None
+refresher = DataRefresher(data_store, mongo_collection) if REFRESH_ENABLED else None
+
+# Valores de los filtros calculados en MongoDB (solo con el motor 'mongo')
+mongo_filter_options = {}
+
+def load_dataset():
+    """Carga el dataset inicial y arranca el refresco incremental"""
+    try:
+        phase_start = time.perf_counter()
+
+        # Con el motor 'mongo' no se carga el dataset: solo los valores de los filtros
+        if KPI_BACKEND == 'mongo':
+            mongo_filter_options.update(mongo_aggregations.filter_options(mongo_collection))
+            data_store.mark_ready()
+            logger.info(f"Arranque: filtros calculados en MongoDB en {time.perf_counter() - phase_start:.2f} s")
+            return
+
+        # La marca de agua del refresco se toma antes de la carga, que se acota
+        # a ella, para no perder ni duplicar documentos insertados durante ella
+        if refresher:
+            refresher.prime()
+            logger.info(f"Arranque: marca de agua del refresco en {time.perf_counter() - phase_start:.2f} s")
+            phase_start = time.perf_counter()
+
+        if DATA_SOURCE == 'file':
+            data_store.set(load_data_from_files())
+        else:
+            data_store.set(load_data_from_mongodb(query=refresher.initial_query() if refresher else None))
+        logger.info(f"Arranque: carga de datos ({len(data_store.df):,} filas) en {time.perf_counter() - phase_start:.2f} s")
+
+        # Refresco incremental en segundo plano con las transacciones nuevas
+        if refresher:
+            refresher.start()
+
+        logger.info(f"Arranque: datos listos {time.perf_counter() - _startup_time:.2f} s después de iniciar")
+    except Exception as e:
+        logger.exception("Error al cargar los datos iniciales")
+        data_store.set_error(e)
+
+threading.Thread(target=load_dataset, name="data-loader", daemon=True).start()
 
 # Crear la aplicación Dash con tema y hojas de estilo personalizadas
 app = dash.Dash(
@@ -45,6 +118,40 @@ app = dash.Dash(
 
 server = app.server
 
+# Endpoint de disponibilidad: solo responde 200 cuando el dataset ya está cargado
+@server.route('/ready')
+def ready():
+    if data_store.is_ready():
+        rows = len(data_store.df) if data_store.df is not None else None
+        return {'status': 'ready', 'rows': rows, 'version': data_store.version,
+                'cache': result_cache.stats()}, 200
+    if data_store.load_error:
+        return {'status': 'error', 'error': data_store.load_error}, 503
+    return {'status': 'loading'}, 503
+
+# API de desglose: KPIs de cada valor de una dimensión para los filtros dados
+# Ej.: /api/breakdown?dimension=merchantCountryCode&start_date=2016-01-01&end_date=2016-03-31&categories=fuel,food
+@server.route('/api/breakdown')
+def breakdown_api():
+    if KPI_BACKEND == 'mongo':
+        return {'error': "El desglose requiere el dataset en memoria (motor 'pandas')"}, 501
+    if not data_store.is_ready():
+        return {'status': 'loading'}, 503
+    
+    dimension = request.args.get('dimension', 'merchantCountryCode')
+    if dimension not in BREAKDOWN_DIMENSIONS:
+        return {'error': f"Dimensión no soportada: {dimension}",
+                'dimensions': list(BREAKDOWN_DIMENSIONS)}, 400
+    
+    def split(name):
+        value = request.args.get(name)
+        return [v for v in value.split(',') if v] if value else None
+    
+    table = get_kpi_breakdown(dimension, request.args.get('start_date'), request.args.get('end_date'),
+                              split('countries'), split('categories'))
+    table = table.astype({dimension: str})
+    return jsonify(table.to_dict(orient='records'))
+
 # Modal para vista previa del email
 email_preview_modal = dbc.Modal([
     dbc.ModalHeader(dbc.ModalTitle([
@@ -331,7 +438,7 @@ email_config_section = dbc.Row([
                     dbc.Checklist(
                         options=[
                             {"label": " Adjuntar archivo CSV con los datos", "value": "attach_csv"},
-                            {"label": " Enviar solo si hay alertas de alto riesgo (score > 5)", "value": "high_risk_only"}
+                            {"label": " Enviar solo si hay alertas de alto riesgo (score sobre el umbral)", "value": "high_risk_only"}
                         ],
                         value=["attach_csv"],
                         id="email-options",
@@ -374,6 +481,16 @@ app.layout = dbc.Container([
             width=12)
     ]),
 
+    # Estado de carga de los datos (se oculta cuando el dataset está listo)
+    dbc.Row([
+        dbc.Col(html.Div(id='data-loading-status', children=dbc.Alert([
+            dbc.Spinner(size="sm", spinner_class_name="me-2"),
+            "Cargando datos de transacciones..."
+        ], color="info")), width=12)
+    ]),
+    dcc.Interval(id='data-ready-interval', interval=1000),
+    dcc.Store(id='data-ready'),
+
     # Filtros
     dbc.Row([
         dbc.Col([
@@ -390,8 +507,6 @@ app.layout = dbc.Container([
                         ]),
                         dcc.DatePickerRange(
                             id='date-range',
-                            start_date=df['transactionDateTime'].min().date(),
-                            end_date=df['transactionDateTime'].max().date(),
                             start_date_placeholder_text="Fecha inicial",
                             end_date_placeholder_text="Fecha final",
                             className="mb-3 w-100"
@@ -404,8 +519,7 @@ app.layout = dbc.Container([
                         ]),
                         dcc.Dropdown(
                             id='country-filter',
-                            options=[{'label': country, 'value': country} 
-                                    for country in sorted(df['merchantCountryCode'].unique())],
+                            options=[],
                             multi=True,
                             placeholder="Seleccionar países",
                             className="mb-3"
@@ -418,8 +532,7 @@ app.layout = dbc.Container([
                         ]),
                         dcc.Dropdown(
                             id='merchant-category-filter',
-                            options=[{'label': f"Categoría {cat}", 'value': cat} 
-                                    for cat in sorted(df['merchantCategoryCode'].unique())],
+                            options=[],
                             multi=True,
                             placeholder="Seleccionar categorías",
                             className="mb-3"
@@ -439,6 +552,11 @@ app.layout = dbc.Container([
     email_config_section,
     
     # KPIs principales
+    dbc.Row([
+        dbc.Col(html.Div(id='approximate-badge'), width=12)
+    ]),
+    dcc.Interval(id='refine-interval', interval=500, disabled=True),
+    dcc.Store(id='exact-ready'),
     dbc.Row([
         dbc.Col([
             dbc.Card([
@@ -459,7 +577,8 @@ app.layout = dbc.Container([
                     ], className="text-center"),
                     html.H5("Transacciones Fraudulentas", className="card-title text-center"),
                     html.H3(id="fraud-transactions", className="card-text text-center text-danger"),
-                    html.P(id="fraud-rate", className="card-text text-center")
+                    html.P(id="fraud-rate", className="card-text text-center"),
+                    html.Small(id="fraud-customers", className="d-block text-muted text-center")
                 ])
             ], className="kpi-card kpi-fraud mb-4")
         ], width=12, lg=3),
@@ -471,7 +590,8 @@ app.layout = dbc.Container([
                     ], className="text-center"),
                     html.H5("Posible Robo de Identidad", className="card-title text-center"),
                     html.H3(id="identity-theft-count", className="card-text text-center text-warning"),
-                    html.P(id="identity-theft-rate", className="card-text text-center")
+                    html.P(id="identity-theft-rate", className="card-text text-center"),
+                    html.Small(id="identity-theft-customers", className="d-block text-muted text-center")
                 ])
             ], className="kpi-card kpi-identity mb-4")
         ], width=12, lg=3),
@@ -489,6 +609,35 @@ app.layout = dbc.Container([
         ], width=12, lg=3)
     ], className="mb-4"),
     
+    # KPIs en vivo de ventanas deslizantes (última hora, 24 horas y 7 días)
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader([
+                    html.I(className="fas fa-stopwatch me-2"), 
+                    "KPIs en Vivo",
+                    html.Small(id="live-kpis-latest", className="text-muted ms-2")
+                ]),
+                dbc.CardBody(id="live-kpis", children=dbc.Spinner(size="sm"))
+            ], className="chart-card")
+        ], width=12)
+    ], className="mb-4"),
+    dcc.Interval(id='live-kpi-interval', interval=LIVE_KPI_INTERVAL_MS),
+    
+    # Comercios con más fraudes (resumen Space-Saving mantenido durante la ingesta)
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader([
+                    html.I(className="fas fa-store me-2"), 
+                    "Comercios con Más Fraudes",
+                    html.Small("(todo el dataset, conteos aproximados)", className="text-muted ms-2")
+                ]),
+                dbc.CardBody(id="top-fraud-merchants", children=dbc.Spinner(size="sm"))
+            ], className="chart-card")
+        ], width=12)
+    ], className="mb-4"),
+    
     # Gráficos principales
     dbc.Row([
         dbc.Col([
@@ -553,25 +702,77 @@ app.layout = dbc.Container([
                     dcc.Graph(id='amount-distribution-chart')
                 ])
             ], className="chart-card")
-        ], width=12)
+        ], width=12, lg=7),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader([
+                    html.I(className="fas fa-chart-bar me-2"), 
+                    "Percentiles de Monto: Fraudulentas vs Legítimas"
+                ]),
+                dbc.CardBody([
+                    dcc.Graph(id='amount-quantiles-chart')
+                ])
+            ], className="chart-card")
+        ], width=12, lg=5)
     ]),
     
-    # Tabla detallada de alertas recientes
+    # Comparativa de KPIs por dimensión
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardHeader([
+                    html.I(className="fas fa-table me-2"), 
+                    "Comparativa de KPIs por Dimensión"
+                ]),
+                dbc.CardBody([
+                    dcc.Dropdown(
+                        id='breakdown-dimension',
+                        options=[{'label': label, 'value': dim} for dim, label in BREAKDOWN_DIMENSIONS.items()],
+                        value='merchantCountryCode',
+                        clearable=False,
+                        className="mb-3"
+                    ),
+                    html.Div(id='breakdown-table')
+                ])
+            ], className="chart-card")
+        ], width=12)
+    ], className="mb-4"),
+    
+    # Tabla detallada de alertas (paginada, ordenada y filtrada en el servidor)
     dbc.Row([
         dbc.Col([
             dbc.Card([
                 dbc.CardHeader([
                     html.H5([
                         html.I(className="fas fa-bell me-2"), 
-                        "Alertas Recientes de Posible Robo de Identidad"
+                        "Alertas de Posible Robo de Identidad"
                     ]),
                     html.Small([
                         html.I(className="fas fa-info-circle me-1"), 
-                        "Top 10 transacciones con mayor probabilidad de ser robo de identidad"
+                        "Transacciones ordenadas por score de riesgo; use los encabezados para ordenar y la fila de filtros para buscar"
                     ])
                 ]),
                 dbc.CardBody([
-                    html.Div(id='recent-alerts-table', className="alerts-table")
+                    html.Div(id='alerts-table-info', className="text-muted mb-2"),
+                    html.Div(dash_table.DataTable(
+                        id='alerts-table',
+                        columns=[
+                            {'name': name, 'id': col, 'type': kind,
+                             **({'format': dash_table.FormatTemplate.money(2)} if col == 'transactionAmount' else {})}
+                            for col, name, kind in ALERT_TABLE_COLUMNS
+                        ],
+                        page_current=0,
+                        page_size=ALERT_PAGE_SIZE,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='multi',
+                        sort_by=[],
+                        filter_action='custom',
+                        filter_query='',
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'fontFamily': 'Segoe UI, sans-serif', 'fontSize': '0.85rem', 'textAlign': 'left'},
+                        style_header={'fontWeight': 'bold'}
+                    ), className="alerts-table")
                 ])
             ], className="chart-card")
         ], width=12)
@@ -597,52 +798,192 @@ app.layout = dbc.Container([
 
 ], fluid=True)
 
+logger.info(f"Arranque: aplicación y layout construidos en {time.perf_counter() - _startup_time:.2f} s")
+
 # Función auxiliar para obtener datos filtrados
-def get_filtered_data(start_date, end_date, countries, merchant_categories):
-    """Aplica filtros a los datos y retorna el DataFrame filtrado"""
-    filtered_df = df.copy()
-    
-    if start_date and end_date:
-        filtered_df = filtered_df[
-            (pd.to_datetime(filtered_df['transactionDateTime']).dt.date >= pd.to_datetime(start_date).date()) & 
-            (pd.to_datetime(filtered_df['transactionDateTime']).dt.date <= pd.to_datetime(end_date).date())
-        ]
-    
-    if countries and len(countries) > 0:
-        filtered_df = filtered_df[filtered_df['merchantCountryCode'].isin(countries)]
-        
-    if merchant_categories and len(merchant_categories) > 0:
-        filtered_df = filtered_df[filtered_df['merchantCategoryCode'].isin(merchant_categories)]
-    
-    return filtered_df
+def select_filtered_rows(start_date, end_date, countries, merchant_categories, state=None):
+    """Retorna (dataset, filas) que cumplen los filtros, sin copiar datos (de `state` si se da)"""
+    df, index = data_store.snapshot() if state is None else (state.df, state.index)
+
+    # Rango de fechas por búsqueda binaria y país/categoría con los bitmaps del índice;
+    # sin filtros de país ni categoría el resultado es un bloque del dataset sin copia
+    rows = index.select(start_date, end_date, {
+        'merchantCountryCode': countries,
+        'merchantCategoryCode': merchant_categories,
+    })
+    return df, rows
+
+def get_filtered_data(start_date, end_date, countries, merchant_categories, columns=None):
+    """Aplica filtros a los datos y retorna el DataFrame filtrado (solo con `columns` si se indican)"""
+    df, rows = select_filtered_rows(start_date, end_date, countries, merchant_categories)
+    if columns is None:
+        return df.iloc[rows]
+    # Solo se copian las filas de las columnas pedidas
+    return df.iloc[rows, df.columns.get_indexer(columns)]
 
 # Función auxiliar para calcular score de riesgo y generar alertas
-def generate_risk_alerts(filtered_df, high_risk_only=False):
-    """Genera alertas de riesgo basadas en indicadores de robo de identidad"""
-    # Identificar transacciones con alta probabilidad de ser robo de identidad
-    id_theft_indicators = (
-        (filtered_df['cardCVV'] != filtered_df['enteredCVV']) | 
-        (~filtered_df['expirationDateKeyInMatch']) | 
-        (filtered_df['acqCountry'] != filtered_df['merchantCountryCode'])
-    ) & (~filtered_df['cardPresent'])
-    
-    potential_id_theft = filtered_df[id_theft_indicators].copy()
-    
-    if len(potential_id_theft) == 0:
-        return potential_id_theft
-    
-    # Calcula un "score" de riesgo de robo de identidad
-    potential_id_theft['risk_score'] = 0
-    potential_id_theft.loc[potential_id_theft['cardCVV'] != potential_id_theft['enteredCVV'], 'risk_score'] += 3
-    potential_id_theft.loc[~potential_id_theft['expirationDateKeyInMatch'], 'risk_score'] += 2
-    potential_id_theft.loc[potential_id_theft['acqCountry'] != potential_id_theft['merchantCountryCode'], 'risk_score'] += 2
-    potential_id_theft.loc[~potential_id_theft['cardPresent'], 'risk_score'] += 1
-    
-    # Filtrar por alto riesgo si se especifica
-    if high_risk_only:
-        potential_id_theft = potential_id_theft[potential_id_theft['risk_score'] > 5]
+def generate_risk_alerts(filtered_df, high_risk_only=False, limit=None):
+    """
+    Genera alertas de riesgo basadas en indicadores de robo de identidad,
+    ordenadas por el score de las reglas vigentes (ver risk_rules)
+    """
+    return risk_scorer.rank(filtered_df, high_risk_only, limit)
+
+# Función auxiliar que calcula KPIs, datos de gráficos y alertas para los filtros
+def get_dashboard_data(start_date, end_date, countries, merchant_categories, high_risk_only=False,
+                       include_alerts=True):
+    """
+    Retorna (kpis, viz_data, alerts) con el motor configurado en KPI_BACKEND:
+    sobre el dataset en memoria o con agregaciones dentro de MongoDB. Los
+    resultados pueden venir de la caché y no deben modificarse. Con
+    include_alerts=False no se arma el DataFrame de alertas (alerts es None).
+    """
+    if KPI_BACKEND == 'mongo':
+        kpis, viz_data = mongo_aggregations.compute_dashboard(
+            mongo_collection, start_date, end_date, countries, merchant_categories
+        )
+        if not include_alerts:
+            return kpis, viz_data, None
+        return kpis, viz_data, generate_risk_alerts(_load_mongo_alert_candidates(
+            start_date, end_date, countries, merchant_categories
+        ), high_risk_only)
     
-    return potential_id_theft.sort_values('risk_score', ascending=False)
+    # Con el dataset en memoria los resultados se guardan por versión del
+    # dataset y estado de filtros; las alertas se guardan como posiciones
+    # ordenadas por score y el filtro de alto riesgo se aplica sobre ellas
+    state = data_store.state()
+    results = _get_filter_results(start_date, end_date, countries, merchant_categories, state)
+    if not include_alerts:
+        return results['kpis'], results['viz_data'], None
+    alerts = RankedAlerts(state.df, results['alert_positions'], results['alert_scores'])
+    return results['kpis'], results['viz_data'], alerts.frame(risk_scorer.high_risk_threshold if high_risk_only else None)
+
+def get_ranked_alerts(start_date, end_date, countries, merchant_categories, state=None):
+    """Índice de alertas ordenadas por score de un estado de filtros (ver alert_table)"""
+    if KPI_BACKEND == 'mongo':
+        candidates = _load_mongo_alert_candidates(start_date, end_date, countries, merchant_categories)
+        return RankedAlerts(candidates, *risk_scorer.rank_positions(candidates))
+    state = data_store.state() if state is None else state
+    results = _get_filter_results(start_date, end_date, countries, merchant_categories, state)
+    return RankedAlerts(state.df, results['alert_positions'], results['alert_scores'])
+
+def get_alert_view(start_date, end_date, countries, merchant_categories, sort_by, filter_query):
+    """
+    Retorna (alertas, orden) para la tabla paginada: el orden son los
+    índices de las alertas que cumplen filter_query en el orden de sort_by
+    (se guarda en la caché con el motor 'pandas')
+    """
+    if KPI_BACKEND == 'mongo':
+        alerts = get_ranked_alerts(start_date, end_date, countries, merchant_categories)
+        return alerts, alerts.view(sort_by, filter_query)
+    state = data_store.state()
+    alerts = get_ranked_alerts(start_date, end_date, countries, merchant_categories, state)
+    sort_key = tuple((spec['column_id'], spec['direction']) for spec in sort_by or [])
+    key = ('alerts-view', _filter_key(start_date, end_date, countries, merchant_categories, state.version),
+           sort_key, filter_query or '')
+    return alerts, result_cache.get_or_compute(key, lambda: alerts.view(sort_by, filter_query))
+
+def _load_mongo_alert_candidates(start_date, end_date, countries, merchant_categories):
+    """Solo se traen de MongoDB las alertas de mayor score, ya preparadas"""
+    return mongo_aggregations.load_alert_candidates(
+        mongo_collection, start_date, end_date, countries, merchant_categories, MONGO_ALERTS_LIMIT,
+        risk_scorer.rules
+    ).reset_index(drop=True)
+
+def _get_filter_results(start_date, end_date, countries, merchant_categories, state=None):
+    """
+    Resultados de un estado de filtros sobre `state` (el dataset vigente si
+    es None) desde la caché; se calculan si no están
+    """
+    state = data_store.state() if state is None else state
+    key = _filter_key(start_date, end_date, countries, merchant_categories, state.version)
+    return result_cache.get_or_compute(
+        key, lambda: _compute_filter_results(state, start_date, end_date, countries, merchant_categories)
+    )
+
+def get_progressive_dashboard_data(start_date, end_date, countries, merchant_categories):
+    """
+    Como get_dashboard_data, pero si la selección es grande y aún no está en
+    la caché retorna primero una estimación con la muestra estratificada y
+    lanza el cálculo exacto en segundo plano.
+
+    Returns:
+        tuple: (kpis, viz_data, estimation) donde `estimation` es None para
+        resultados exactos o un dict con los intervalos de confianza y el
+        tamaño de la muestra
+    """
+    state = data_store.state()
+    if KPI_BACKEND == 'mongo' or not SAMPLE_MODE_ENABLED or state.sample is None:
+        return get_dashboard_data(start_date, end_date, countries, merchant_categories, include_alerts=False)[:2] + (None,)
+
+    filters = normalize_filters(start_date, end_date, countries, merchant_categories)
+    key = _filter_key(start_date, end_date, countries, merchant_categories, state.version)
+
+    def exact():
+        results = _get_filter_results(start_date, end_date, countries, merchant_categories, state)
+        return results['kpis'], results['viz_data'], None
+
+    future = pending_refinements.get(filters)
+    if future is not None and future.done():
+        # El resultado exacto se lee del future, aunque el dataset se haya
+        # refrescado después de lanzarlo o no quepa en la caché
+        pending_refinements.pop(filters, None)
+        if future.exception() is None:
+            results = future.result()
+            return results['kpis'], results['viz_data'], None
+        logger.error(f"Error en el cálculo exacto en segundo plano: {future.exception()}")
+        return exact()
+
+    if future is None:
+        # El número de filas seleccionadas sale del cubo sin recorrer el dataset
+        selected_rows = state.cube.select(start_date, end_date, countries, merchant_categories)['rows'].sum()
+        if selected_rows < SAMPLE_MODE_MIN_ROWS or result_cache.contains(key):
+            return exact()
+        # El cálculo usa el dataset (y la clave) del momento en que se lanza
+        pending_refinements[filters] = refine_executor.submit(
+            _get_filter_results, start_date, end_date, countries, merchant_categories, state
+        )
+
+    kpis, viz_data, intervals, sample_rows = state.sample.estimate(start_date, end_date, countries, merchant_categories)
+    kpis.update(state.distinct.estimate(start_date, end_date, countries, merchant_categories))
+    viz_data['amount_quantiles'] = state.quantiles.percentiles(start_date, end_date, countries, merchant_categories)
+    estimation = {'intervals': intervals, 'sample_rows': len(sample_rows)}
+    return kpis, viz_data, estimation
+
+def refinements_pending():
+    """Indica si queda algún cálculo exacto en curso (los terminados quedan para leer su resultado)"""
+    return any(not future.done() for future in list(pending_refinements.values()))
+
+def _filter_key(start_date, end_date, countries, merchant_categories, version=None):
+    """Clave de la caché para una versión del dataset (la actual si es None), la de las reglas y un estado de filtros"""
+    version = data_store.version if version is None else version
+    return (version, risk_scorer.version) + normalize_filters(start_date, end_date, countries, merchant_categories)
+
+def get_kpi_breakdown(dimension, start_date, end_date, countries, merchant_categories):
+    """KPIs de cada valor de `dimension` para los filtros (se guarda en la caché compartida)"""
+    key = ('breakdown', dimension, data_store.version) + normalize_filters(start_date, end_date, countries, merchant_categories)
+    return result_cache.get_or_compute(
+        key, lambda: calculate_kpis_by(
+            get_filtered_data(start_date, end_date, countries, merchant_categories, breakdown_columns(dimension)), dimension
+        )
+    )
+
+def _compute_filter_results(state, start_date, end_date, countries, merchant_categories):
+    """Filas seleccionadas, KPIs, datos de gráficos y alertas ordenadas (posiciones y scores) de un estado de filtros en `state`"""
+    # KPIs y gráficos salen del cubo de agregados, y los conteos distintos y
+    # percentiles de monto de los sketches; las filas solo se usan para las alertas
+    kpis, viz_data = state.cube.dashboard(start_date, end_date, countries, merchant_categories)
+    kpis.update(state.distinct.estimate(start_date, end_date, countries, merchant_categories))
+    viz_data['amount_quantiles'] = state.quantiles.percentiles(start_date, end_date, countries, merchant_categories)
+    df, rows = select_filtered_rows(start_date, end_date, countries, merchant_categories, state)
+    alert_positions, alert_scores = risk_scorer.rank_positions(df, rows)
+    return {
+        'rows': rows,
+        'kpis': kpis,
+        'viz_data': viz_data,
+        'alert_positions': alert_positions,
+        'alert_scores': alert_scores,
+    }
 
 # Función para simular envío de email (reemplazar con implementación real)
 def simulate_email_send(recipients, subject, kpis, alerts_count, attach_csv=False, high_risk_only=False):
@@ -681,9 +1022,13 @@ def simulate_email_send(recipients, subject, kpis, alerts_count, attach_csv=Fals
         Output('fraud-by-country-chart', 'figure'),
         Output('merchant-category-chart', 'figure'),
         Output('amount-distribution-chart', 'figure'),
-        Output('recent-alerts-table', 'children')
+        Output('amount-quantiles-chart', 'figure'),
+        Output('fraud-customers', 'children'),
+        Output('identity-theft-customers', 'children'),
+        Output('approximate-badge', 'children'),
+        Output('refine-interval', 'disabled')
     ],
-    [Input('apply-filter', 'n_clicks')],
+    [Input('apply-filter', 'n_clicks'), Input('data-ready', 'data'), Input('exact-ready', 'data')],
     [
         State('date-range', 'start_date'),
         State('date-range', 'end_date'),
@@ -691,13 +1036,34 @@ def simulate_email_send(recipients, subject, kpis, alerts_count, attach_csv=Fals
         State('merchant-category-filter', 'value')
     ]
 )
-def update_dashboard(n_clicks, start_date, end_date, countries, merchant_categories):
-    # Obtener datos filtrados
-    filtered_df = get_filtered_data(start_date, end_date, countries, merchant_categories)
+def update_dashboard(n_clicks, data_ready, exact_ready, start_date, end_date, countries, merchant_categories):
+    # Mientras se cargan los datos se mantiene el estado de carga
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    # Calcular KPIs, datos de gráficos y alertas para los filtros; con
+    # selecciones grandes primero llega una estimación y luego el resultado
+    # exacto (exact-ready vuelve a disparar este callback)
+    kpis, viz_data, estimation = get_progressive_dashboard_data(
+        start_date, end_date, countries, merchant_categories
+    )
     
-    # Calcular KPIs
-    kpis = calculate_identity_theft_kpis(filtered_df)
-    viz_data = prepare_visualization_data(filtered_df)
+    def distinct_text(key, label):
+        """Conteo distinto estimado con HyperLogLog (solo con el dataset en memoria)"""
+        if key not in kpis:
+            return None
+        return f"{label}: ~{kpis[key]:,} (±{data_store.distinct.relative_error:.1%})"
+    
+    if estimation is not None:
+        low, high = estimation['intervals']['fraud_rate']
+        approximate_badge = dbc.Alert([
+            dbc.Badge(f"Aproximado ± {(high - low) / 2:.2f}%", color="warning", className="me-2"),
+            f"Estimación con una muestra estratificada de {estimation['sample_rows']:,} transacciones "
+            f"(intervalo de confianza de la tasa de fraude: {low:.2f}% - {high:.2f}%). Calculando el resultado exacto...",
+            dbc.Spinner(size="sm", spinner_class_name="ms-2")
+        ], color="light", className="py-2")
+    else:
+        approximate_badge = None
     
     # Definir un template de colores personalizado para los gráficos
     custom_template = go.layout.Template()
@@ -707,20 +1073,23 @@ def update_dashboard(n_clicks, start_date, end_date, countries, merchant_categor
     custom_template.layout.margin = dict(l=40, r=40, t=40, b=40)
     
     # Crear gráficos mejorados
-    # 1. Tendencia temporal de fraudes
+    # 1. Tendencia temporal de fraudes: cubetas de día, semana o mes según el rango
+    # y las líneas submuestreadas con LTTB para acotar los puntos enviados
+    fraud_trend, trend_bucket = bucket_fraud_trend(viz_data['fraud_trend'])
     fraud_trend_fig = px.line(
-        viz_data['fraud_trend'], 
+        downsample_lines(fraud_trend, ['transactions', 'fraud_cases']), 
         x='transaction_date', 
-        y=['transactions', 'fraud_cases'],
-        title='Tendencia de Transacciones y Fraudes',
+        y='value',
+        color='variable',
+        title=f'Tendencia de Transacciones y Fraudes (por {trend_bucket.lower()})',
         labels={'value': 'Cantidad', 'transaction_date': 'Fecha', 'variable': 'Tipo'},
         color_discrete_map={'transactions': '#3498db', 'fraud_cases': '#e74c3c'}
     )
     
     # Añadimos la tasa de fraude como un eje secundario
     fraud_trend_fig.add_bar(
-        x=viz_data['fraud_trend']['transaction_date'],
-        y=viz_data['fraud_trend']['fraud_rate'],
+        x=fraud_trend['transaction_date'],
+        y=fraud_trend['fraud_rate'],
         name='Tasa de Fraude (%)',
         marker_color='rgba(255, 152, 0, 0.6)',
         yaxis='y2'
@@ -831,53 +1200,29 @@ def update_dashboard(n_clicks, start_date, end_date, countries, merchant_categor
         hovermode='x unified'
     )
     
-    # Generar tabla de alertas recientes
-    recent_alerts = generate_risk_alerts(filtered_df).head(10)
-    
-    # Crear tabla de alertas mejorada
-    if len(recent_alerts) > 0:
-        alert_table = dbc.Table([
-            html.Thead(
-                html.Tr([
-                    html.Th([html.I(className="fas fa-id-card me-2"), "Cliente ID"]),
-                    html.Th([html.I(className="fas fa-calendar me-2"), "Fecha/Hora"]),
-                    html.Th([html.I(className="fas fa-dollar-sign me-2"), "Monto"]),
-                    html.Th([html.I(className="fas fa-store me-2"), "Comercio"]),
-                    html.Th([html.I(className="fas fa-globe me-2"), "País"]),
-                    html.Th([html.I(className="fas fa-exclamation-circle me-2"), "Score de Riesgo"]),
-                    html.Th([html.I(className="fas fa-flag me-2"), "Indicadores"])
-                ], className="table-primary")
-            ),
-            html.Tbody([
-                html.Tr([
-                    html.Td(row['customerId']),
-                    html.Td(str(row['transactionDateTime'])),
-                    html.Td(f"${row['transactionAmount']:.2f}"),
-                    html.Td(row['merchantName']),
-                    html.Td([
-                        html.I(className="fas fa-map-marker-alt me-1"),
-                        f"{row['merchantCountryCode']}"
-                    ]),
-                    html.Td(html.Span(f"{row['risk_score']}", 
-                                     className="badge bg-danger" if row['risk_score'] > 5 else "badge bg-warning")),
-                    html.Td([
-                        html.Span("CVV incorrecto", className="badge badge-cvv-incorrecto me-1") 
-                            if row['cardCVV'] != row['enteredCVV'] else "",
-                        html.Span("Fecha exp. incorrecta", className="badge badge-fecha-exp-incorrecta me-1") 
-                            if not row['expirationDateKeyInMatch'] else "",
-                        html.Span("País diferente", className="badge badge-pais-diferente me-1") 
-                            if row['acqCountry'] != row['merchantCountryCode'] else "",
-                        html.Span("Tarjeta no presente", className="badge badge-tarjeta-no-presente me-1") 
-                            if not row['cardPresent'] else ""
-                    ])
-                ], className="table-hover") for _, row in recent_alerts.iterrows()
-            ])
-        ], bordered=True, hover=True, striped=True, responsive=True, className="table-sm")
-    else:
-        alert_table = dbc.Alert([
-            html.I(className="fas fa-info-circle me-2"),
-            "No se encontraron alertas de robo de identidad en el período seleccionado."
-        ], color="info")
+    # Percentiles de monto por etiqueta de fraude: cajas p25-p75 con la
+    # mediana, bigotes p5-p95 y un marcador en p99
+    amount_quantiles_fig = go.Figure()
+    quantile_colors = {'Legítimas': '#3498db', 'Fraudulentas': '#e74c3c'}
+    for _, row in viz_data.get('amount_quantiles', pd.DataFrame()).iterrows():
+        color = quantile_colors.get(row['label'], '#7f8c8d')
+        amount_quantiles_fig.add_trace(go.Box(
+            name=row['label'], x=[row['label']],
+            q1=[row['p25']], median=[row['p50']], q3=[row['p75']],
+            lowerfence=[row['p5']], upperfence=[row['p95']],
+            marker_color=color, showlegend=False
+        ))
+        amount_quantiles_fig.add_scatter(
+            x=[row['label']], y=[row['p99']], mode='markers', name='p99',
+            marker=dict(symbol='diamond', size=10, color=color), showlegend=False,
+            hovertemplate=f"p99: %{{y:$,.2f}}<br>{row['transactions']:,} transacciones<extra></extra>"
+        )
+    amount_quantiles_fig.update_layout(
+        template=custom_template,
+        title='Monto por Tipo de Transacción (p5-p95, ◆ p99)',
+        yaxis=dict(title=dict(text='Monto ($)', font=dict(size=12)), gridcolor='rgba(230, 230, 230, 0.8)'),
+        xaxis=dict(title=None)
+    )
     
     return (
         f"{kpis['total_transactions']:,}",
@@ -892,9 +1237,220 @@ def update_dashboard(n_clicks, start_date, end_date, countries, merchant_categor
         fraud_by_country_fig,
         merchant_category_fig,
         amount_dist_fig,
-        alert_table
+        amount_quantiles_fig,
+        distinct_text('fraud_customers', 'Clientes afectados'),
+        distinct_text('id_theft_customers', 'Clientes con indicadores'),
+        approximate_badge,
+        estimation is None
     )
 
+# Tabla de alertas: cada página, orden o filtro se resuelve sobre el índice
+# de alertas ya ordenado de la caché y solo se envían los registros de la página
+@app.callback(
+    [Output('alerts-table', 'data'),
+     Output('alerts-table', 'page_count'),
+     Output('alerts-table', 'page_current'),
+     Output('alerts-table', 'style_data_conditional'),
+     Output('alerts-table-info', 'children')],
+    [Input('alerts-table', 'page_current'),
+     Input('alerts-table', 'page_size'),
+     Input('alerts-table', 'sort_by'),
+     Input('alerts-table', 'filter_query'),
+     Input('apply-filter', 'n_clicks'),
+     Input('data-ready', 'data')],
+    [
+        State('date-range', 'start_date'),
+        State('date-range', 'end_date'),
+        State('country-filter', 'value'),
+        State('merchant-category-filter', 'value')
+    ]
+)
+def update_alerts_table(page_current, page_size, sort_by, filter_query, n_clicks, data_ready,
+                        start_date, end_date, countries, merchant_categories):
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    alerts, order = get_alert_view(start_date, end_date, countries, merchant_categories, sort_by, filter_query)
+    
+    # Con filtros nuevos se vuelve a la primera página
+    page_count = max(1, -(-len(order) // page_size))
+    if dash.callback_context.triggered_id in ('apply-filter', 'data-ready'):
+        page_current = 0
+    page_current = min(page_current or 0, page_count - 1)
+    
+    high_risk_threshold = risk_scorer.high_risk_threshold
+    style = [{
+        'if': {'filter_query': f'{{risk_score}} > {high_risk_threshold}', 'column_id': 'risk_score'},
+        'backgroundColor': '#dc3545', 'color': 'white', 'fontWeight': 'bold'
+    }]
+    
+    if len(alerts) == 0:
+        info = "No se encontraron alertas de robo de identidad en el período seleccionado."
+    elif len(order) < len(alerts):
+        info = f"{len(order):,} de {len(alerts):,} alertas cumplen los filtros de la tabla"
+    else:
+        info = f"{len(alerts):,} alertas"
+    if KPI_BACKEND == 'mongo':
+        info += f" (solo las {MONGO_ALERTS_LIMIT:,} de mayor score)"
+    
+    return alerts.page(order, page_current, page_size), page_count, page_current, style, info
+
+# Callback que avisa cuando terminan los cálculos exactos en segundo plano
+@app.callback(
+    Output('exact-ready', 'data'),
+    [Input('refine-interval', 'n_intervals')]
+)
+def check_refinement(n_intervals):
+    if not n_intervals or refinements_pending():
+        raise PreventUpdate
+    return n_intervals
+
+# Callback que detecta cuando terminó la carga de datos en segundo plano y
+# llena los filtros con los valores del dataset
+@app.callback(
+    [Output('data-ready', 'data'),
+     Output('data-ready-interval', 'disabled'),
+     Output('data-loading-status', 'children'),
+     Output('date-range', 'min_date_allowed'),
+     Output('date-range', 'max_date_allowed'),
+     Output('date-range', 'start_date'),
+     Output('date-range', 'end_date'),
+     Output('country-filter', 'options'),
+     Output('merchant-category-filter', 'options')],
+    [Input('data-ready-interval', 'n_intervals')]
+)
+def check_data_ready(n_intervals):
+    if data_store.load_error:
+        return (dash.no_update, True, dbc.Alert([
+            html.I(className="fas fa-exclamation-triangle me-2"),
+            f"Error al cargar los datos: {data_store.load_error}"
+        ], color="danger"), *[dash.no_update] * 6)
+    
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    if KPI_BACKEND == 'mongo':
+        options = mongo_filter_options
+    else:
+        df = data_store.df
+        options = {
+            'min_date': df['transactionDateTime'].min().date() if len(df) > 0 else None,
+            'max_date': df['transactionDateTime'].max().date() if len(df) > 0 else None,
+            'countries': sorted(df['merchantCountryCode'].unique()),
+            'categories': sorted(df['merchantCategoryCode'].unique()),
+        }
+    
+    min_date = options['min_date']
+    max_date = options['max_date']
+    country_options = [{'label': country, 'value': country} 
+                       for country in options['countries']]
+    category_options = [{'label': f"Categoría {cat}", 'value': cat} 
+                        for cat in options['categories']]
+    
+    return True, True, None, min_date, max_date, min_date, max_date, country_options, category_options
+
+# Tabla comparativa: todos los valores de la dimensión elegida en una sola pasada
+@app.callback(
+    Output('breakdown-table', 'children'),
+    [Input('breakdown-dimension', 'value'), Input('apply-filter', 'n_clicks'), Input('data-ready', 'data')],
+    [
+        State('date-range', 'start_date'),
+        State('date-range', 'end_date'),
+        State('country-filter', 'value'),
+        State('merchant-category-filter', 'value')
+    ]
+)
+def update_breakdown(dimension, n_clicks, data_ready, start_date, end_date, countries, merchant_categories):
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    if KPI_BACKEND == 'mongo':
+        return html.P("La comparativa requiere el dataset en memoria (motor 'pandas').",
+                      className="text-muted mb-0")
+    
+    table = get_kpi_breakdown(dimension, start_date, end_date, countries, merchant_categories)
+    if len(table) == 0:
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            "No hay transacciones para los filtros seleccionados."
+        ], color="info")
+    
+    display = pd.DataFrame({
+        BREAKDOWN_DIMENSIONS[dimension]: table[dimension].astype(str),
+        'Transacciones': table['total_transactions'].map('{:,}'.format),
+        'Fraudes': table['fraud_transactions'].map('{:,}'.format),
+        'Tasa de fraude': table['fraud_rate'].map('{:.2f}%'.format),
+        'Posible robo de identidad': table['potential_identity_theft_count'].map('{:,}'.format),
+        'Tasa robo de identidad': table['potential_identity_theft_rate'].map('{:.2f}%'.format),
+        'CVV no coincide': table['cvv_mismatch_count'].map('{:,}'.format),
+        'Tarjeta no presente': table['card_not_present_count'].map('{:,}'.format),
+        'País diferente': table['geo_mismatch_count'].map('{:,}'.format),
+        'Fecha exp. no coincide': table['exp_date_mismatch_count'].map('{:,}'.format),
+    })
+    return dbc.Table.from_dataframe(display, bordered=True, hover=True, striped=True,
+                                    responsive=True, className="table-sm")
+
+# Franja de KPIs en vivo: se lee de los acumuladores por minuto del DataStore
+@app.callback(
+    [Output('live-kpis', 'children'),
+     Output('live-kpis-latest', 'children')],
+    [Input('live-kpi-interval', 'n_intervals'), Input('data-ready', 'data')]
+)
+def update_live_kpis(n_intervals, data_ready):
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    if KPI_BACKEND == 'mongo':
+        return html.P("Los KPIs en vivo requieren el dataset en memoria (motor 'pandas').",
+                      className="text-muted mb-0"), None
+    
+    columns = []
+    for name, kpis in data_store.live.window_kpis().items():
+        if kpis is None:
+            body = [html.P("Sin transacciones", className="text-muted mb-0")]
+        else:
+            body = [
+                html.H4(f"{kpis['total_transactions']:,}", className="text-primary mb-1"),
+                html.P(f"Fraude: {kpis['fraud_transactions']:,} ({kpis['fraud_rate']:.2f}%)", className="mb-1 text-danger"),
+                html.P(f"Posible robo de identidad: {kpis['potential_identity_theft_count']:,}", className="mb-0 text-warning")
+            ]
+        columns.append(dbc.Col([
+            html.H6(f"Últimas {name}" if name != '1h' else "Última hora", className="text-muted"),
+            *body
+        ], width=12, md=4, className="text-center"))
+    
+    latest = data_store.live.latest
+    latest_text = f"(hasta {latest:%Y-%m-%d %H:%M})" if latest is not None else None
+    return dbc.Row(columns), latest_text
+
+# Comercios con más fraudes: se lee del resumen Space-Saving del DataStore
+@app.callback(
+    Output('top-fraud-merchants', 'children'),
+    [Input('live-kpi-interval', 'n_intervals'), Input('data-ready', 'data')]
+)
+def update_top_fraud_merchants(n_intervals, data_ready):
+    if not data_store.is_ready():
+        raise PreventUpdate
+    
+    if KPI_BACKEND == 'mongo':
+        return html.P("Los comercios con más fraudes requieren el dataset en memoria (motor 'pandas').",
+                      className="text-muted mb-0")
+    
+    top = data_store.fraud_merchants.top()
+    if len(top) == 0:
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            "No se han registrado transacciones fraudulentas."
+        ], color="info")
+    
+    display = pd.DataFrame({
+        'Comercio': top['key'].astype(str),
+        'Fraudes': top['count'].map('{:,}'.format),
+        'Fraudes garantizados': top['guaranteed'].map('{:,}'.format),
+    })
+    return dbc.Table.from_dataframe(display, bordered=True, hover=True, striped=True,
+                                    responsive=True, className="table-sm")
+
 # Callback para el modal de privacidad
 @app.callback(
     Output('privacy-modal', 'is_open'),
@@ -955,15 +1511,12 @@ def toggle_email_preview(preview_clicks, close_clicks, is_open, recipients, subj
         return False, []
     
     if trigger_id == 'preview-email-btn' and preview_clicks:
-        # Obtener datos filtrados
-        filtered_df = get_filtered_data(start_date, end_date, countries, merchant_categories)
-        
-        # Calcular KPIs para el email
-        kpis = calculate_identity_theft_kpis(filtered_df)
+        if not data_store.is_ready():
+            return True, [dbc.Alert("Los datos aún se están cargando. Intente de nuevo en unos segundos.", color="info")]
         
-        # Generar alertas
+        # Calcular KPIs y alertas para el email
         high_risk_only = options and 'high_risk_only' in options
-        alerts = generate_risk_alerts(filtered_df, high_risk_only)
+        kpis, _, alerts = get_dashboard_data(start_date, end_date, countries, merchant_categories, high_risk_only)
         
         # Generar contenido del email
         email_subject_text = subject if subject else f"Reporte de Seguridad - Dashboard de Robo de Identidad - {datetime.now().strftime('%d/%m/%Y')}"
@@ -1001,7 +1554,7 @@ def toggle_email_preview(preview_clicks, close_clicks, is_open, recipients, subj
                     ], className="mb-3"),
                     
                     html.H6("Alertas de Riesgo:", className="mb-2"),
-                    html.P(f"Se han identificado {len(alerts)} transacciones con {'alto ' if high_risk_only else ''}riesgo de robo de identidad{' (score > 5)' if high_risk_only else ''}.", 
+                    html.P(f"Se han identificado {len(alerts)} transacciones con {'alto ' if high_risk_only else ''}riesgo de robo de identidad{f' (score > {risk_scorer.high_risk_threshold})' if high_risk_only else ''}.", 
                           className="text-danger mb-3" if len(alerts) > 0 else "text-success mb-3") if len(alerts) > 0 else html.P("No se identificaron alertas de riesgo en este período.", className="text-success mb-3"),
                     
                     html.P("Se recomienda revisar las transacciones marcadas como riesgo para tomar las acciones preventivas correspondientes.", className="mb-3") if len(alerts) > 0 else html.Div(),
@@ -1055,13 +1608,13 @@ def send_email_report(n_clicks, recipients, subject, options, start_date, end_da
     if not n_clicks or not recipients:
         return ""
     
+    if not data_store.is_ready():
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            "Los datos aún se están cargando. Intente de nuevo en unos segundos."
+        ], color="info", dismissable=True)
+    
     try:
-        # Obtener datos filtrados
-        filtered_df = get_filtered_data(start_date, end_date, countries, merchant_categories)
-        
-        # Calcular KPIs
-        kpis = calculate_identity_theft_kpis(filtered_df)
-        
         # Preparar datos para el email
         recipient_list = [email.strip() for email in recipients.split(',') if email.strip()]
         email_subject = subject if subject else f"Reporte de Seguridad - Dashboard de Robo de Identidad - {datetime.now().strftime('%d/%m/%Y')}"
@@ -1070,8 +1623,9 @@ def send_email_report(n_clicks, recipients, subject, options, start_date, end_da
         attach_csv = options and 'attach_csv' in options
         high_risk_only = options and 'high_risk_only' in options
         
-        # Generar alertas con el formato correcto para el email sender
-        alerts = generate_risk_alerts(filtered_df, high_risk_only).head(10)  # Top 10 alertas
+        # Calcular KPIs y alertas con el formato correcto para el email sender
+        kpis, _, alerts = get_dashboard_data(start_date, end_date, countries, merchant_categories, high_risk_only)
+        alerts = alerts.head(10).copy()  # Top 10 alertas
         
         # Preparar las alertas en el formato que espera tu email_sender
         if len(alerts) > 0:
@@ -1111,7 +1665,8 @@ def send_email_report(n_clicks, recipients, subject, options, start_date, end_da
                     'potential_identity_theft_count': kpis.get('potential_identity_theft_count', 0),
                     'potential_identity_theft_rate': kpis.get('potential_identity_theft_rate', 0.0),
                     'cvv_mismatch_count': kpis.get('cvv_mismatch_count', 0),
-                    'cvv_mismatch_fraud_rate': kpis.get('cvv_mismatch_fraud_rate', 0.0)
+                    'cvv_mismatch_fraud_rate': kpis.get('cvv_mismatch_fraud_rate', 0.0),
+                    'high_risk_threshold': risk_scorer.high_risk_threshold
                 }
                 
                 # Llamar a la función con el formato correcto (3 parámetros según tu implementación)
@@ -1192,4 +1747,4 @@ if __name__ == '__main__':
     from config import DEBUG, HOST, PORT
     
     # Iniciamos la aplicación con los parámetros de configuración
-    app.run(debug=DEBUG, port=PORT, host=HOST)
\ No newline at end of file
+    app.run(debug=DEBUG, port=PORT, host=HOST)
@@ -0,0 +1,41 @@
+"""
+Compara el tiempo de compute_dashboard_data (bincount en una sola pasada)
+con la implementación anterior basada en groupby (tests/test_dashboard_kernel.py)
+sobre documentos sintéticos, con y sin filtros.
+
+Uso: python benchmarks/dashboard_kernel.py [--rows 200000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+import data_loader
+from kpi_cube import filter_mask
+from conftest import FILTER_STATES, make_documents
+from test_dashboard_kernel import reference_kpis, reference_viz_data
+
+def best_ms(function, repeat):
+    """Mejor tiempo (ms) de `repeat` ejecuciones"""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(make_documents(args.rows)))
+    print(f"{len(df):,} filas")
+    print(f"{'filtros':<60} {'groupby (ms)':>13} {'kernel (ms)':>12} {'x':>6}")
+    for filters in FILTER_STATES:
+        frame = df[filter_mask(df, *filters)]
+        reference = best_ms(lambda: (reference_kpis(frame), reference_viz_data(frame)), args.repeat)
+        kernel = best_ms(lambda: data_loader.compute_dashboard_data(frame), args.repeat)
+        print(f"{str(filters):<60} {reference:>13.1f} {kernel:>12.1f} {reference / kernel:>6.1f}")
+
+if __name__ == '__main__':
+    main()
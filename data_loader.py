@@ -4,35 +4,742 @@ from pymongo.server_api import ServerApi
 from datetime import datetime, timedelta
 import numpy as np
 import os
+import logging
+import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado entre procesos
+    fcntl = None
 
 # Importamos la configuración (preferiblemente desde variables de entorno en producción)
-from config import MONGODB_URI, DB_NAME, COLLECTION_NAME 
+from config import (
+    MONGODB_URI, DB_NAME, COLLECTION_NAME,
+    MONGODB_LOAD_LIMIT, MONGODB_BATCH_SIZE,
+    MONGODB_STREAMING, MONGODB_CHUNK_SIZE,
+    MONGODB_LOAD_PARTITIONS, MONGODB_PARTITION_FIELD,
+    MEMORY_LIMIT_MB, MEMORY_LIMIT_POLICY, FALLBACK_WINDOW_DAYS,
+    SNAPSHOT_ENABLED, SNAPSHOT_DIR, SHARED_DATASET
+)
+from heavy_hitters import top_k
+
+logger = logging.getLogger(__name__)
+
+# Columnas que utiliza el dashboard y tipo del buffer NumPy en el que se cargan.
+# Los campos de texto o código se guardan como objeto y prepare_data completa
+# los faltantes; las banderas ausentes se cargan como False.
+DASHBOARD_COLUMNS = {
+    'accountNumber': object,
+    'customerId': object,
+    'transactionDateTime': object,
+    'transactionAmount': np.float64,
+    'merchantName': object,
+    'acqCountry': object,
+    'merchantCountryCode': object,
+    'merchantCategoryCode': object,
+    'cardCVV': object,
+    'enteredCVV': object,
+    'cardPresent': np.bool_,
+    'expirationDateKeyInMatch': np.bool_,
+    'isFraud': np.int8,
+}
+
+# Valor con el que se rellena un campo ausente según el tipo del buffer
+_MISSING_VALUES = {
+    'O': None,
+    'f': np.nan,
+    'b': False,
+    'i': 0,
+}
 
-def load_data_from_mongodb():
+def _read_cursor(cursor, columns=DASHBOARD_COLUMNS, capacity=1024):
     """
-    Carga los datos desde MongoDB y realiza la preparación inicial necesaria.
+    Llena buffers NumPy tipados directamente desde un cursor de MongoDB,
+    sin construir la lista intermedia de diccionarios.
     """
-    # Conexión a MongoDB usando configuración
-    uri = MONGODB_URI
-    client = MongoClient(uri, server_api=ServerApi('1'))
+    capacity = max(int(capacity), 1)
+    buffers = {col: np.empty(capacity, dtype=dtype) for col, dtype in columns.items()}
+    defaults = {col: _MISSING_VALUES[buf.dtype.kind] for col, buf in buffers.items()}
+
+    n = 0
+    for doc in cursor:
+        # Duplicamos la capacidad cuando el cursor trae más documentos de los previstos
+        if n == capacity:
+            capacity *= 2
+            for col, buf in buffers.items():
+                grown = np.empty(capacity, dtype=buf.dtype)
+                grown[:n] = buf
+                buffers[col] = grown
+
+        for col, buf in buffers.items():
+            value = doc.get(col)
+            buf[n] = defaults[col] if value is None else value
+        n += 1
 
-    # Nombre de la base de datos y la colección desde configuración
-    db_name = DB_NAME
-    collection_name = COLLECTION_NAME
+    return pd.DataFrame({col: buf[:n] for col, buf in buffers.items()})
 
-    # Accedemos a la base de datos y la colección
-    db = client[db_name]
-    collection = db[collection_name]
+def documents_to_frame(documents, capacity=1024):
+    """Lee documentos (cursor o iterable) con las columnas del dashboard y los prepara"""
+    return prepare_data(_read_cursor(documents, capacity=capacity))
 
-    # Cargamos los datos de la colección en un DataFrame de pandas (limitado a 1500 documentos)
-    data = collection.find().limit(10000)
-    df = pd.DataFrame(list(data))
+def _dashboard_projection():
+    """Proyección de MongoDB con solo las columnas utilizadas, sin el _id"""
+    projection = {col: 1 for col in DASHBOARD_COLUMNS}
+    projection['_id'] = 0
+    return projection
+
+def _combine_queries(*queries):
+    """Filtro de MongoDB que exige todos los filtros dados (los vacíos o None se ignoran)"""
+    queries = [query for query in queries if query]
+    if len(queries) > 1:
+        return {'$and': queries}
+    return queries[0] if queries else {}
+
+def load_data_from_collection(collection, limit=MONGODB_LOAD_LIMIT, batch_size=MONGODB_BATCH_SIZE, query=None):
+    """
+    Lee de la colección únicamente las columnas del dashboard, en lotes de
+    `batch_size` documentos, y realiza la preparación inicial.
+    """
+    cursor = collection.find(query or {}, projection=_dashboard_projection(), batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    df = _read_cursor(cursor, capacity=limit or batch_size)
     
     # Realizamos la preparación inicial de los datos
     prepare_data(df)
     
     return df
 
+def _iter_prepared_chunks(cursor, chunk_size):
+    """Genera bloques ya preparados de hasta `chunk_size` documentos del cursor"""
+    while True:
+        chunk = _read_cursor(islice(cursor, chunk_size), capacity=chunk_size)
+        if len(chunk) == 0:
+            return
+        yield prepare_data(chunk)
+        if len(chunk) < chunk_size:
+            return
+
+def _time_window_query(collection, window_days):
+    """
+    Construye el filtro de los últimos `window_days` días a partir de la
+    transacción más reciente de la colección.
+    """
+    latest = collection.find_one(
+        {'transactionDateTime': {'$ne': None}},
+        projection={'transactionDateTime': 1, '_id': 0},
+        sort=[('transactionDateTime', -1)]
+    )
+    if not latest:
+        return None
+
+    latest_value = latest['transactionDateTime']
+    cutoff = pd.to_datetime(latest_value) - timedelta(days=window_days)
+    # Comparamos en el mismo tipo en que está guardado el campo (texto ISO o fecha)
+    if isinstance(latest_value, str):
+        cutoff = cutoff.isoformat()
+    else:
+        cutoff = cutoff.to_pydatetime()
+    return {'transactionDateTime': {'$gte': cutoff}}
+
+def stream_data_from_collection(collection, query=None, chunk_size=MONGODB_CHUNK_SIZE,
+                                memory_limit_mb=MEMORY_LIMIT_MB, policy=MEMORY_LIMIT_POLICY,
+                                window_days=FALLBACK_WINDOW_DAYS):
+    """
+    Lee la colección completa por bloques, prepara cada bloque y los concatena.
+
+    Si el DataFrame preparado superaría `memory_limit_mb`, la carga se detiene
+    (policy='stop') o se reinicia con solo los últimos `window_days` días
+    (policy='window'), sin dejar de aplicar `query`.
+    """
+    budget = memory_limit_mb * 1024 ** 2 if memory_limit_mb else None
+    chunks = []
+    rows = 0
+    nbytes = 0
+    exceeded = False
+
+    cursor = collection.find(
+        query or {},
+        projection=_dashboard_projection(),
+        batch_size=min(chunk_size, MONGODB_BATCH_SIZE)
+    )
+    try:
+        for chunk in _iter_prepared_chunks(cursor, chunk_size):
+            chunk_bytes = int(chunk.memory_usage(deep=True).sum())
+            if budget and nbytes + chunk_bytes > budget:
+                exceeded = True
+                break
+
+            chunks.append(chunk)
+            rows += len(chunk)
+            nbytes += chunk_bytes
+            logger.info(f"Bloque cargado: {len(chunk):,} filas ({rows:,} filas, {nbytes / 1024 ** 2:.1f} MB acumulados)")
+    finally:
+        cursor.close()
+
+    if exceeded:
+        logger.warning(f"Se alcanzó el techo de memoria de {memory_limit_mb} MB tras {rows:,} filas")
+
+        # Recargamos solo la ventana de tiempo más reciente (una sola vez)
+        if policy == 'window':
+            window_query = _time_window_query(collection, window_days)
+            if window_query is not None:
+                logger.warning(f"Cargando solo los últimos {window_days} días de transacciones")
+                chunks = None
+                return stream_data_from_collection(
+                    collection, query=_combine_queries(query, window_query), chunk_size=chunk_size,
+                    memory_limit_mb=memory_limit_mb, policy='stop'
+                )
+
+    if chunks:
+        df = concat_prepared(chunks)
+    else:
+        df = prepare_data(_read_cursor(iter(())))
+
+    logger.info(f"Carga completa: {len(df):,} filas, {nbytes / 1024 ** 2:.1f} MB")
+    return df
+
+def _partition_ranges(collection, partitions, field=MONGODB_PARTITION_FIELD):
+    """
+    Divide la colección en hasta `partitions` rangos contiguos de `field`
+    [inferior, superior) con un número similar de documentos. Los límites se
+    obtienen saltando sobre el índice de `field`; None significa sin límite.
+    """
+    count = collection.count_documents({})
+    bounds = []
+    for i in range(1, partitions):
+        doc = next(iter(
+            collection.find({}, projection={field: 1}).sort(field, 1).skip(i * count // partitions).limit(1)
+        ), None)
+        if doc is not None and doc.get(field) is not None and (not bounds or doc[field] != bounds[-1]):
+            bounds.append(doc[field])
+
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+def _range_query(field, lower, upper):
+    """Filtro de MongoDB para el rango [lower, upper) de `field`"""
+    condition = {}
+    if lower is not None:
+        condition['$gte'] = lower
+    if upper is not None:
+        condition['$lt'] = upper
+    return {field: condition} if condition else {}
+
+def parallel_load_from_collection(collection, partitions=MONGODB_LOAD_PARTITIONS,
+                                  field=MONGODB_PARTITION_FIELD, chunk_size=MONGODB_CHUNK_SIZE,
+                                  memory_limit_mb=MEMORY_LIMIT_MB, policy=MEMORY_LIMIT_POLICY,
+                                  window_days=FALLBACK_WINDOW_DAYS, query=None):
+    """
+    Lee la colección completa dividida en rangos de `field` que se descargan
+    en paralelo en un pool de hilos (sobre el mismo cliente y su pool de
+    conexiones). Cada hilo prepara sus bloques y al final se concatenan en el
+    orden de los rangos.
+
+    `field` debe existir en todos los documentos (por defecto _id). `query`
+    se aplica además del rango en cada hilo. El techo de memoria es
+    compartido por todos los rangos; al superarlo se aplica la misma
+    política que en stream_data_from_collection.
+    """
+    ranges = _partition_ranges(collection, partitions, field)
+    budget = memory_limit_mb * 1024 ** 2 if memory_limit_mb else None
+    totals = {'rows': 0, 'bytes': 0}
+    lock = threading.Lock()
+    exceeded = threading.Event()
+
+    def load_range(lower, upper):
+        chunks = []
+        cursor = collection.find(
+            _combine_queries(query, _range_query(field, lower, upper)),
+            projection=_dashboard_projection(),
+            batch_size=min(chunk_size, MONGODB_BATCH_SIZE)
+        )
+        try:
+            for chunk in _iter_prepared_chunks(cursor, chunk_size):
+                chunk_bytes = int(chunk.memory_usage(deep=True).sum())
+                with lock:
+                    if exceeded.is_set() or (budget and totals['bytes'] + chunk_bytes > budget):
+                        exceeded.set()
+                        break
+                    totals['rows'] += len(chunk)
+                    totals['bytes'] += chunk_bytes
+                    logger.info(f"Bloque cargado: {len(chunk):,} filas ({totals['rows']:,} filas, "
+                                f"{totals['bytes'] / 1024 ** 2:.1f} MB acumulados)")
+                chunks.append(chunk)
+        finally:
+            cursor.close()
+        return chunks
+
+    logger.info(f"Leyendo la colección en {len(ranges)} rangos de '{field}' en paralelo")
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix='mongo-load') as pool:
+        results = list(pool.map(lambda bounds: load_range(*bounds), ranges))
+
+    if exceeded.is_set():
+        logger.warning(f"Se alcanzó el techo de memoria de {memory_limit_mb} MB tras {totals['rows']:,} filas")
+
+        # La ventana se recarga con un solo cursor, ya acotada por fecha
+        if policy == 'window':
+            window_query = _time_window_query(collection, window_days)
+            if window_query is not None:
+                logger.warning(f"Cargando solo los últimos {window_days} días de transacciones")
+                results = None
+                return stream_data_from_collection(
+                    collection, query=_combine_queries(query, window_query), chunk_size=chunk_size,
+                    memory_limit_mb=memory_limit_mb, policy='stop'
+                )
+
+    chunks = [chunk for range_chunks in results for chunk in range_chunks]
+    if chunks:
+        df = concat_prepared(chunks)
+    else:
+        df = prepare_data(_read_cursor(iter(())))
+
+    logger.info(f"Carga completa: {len(df):,} filas, {totals['bytes'] / 1024 ** 2:.1f} MB")
+    return df
+
+# Versión del formato del snapshot; se incrementa si cambia prepare_data o el esquema
+SNAPSHOT_FORMAT_VERSION = 4
+
+def collection_version(collection, **load_params):
+    """
+    Sello de versión de la colección: número de documentos y la fecha de la
+    transacción más reciente, junto con los parámetros de carga utilizados.
+    """
+    latest = collection.find_one(
+        {'transactionDateTime': {'$ne': None}},
+        projection={'transactionDateTime': 1, '_id': 0},
+        sort=[('transactionDateTime', -1)]
+    )
+    return {
+        'format': SNAPSHOT_FORMAT_VERSION,
+        'count': collection.count_documents({}),
+        'max_transaction': str(latest['transactionDateTime']) if latest else None,
+        'params': load_params,
+    }
+
+def save_snapshot(df, path, version):
+    """
+    Guarda el DataFrame preparado como un archivo .npy por columna y un
+    manifest.json con el sello de versión. La escritura es atómica: se
+    escribe en un directorio temporal que luego reemplaza al anterior.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {'name': col, 'file': f"{i}.npy"}
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry['kind'] = 'category'
+            entry['ordered'] = bool(series.cat.ordered)
+            np.save(os.path.join(tmp_path, entry['file']), series.cat.codes.to_numpy())
+            np.save(os.path.join(tmp_path, f"{i}.categories.npy"),
+                    series.cat.categories.to_numpy(dtype=object), allow_pickle=True)
+        elif pd.api.types.is_datetime64_dtype(series.dtype):
+            entry['kind'] = 'datetime'
+            entry['dtype'] = str(series.dtype)
+            np.save(os.path.join(tmp_path, entry['file']), series.to_numpy().view('i8'))
+        elif series.dtype == object:
+            # Las columnas de objetos se guardan como códigos + valores únicos
+            entry['kind'] = 'object'
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(tmp_path, entry['file']), codes)
+            np.save(os.path.join(tmp_path, f"{i}.categories.npy"),
+                    np.asarray(uniques, dtype=object), allow_pickle=True)
+        else:
+            entry['kind'] = 'numeric'
+            np.save(os.path.join(tmp_path, entry['file']), series.to_numpy())
+
+        columns.append(entry)
+
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'rows': len(df), 'columns': columns}, f)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def load_snapshot(path, version=None, mmap=False):
+    """
+    Carga un snapshot guardado con save_snapshot. Retorna None si no existe
+    o si su sello de versión no coincide con `version`.
+    """
+    manifest_path = os.path.join(path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if version is not None and manifest['version'] != json.loads(json.dumps(version)):
+        return None
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(path, entry['file']), mmap_mode=mmap_mode)
+        kind = entry['kind']
+
+        if kind in ('category', 'object'):
+            stem = entry['file'][:-len('.npy')]
+            categories = np.load(os.path.join(path, f"{stem}.categories.npy"), allow_pickle=True)
+            if kind == 'category':
+                values = pd.Categorical.from_codes(values, categories=categories, ordered=entry['ordered'])
+            else:
+                restored = categories.take(values) if len(categories) else np.full(len(values), None, dtype=object)
+                restored[values < 0] = None
+                values = restored
+        elif kind == 'datetime':
+            values = values.view(entry['dtype'])
+
+        data[entry['name']] = values
+
+    # copy=False: con mmap las columnas son vistas de solo lectura de los archivos
+    return pd.DataFrame(data, columns=[entry['name'] for entry in manifest['columns']], copy=False)
+
+@contextmanager
+def snapshot_lock(path):
+    """
+    Candado exclusivo entre procesos sobre el snapshot, para que solo un
+    worker lo escriba mientras los demás esperan para adjuntarlo.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    with open(f"{os.path.abspath(path)}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Cliente compartido por el proceso (MongoClient es seguro entre hilos y
+# mantiene su propio pool de conexiones); se recrea tras un fork
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_mongo_client():
+    """Retorna el cliente de MongoDB del proceso actual, creándolo si hace falta"""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(MONGODB_URI, server_api=ServerApi('1'))
+            _client_pid = os.getpid()
+        return _client
+
+def get_mongo_collection():
+    """Retorna la colección configurada usando el cliente compartido del proceso"""
+    return get_mongo_client()[DB_NAME][COLLECTION_NAME]
+
+def latest_watermark(collection, field):
+    """Valor máximo actual de `field` en la colección (None si está vacía)"""
+    latest = collection.find_one(
+        {field: {'$ne': None}},
+        projection={field: 1},
+        sort=[(field, -1)]
+    )
+    return latest[field] if latest else None
+
+def load_new_documents(collection, field, watermark=None, limit=None, batch_size=MONGODB_BATCH_SIZE):
+    """
+    Lee los documentos con `field` mayor que `watermark`, en orden creciente,
+    y los prepara igual que la carga inicial.
+
+    Returns:
+        tuple: (DataFrame preparado, nueva marca de agua)
+    """
+    columns = dict(DASHBOARD_COLUMNS)
+    columns.setdefault(field, object)
+    projection = {col: 1 for col in columns}
+    if field != '_id':
+        projection['_id'] = 0
+
+    query = {field: {'$gt': watermark}} if watermark is not None else {}
+    cursor = collection.find(query, projection=projection, sort=[(field, 1)], batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    df = _read_cursor(cursor, columns=columns, capacity=limit or batch_size)
+    if len(df) == 0:
+        return df, watermark
+
+    new_watermark = df[field].max()
+    if field not in DASHBOARD_COLUMNS:
+        df = df.drop(columns=field)
+
+    prepare_data(df)
+    return df, new_watermark
+
+def _load_with_snapshot(collection, limit, batch_size, streaming, use_snapshot, mmap=False,
+                        partitions=1, query=None):
+    """
+    Carga la colección reutilizando el snapshot local si su sello coincide.
+    Con `mmap` el resultado se adjunta desde los archivos del snapshot.
+    """
+    version = None
+    if use_snapshot:
+        load_params = {'streaming': streaming}
+        if query:
+            # El filtro (p. ej. la marca de agua del refresco) es parte del sello
+            load_params['query'] = json.loads(json.dumps(query, default=str))
+        if streaming:
+            load_params.update(memory_limit_mb=MEMORY_LIMIT_MB, policy=MEMORY_LIMIT_POLICY,
+                               window_days=FALLBACK_WINDOW_DAYS)
+        else:
+            load_params['limit'] = limit
+        version = collection_version(collection, **load_params)
+
+        df = load_snapshot(SNAPSHOT_DIR, version, mmap=mmap)
+        if df is not None:
+            logger.info(f"Datos cargados desde el snapshot local: {len(df):,} filas")
+            memory_report(df)
+            return df
+
+    if streaming and partitions > 1:
+        df = parallel_load_from_collection(collection, partitions, query=query)
+    elif streaming:
+        df = stream_data_from_collection(collection, query=query)
+    else:
+        df = load_data_from_collection(collection, limit=limit, batch_size=batch_size, query=query)
+
+    # El dataset se guarda ordenado por fecha para filtrar rangos por búsqueda binaria
+    df = sort_by_transaction_time(df)
+
+    if use_snapshot:
+        try:
+            save_snapshot(df, SNAPSHOT_DIR, version)
+            if mmap:
+                # Este proceso también usa la copia compartida en lugar de la privada
+                df = load_snapshot(SNAPSHOT_DIR, version, mmap=True)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el snapshot local: {str(e)}")
+
+    memory_report(df)
+    return df
+
+def load_data_from_mongodb(limit=MONGODB_LOAD_LIMIT, batch_size=MONGODB_BATCH_SIZE,
+                           streaming=MONGODB_STREAMING, use_snapshot=SNAPSHOT_ENABLED,
+                           shared=SHARED_DATASET, partitions=MONGODB_LOAD_PARTITIONS, query=None):
+    """
+    Carga los datos desde MongoDB y realiza la preparación inicial necesaria.
+
+    Args:
+        limit: Número máximo de documentos a cargar (None o 0 para toda la colección)
+        batch_size: Documentos por lote que devuelve el cursor
+        streaming: Si leer la colección completa por bloques con techo de memoria
+                   (en ese caso se ignora `limit`)
+        use_snapshot: Si reutilizar el snapshot local cuando la colección no ha cambiado
+        shared: Si compartir una sola copia de solo lectura entre procesos: el primer
+                worker escribe el snapshot y todos lo adjuntan mapeado en memoria
+                (las estructuras derivadas del DataStore siguen siendo privadas de cada worker)
+        partitions: Rangos que se leen en paralelo en la carga por bloques (1 = un solo cursor)
+        query: Filtro adicional de los documentos que se cargan (p. ej. el límite
+               superior de la marca de agua del refresco incremental)
+    """
+    # Colección sobre el cliente compartido del proceso
+    collection = get_mongo_collection()
+
+    if shared:
+        with snapshot_lock(SNAPSHOT_DIR):
+            return _load_with_snapshot(collection, limit, batch_size, streaming,
+                                       use_snapshot=True, mmap=True, partitions=partitions, query=query)
+    return _load_with_snapshot(collection, limit, batch_size, streaming, use_snapshot,
+                               partitions=partitions, query=query)
+
+# Esquema compacto del DataFrame preparado: cadenas de baja cardinalidad como
+# categorías, banderas como bool real y montos en float32
+COLUMN_SCHEMA = {
+    'accountNumber': 'category',
+    'customerId': 'category',
+    'merchantName': 'category',
+    'acqCountry': 'category',
+    'merchantCountryCode': 'category',
+    'merchantCategoryCode': 'category',
+    'cardCVV': 'category',
+    'enteredCVV': 'category',
+    'cardPresent': 'bool',
+    'expirationDateKeyInMatch': 'bool',
+    'isFraud': 'int8',
+    'transactionAmount': 'float32',
+}
+
+# Columnas categóricas que se comparan entre sí y deben compartir categorías
+PAIRED_CATEGORICAL_COLUMNS = [
+    ('cardCVV', 'enteredCVV'),
+    ('acqCountry', 'merchantCountryCode'),
+]
+
+def _categorical_group(col):
+    """Columnas que deben compartir categorías con `col` (incluyéndola)"""
+    for pair in PAIRED_CATEGORICAL_COLUMNS:
+        if col in pair:
+            return pair
+    return (col,)
+
+def _as_text(series):
+    """Convierte los valores no nulos a texto para obtener categorías homogéneas"""
+    values = series.astype(object)
+    mask = values.notna()
+    values[mask] = values[mask].astype(str)
+    return values
+
+def apply_compact_schema(df):
+    """
+    Convierte las columnas del DataFrame a los tipos compactos de COLUMN_SCHEMA.
+    Las columnas pareadas reciben la unión de sus categorías para poder
+    compararse directamente.
+    """
+    done = set()
+    for col, dtype in COLUMN_SCHEMA.items():
+        if col not in df.columns or col in done:
+            continue
+
+        if dtype == 'category':
+            group = [c for c in _categorical_group(col) if c in df.columns]
+            texts = {c: _as_text(df[c]) for c in group}
+            categories = pd.Index(pd.unique(pd.concat(list(texts.values())).dropna()))
+            for c in group:
+                df[c] = pd.Categorical(texts[c], categories=categories)
+                done.add(c)
+        elif dtype == 'bool':
+            df[col] = df[col].fillna(False).astype(bool)
+        else:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+def concat_prepared(frames):
+    """
+    Concatena DataFrames preparados conservando las columnas categóricas:
+    antes de concatenar se unifican las categorías de cada columna (y de su
+    pareja), de lo contrario pandas las convertiría a objeto.
+    """
+    frames = [f for f in frames if len(f) > 0] or list(frames[:1])
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    # Copias superficiales para no modificar los DataFrames recibidos
+    frames = [f.copy(deep=False) for f in frames]
+    done = set()
+    for col in frames[0].columns:
+        if col in done or not isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            continue
+
+        group = [c for c in _categorical_group(col) if c in frames[0].columns]
+        dtypes = [f[c].dtype for f in frames for c in group]
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            done.update(group)
+            continue
+
+        # Se conservan las categorías existentes y se agregan las nuevas al final
+        categories = dtypes[0].categories
+        for dtype in dtypes[1:]:
+            categories = categories.append(dtype.categories.difference(categories, sort=False))
+        for f in frames:
+            for c in group:
+                f[c] = f[c].cat.set_categories(categories)
+        done.update(group)
+
+    return pd.concat(frames, ignore_index=True)
+
+def sort_by_transaction_time(df):
+    """
+    Ordena el DataFrame por transactionDateTime (las fechas nulas quedan al
+    inicio) para que un rango de fechas sea un bloque contiguo de filas.
+    Si ya está ordenado se retorna el mismo DataFrame, sin copiarlo.
+    """
+    if 'transactionDateTime' not in df.columns or len(df) < 2:
+        return df
+
+    timestamps = df['transactionDateTime'].to_numpy().view('i8')
+    if (timestamps[1:] >= timestamps[:-1]).all():
+        return df
+
+    order = np.argsort(timestamps, kind='stable')
+    return df.take(order).reset_index(drop=True)
+
+def memory_report(df):
+    """
+    Reporte de memoria por columna del DataFrame (tipo y MB, incluyendo los
+    objetos referenciados). También lo escribe en el log.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'memory_mb': usage / 1024 ** 2,
+    })
+    report.loc['TOTAL'] = ['', report['memory_mb'].sum()]
+
+    logger.info("Memoria por columna:\n" + report.to_string(float_format=lambda x: f"{x:.2f}"))
+    return report
+
+# Bits de la columna id_theft_flags: cada indicador de robo de identidad se
+# calcula una sola vez en prepare_data y después se consulta con un AND de bits
+CVV_MISMATCH = 1
+CARD_NOT_PRESENT = 2
+GEO_MISMATCH = 4
+EXP_DATE_MISMATCH = 8
+
+# Indicadores en el orden en que se muestran en el dashboard
+INDICATOR_FLAGS = [
+    ('CVV no coincide', CVV_MISMATCH),
+    ('Tarjeta no presente', CARD_NOT_PRESENT),
+    ('País diferente', GEO_MISMATCH),
+    ('Fecha exp. no coincide', EXP_DATE_MISMATCH),
+]
+
+# Prefijo de las llaves de los KPIs de cada indicador
+KPI_INDICATORS = {
+    CVV_MISMATCH: 'cvv_mismatch',
+    CARD_NOT_PRESENT: 'card_not_present',
+    GEO_MISMATCH: 'geo_mismatch',
+    EXP_DATE_MISMATCH: 'exp_date_mismatch',
+}
+
+# Posible robo de identidad: (CVV | fecha exp. | país) y tarjeta no presente
+IDENTITY_THEFT_ANY = CVV_MISMATCH | EXP_DATE_MISMATCH | GEO_MISMATCH
+
+def compute_indicator_flags(df):
+    """Calcula la máscara de bits uint8 con los cuatro indicadores de robo de identidad"""
+    flags = np.zeros(len(df), dtype=np.uint8)
+    flags[(df['cardCVV'] != df['enteredCVV']).to_numpy()] |= CVV_MISMATCH
+    flags[~df['cardPresent'].to_numpy(dtype=bool)] |= CARD_NOT_PRESENT
+    flags[(df['acqCountry'] != df['merchantCountryCode']).to_numpy()] |= GEO_MISMATCH
+    flags[~df['expirationDateKeyInMatch'].to_numpy(dtype=bool)] |= EXP_DATE_MISMATCH
+    return flags
+
+def get_indicator_flags(df):
+    """Máscara de bits del DataFrame (la calcula si aún no existe la columna)"""
+    if 'id_theft_flags' in df.columns:
+        return df['id_theft_flags'].to_numpy()
+    return compute_indicator_flags(df)
+
+def identity_theft_mask(flags):
+    """Máscara booleana de posibles casos de robo de identidad a partir de los bits"""
+    return ((flags & IDENTITY_THEFT_ANY) != 0) & ((flags & CARD_NOT_PRESENT) != 0)
+
+def _fraud_rate(fraud_cases, count):
+    """Tasa de fraude (%) de un grupo de `count` filas (0 si está vacío)"""
+    return fraud_cases / count * 100 if count > 0 else 0
+
+# Rangos de monto de las transacciones
+AMOUNT_BINS = [0, 50, 200, 500, 1000, float('inf')]
+AMOUNT_LABELS = ['0-50', '51-200', '201-500', '501-1000', '>1000']
+
 def prepare_data(df):
     """
     Prepara los datos para el análisis, realizando transformaciones y limpieza necesarias.
@@ -40,7 +747,8 @@ def prepare_data(df):
     # Asegurarse que la columna transactionDateTime sea de tipo datetime
     if 'transactionDateTime' in df.columns:
         df['transactionDateTime'] = pd.to_datetime(df['transactionDateTime'])
-        df['transaction_date'] = df['transactionDateTime'].dt.date
+        # Fecha sin hora como datetime64 (más compacta que objetos date)
+        df['transaction_date'] = df['transactionDateTime'].dt.normalize()
     
     # Asegurarse que la columna isFraud sea numérica (0 o 1)
     if 'isFraud' in df.columns:
@@ -59,125 +767,229 @@ def prepare_data(df):
 
     # Crear columna de monto por rangos para análisis
     if 'transactionAmount' in df.columns:
-        df['amount_range'] = pd.cut(
-            df['transactionAmount'], 
-            bins=[0, 50, 200, 500, 1000, float('inf')],
-            labels=['0-50', '51-200', '201-500', '501-1000', '>1000']
-        )
+        df['amount_range'] = pd.cut(df['transactionAmount'], bins=AMOUNT_BINS, labels=AMOUNT_LABELS)
+
+    # Tipos compactos para reducir memoria y acelerar las comparaciones
+    apply_compact_schema(df)
+
+    # Indicadores de robo de identidad empaquetados en una máscara de bits
+    if all(col in df.columns for col in ['cardCVV', 'enteredCVV', 'cardPresent', 'acqCountry',
+                                         'merchantCountryCode', 'expirationDateKeyInMatch']):
+        df['id_theft_flags'] = compute_indicator_flags(df)
     
     return df
 
 # Funciones para calcular KPIs relacionados con robo de identidad
 def calculate_identity_theft_kpis(df):
+    return compute_dashboard_data(df, include_viz=False)[0]
+
+# Función para preparar datos para visualizaciones
+def prepare_visualization_data(df):
+    return compute_dashboard_data(df)[1]
+
+def _group_codes(df, col):
+    """Códigos (desplazados en 1; 0 = nulo) y tipo categórico de una columna para np.bincount"""
+    series = df[col]
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    return series.cat.codes.to_numpy().astype(np.intp) + 1, series.dtype
+
+def _all_categories(dtype):
+    """Categorical con cada categoría una vez, en el orden de sus códigos"""
+    return pd.Categorical.from_codes(np.arange(len(dtype.categories)), dtype=dtype)
+
+def _amount_codes(df):
+    """Códigos del rango de monto sin agregar la columna al DataFrame"""
+    if 'amount_range' in df.columns:
+        return _group_codes(df, 'amount_range')
+    amount_range = pd.cut(df['transactionAmount'], bins=AMOUNT_BINS, labels=AMOUNT_LABELS)
+    return amount_range.cat.codes.to_numpy().astype(np.intp) + 1, amount_range.dtype
+
+def _day_codes(df):
+    """Índice del día de cada fila (desde el primero) y los días como datetime64; -1 = sin fecha"""
+    if 'transaction_date' in df.columns:
+        dates = df['transaction_date'].to_numpy()
+    else:
+        dates = pd.to_datetime(df['transactionDateTime']).dt.normalize().to_numpy()
+    valid = ~np.isnat(dates)
+    if not valid.any():
+        return np.full(len(dates), -1, dtype=np.intp), np.array([], dtype='datetime64[ns]')
+
+    unit = np.datetime_data(dates.dtype)[0]
+    days = dates.view('i8') // int(np.timedelta64(1, 'D') / np.timedelta64(1, unit))
+    first = days[valid].min()
+    codes = np.where(valid, days - first, -1).astype(np.intp)
+    return codes, (first + np.arange(codes.max() + 1)).astype('datetime64[D]').astype('datetime64[ns]')
+
+def _group_table(key, groups, present, transactions, fraud):
+    """Tabla transactions / fraud_cases / fraud_rate de los grupos presentes"""
+    table = pd.DataFrame({
+        key: groups[present],
+        'transactions': transactions[present],
+        'fraud_cases': fraud[present],
+    })
+    table['fraud_rate'] = table['fraud_cases'] / table['transactions'] * 100
+    return table
+
+def compute_dashboard_data(df, include_viz=True, weights=None):
+    """
+    Calcula los KPIs y todos los datos de los gráficos en una sola pasada
+    sobre los arreglos NumPy de las columnas. Los agrupamientos son np.bincount
+    sobre códigos categóricos y los indicadores salen de un histograma de la
+    máscara de bits, por lo que no se crean máscaras ni copias por indicador.
+    No modifica el DataFrame recibido.
+
+    Con `weights` (peso de cada fila de una muestra) los conteos son
+    estimaciones ponderadas en lugar de conteos exactos.
+
+    Returns:
+        tuple: (kpis, viz_data); viz_data es None si include_viz=False
+    """
+    n = len(df) if weights is None else weights.sum()
+    flags = get_indicator_flags(df)
+    is_fraud = df['isFraud'].to_numpy()
+
+    # Histograma de las 16 combinaciones de bits x fraude: filas y fraudes por combinación
+    histogram = np.bincount(flags.astype(np.intp) * 2 + is_fraud, weights=weights, minlength=32).reshape(16, 2)
+    flag_rows = histogram.sum(axis=1)
+    flag_fraud = histogram[:, 1]
+    combos = np.arange(16)
+
+    def indicator_totals(selected):
+        return flag_rows[selected].sum(), flag_fraud[selected].sum()
+
     kpis = {}
-    
-    # Total de transacciones
-    kpis['total_transactions'] = len(df)
-    
-    # Total de transacciones fraudulentas
-    kpis['fraud_transactions'] = df['isFraud'].sum()
-    
-    # Tasa de fraude
+    kpis['total_transactions'] = n
+    kpis['fraud_transactions'] = flag_fraud.sum()
     kpis['fraud_rate'] = kpis['fraud_transactions'] / kpis['total_transactions'] * 100
-    
-    # Casos de discrepancia de CVV (posible indicador de robo de identidad)
-    cvv_mismatch = df['cardCVV'] != df['enteredCVV']
-    kpis['cvv_mismatch_count'] = cvv_mismatch.sum()
-    kpis['cvv_mismatch_fraud_rate'] = df[cvv_mismatch]['isFraud'].mean() * 100 if cvv_mismatch.sum() > 0 else 0
-    
-    # Casos de tarjeta no presente físicamente (mayor riesgo de robo de identidad)
-    card_not_present = ~df['cardPresent']
-    kpis['card_not_present_count'] = card_not_present.sum()
-    kpis['card_not_present_fraud_rate'] = df[card_not_present]['isFraud'].mean() * 100 if card_not_present.sum() > 0 else 0
-    
-    # Discrepancia geográfica (país de adquisición vs país del comerciante)
-    geo_mismatch = df['acqCountry'] != df['merchantCountryCode']
-    kpis['geo_mismatch_count'] = geo_mismatch.sum()
-    kpis['geo_mismatch_fraud_rate'] = df[geo_mismatch]['isFraud'].mean() * 100 if geo_mismatch.sum() > 0 else 0
-    
-    # Fecha de expiración no coincide
-    exp_date_mismatch = ~df['expirationDateKeyInMatch']
-    kpis['exp_date_mismatch_count'] = exp_date_mismatch.sum()
-    kpis['exp_date_mismatch_fraud_rate'] = df[exp_date_mismatch]['isFraud'].mean() * 100 if exp_date_mismatch.sum() > 0 else 0
-    
-    # Estimación de casos de robo de identidad (combinación de factores)
-    identity_theft_indicators = (cvv_mismatch | exp_date_mismatch | geo_mismatch) & card_not_present
-    kpis['potential_identity_theft_count'] = identity_theft_indicators.sum()
+
+    indicator_rows = {}
+    for flag, key in KPI_INDICATORS.items():
+        count, fraud_cases = indicator_totals((combos & flag) != 0)
+        indicator_rows[flag] = (count, fraud_cases)
+        kpis[f'{key}_count'] = count
+        kpis[f'{key}_fraud_rate'] = _fraud_rate(fraud_cases, count)
+
+    kpis['potential_identity_theft_count'] = indicator_totals(identity_theft_mask(combos))[0]
     kpis['potential_identity_theft_rate'] = kpis['potential_identity_theft_count'] / kpis['total_transactions'] * 100
-    
-    return kpis
 
-# Función para preparar datos para visualizaciones
-def prepare_visualization_data(df):
+    if not include_viz:
+        return kpis, None
+
     viz_data = {}
-    
-    # Tendencia temporal de fraudes
-    if 'transaction_date' not in df.columns:
-        df['transaction_date'] = pd.to_datetime(df['transactionDateTime']).dt.date
-    
-    fraud_trend = df.groupby('transaction_date').agg(
-        transactions=('accountNumber', 'count'),
-        fraud_cases=('isFraud', 'sum')
-    ).reset_index()
-    fraud_trend['fraud_rate'] = fraud_trend['fraud_cases'] / fraud_trend['transactions'] * 100
-    viz_data['fraud_trend'] = fraud_trend
-    
+    # Estado de cada fila en 2 bits: fraude y accountNumber no nulo (como en los
+    # groupby originales, las transacciones cuentan el accountNumber no nulo)
+    has_account = df['accountNumber'].notna().to_numpy()
+    state = is_fraud.astype(np.intp) * 2 + has_account
+
+    def grouped(codes, size):
+        """Filas, transacciones y fraudes por código con un solo bincount"""
+        counts = np.bincount(codes * 4 + state, weights=weights, minlength=size * 4).reshape(size, 4)
+        return counts.sum(axis=1), counts[:, 1] + counts[:, 3], counts[:, 2] + counts[:, 3]
+
+    # Tendencia temporal de fraudes (los días sin fecha no forman grupo)
+    day_codes, days = _day_codes(df)
+    rows, transactions, fraud_cases = grouped(day_codes + 1, len(days) + 1)
+    viz_data['fraud_trend'] = _group_table('transaction_date', days, rows[1:] > 0,
+                                           transactions[1:], fraud_cases[1:])
+
     # Distribución geográfica de fraudes
-    fraud_by_country = df[df['isFraud'] == True].groupby('merchantCountryCode').size().reset_index(name='fraud_count')
-    fraud_by_country = fraud_by_country.sort_values('fraud_count', ascending=False).head(10)
-    viz_data['fraud_by_country'] = fraud_by_country
-    
-    # Categorías de comercios con mayor tasa de fraude
-    merchant_fraud = df.groupby('merchantCategoryCode').agg(
-        transactions=('accountNumber', 'count'),
-        fraud_cases=('isFraud', 'sum')
-    ).reset_index()
-    merchant_fraud['fraud_rate'] = merchant_fraud['fraud_cases'] / merchant_fraud['transactions'] * 100
-    merchant_fraud = merchant_fraud.sort_values('fraud_rate', ascending=False).head(10)
-    viz_data['merchant_fraud'] = merchant_fraud
-    
-    # Distribución por montos de transacción
-    if 'amount_range' not in df.columns:
-        df['amount_range'] = pd.cut(
-            df['transactionAmount'], 
-            bins=[0, 50, 200, 500, 1000, float('inf')],
-            labels=['0-50', '51-200', '201-500', '501-1000', '>1000']
-        )
-    
-    amount_dist = df.groupby('amount_range').agg(
-        transactions=('accountNumber', 'count'),
-        fraud_cases=('isFraud', 'sum')
-    ).reset_index()
-    amount_dist['fraud_rate'] = amount_dist['fraud_cases'] / amount_dist['transactions'] * 100
-    viz_data['amount_dist'] = amount_dist
-    
+    codes, dtype = _group_codes(df, 'merchantCountryCode')
+    fraud_count = grouped(codes, len(dtype.categories) + 1)[2][1:]
+    present = fraud_count > 0
+    fraud_by_country = pd.DataFrame({
+        'merchantCountryCode': _all_categories(dtype)[present],
+        'fraud_count': fraud_count[present],
+    })
+    viz_data['fraud_by_country'] = top_k(fraud_by_country, 'fraud_count')
+
+    # Categorías de comercios con mayor tasa de fraude (los empates quedan en el
+    # orden de las categorías, como sort_values(kind='stable'))
+    codes, dtype = _group_codes(df, 'merchantCategoryCode')
+    rows, transactions, fraud_cases = grouped(codes, len(dtype.categories) + 1)
+    merchant_fraud = _group_table('merchantCategoryCode', _all_categories(dtype), rows[1:] > 0,
+                                  transactions[1:], fraud_cases[1:])
+    viz_data['merchant_fraud'] = top_k(merchant_fraud, 'fraud_rate')
+
+    # Distribución por montos de transacción (todos los rangos, aunque estén vacíos)
+    codes, dtype = _amount_codes(df)
+    rows, transactions, fraud_cases = grouped(codes, len(dtype.categories) + 1)
+    viz_data['amount_dist'] = _group_table('amount_range', _all_categories(dtype), np.ones(len(dtype.categories), dtype=bool),
+                                           transactions[1:], fraud_cases[1:])
+
     # Indicadores de robo de identidad
-    id_theft_indicators = pd.DataFrame({
-        'indicador': [
-            'CVV no coincide', 
-            'Tarjeta no presente', 
-            'País diferente', 
-            'Fecha exp. no coincide'
-        ],
-        'casos': [
-            (df['cardCVV'] != df['enteredCVV']).sum(),
-            (~df['cardPresent']).sum(),
-            (df['acqCountry'] != df['merchantCountryCode']).sum(),
-            (~df['expirationDateKeyInMatch']).sum()
-        ],
-        'tasa_fraude': [
-            df[df['cardCVV'] != df['enteredCVV']]['isFraud'].mean() * 100 if (df['cardCVV'] != df['enteredCVV']).sum() > 0 else 0,
-            df[~df['cardPresent']]['isFraud'].mean() * 100 if (~df['cardPresent']).sum() > 0 else 0,
-            df[df['acqCountry'] != df['merchantCountryCode']]['isFraud'].mean() * 100 if (df['acqCountry'] != df['merchantCountryCode']).sum() > 0 else 0,
-            df[~df['expirationDateKeyInMatch']]['isFraud'].mean() * 100 if (~df['expirationDateKeyInMatch']).sum() > 0 else 0
-        ]
+    viz_data['id_theft_indicators'] = pd.DataFrame({
+        'indicador': [name for name, _ in INDICATOR_FLAGS],
+        'casos': [indicator_rows[flag][0] for _, flag in INDICATOR_FLAGS],
+        'tasa_fraude': [_fraud_rate(indicator_rows[flag][1], indicator_rows[flag][0]) for _, flag in INDICATOR_FLAGS]
     })
-    viz_data['id_theft_indicators'] = id_theft_indicators
-    
-    return viz_data
+
+    return kpis, viz_data
+
+# Dimensiones disponibles para el desglose de KPIs por grupo
+BREAKDOWN_DIMENSIONS = {
+    'merchantCountryCode': 'País del comercio',
+    'merchantCategoryCode': 'Categoría de comercio',
+    'amount_range': 'Rango de monto',
+    'cardPresent': 'Tarjeta presente',
+}
+
+def breakdown_columns(dimension):
+    """Columnas del dataset preparado que usa calculate_kpis_by(df, dimension)"""
+    return [dimension, 'id_theft_flags', 'isFraud']
+
+def calculate_kpis_by(df, dimension):
+    """
+    Calcula los KPIs de calculate_identity_theft_kpis para cada valor de
+    `dimension` en una sola pasada: un np.bincount de (grupo, bits de
+    indicadores, fraude) del que salen todos los grupos a la vez, por lo que
+    el costo no depende del número de grupos.
+
+    Returns:
+        DataFrame con una fila por grupo presente (columna `dimension`) y una
+        columna por cada KPI
+    """
+    if dimension not in BREAKDOWN_DIMENSIONS:
+        raise ValueError(f"Dimensión no soportada para el desglose: {dimension}")
+
+    if dimension == 'amount_range':
+        codes, dtype = _amount_codes(df)
+    else:
+        codes, dtype = _group_codes(df, dimension)
+    flags = get_indicator_flags(df)
+    is_fraud = df['isFraud'].to_numpy()
+
+    # Histograma grupo x combinación de bits x fraude (el grupo 0 son los nulos)
+    size = len(dtype.categories) + 1
+    histogram = np.bincount(codes * 32 + flags.astype(np.intp) * 2 + is_fraud,
+                            minlength=size * 32).reshape(size, 16, 2)[1:]
+    total = histogram.sum(axis=(1, 2))
+    present = total > 0
+    histogram = histogram[present]
+    total = total[present]
+    combos = np.arange(16)
+
+    def rate(fraud_cases, count):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(count > 0, fraud_cases / count * 100, 0.0)
+
+    table = pd.DataFrame({dimension: _all_categories(dtype)[present]})
+    table['total_transactions'] = total
+    table['fraud_transactions'] = histogram[:, :, 1].sum(axis=1)
+    table['fraud_rate'] = table['fraud_transactions'] / total * 100
+
+    for flag, key in KPI_INDICATORS.items():
+        selected = histogram[:, (combos & flag) != 0]
+        table[f'{key}_count'] = selected.sum(axis=(1, 2))
+        table[f'{key}_fraud_rate'] = rate(selected[:, :, 1].sum(axis=1), table[f'{key}_count'].to_numpy())
+
+    table['potential_identity_theft_count'] = histogram[:, identity_theft_mask(combos)].sum(axis=(1, 2))
+    table['potential_identity_theft_rate'] = table['potential_identity_theft_count'] / total * 100
+    return table
 
 if __name__ == "__main__":
     # Test de carga de datos
     df = load_data_from_mongodb()
     print(f"Datos cargados: {len(df)} registros")
     print(f"Columnas: {df.columns.tolist()}")
+    print(memory_report(df).to_string(float_format=lambda x: f"{x:.2f}"))
@@ -0,0 +1,364 @@
+"""
+Módulo para mantener el dataset en memoria y refrescarlo de forma incremental
+con las transacciones nuevas que llegan a MongoDB.
+"""
+import threading
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import latest_watermark, load_new_documents, concat_prepared, sort_by_transaction_time
+from filter_index import FilterIndex
+from kpi_cube import AggregateCube
+from distinct_sketch import DistinctSketches
+from quantile_sketch import AmountQuantiles
+from live_kpis import SlidingWindowKPIs
+from sampling import StratifiedSample
+from heavy_hitters import SpaceSaving
+from config import (
+    REFRESH_INTERVAL_SECONDS, REFRESH_WATERMARK_FIELD, REFRESH_MAX_BATCH, REFRESH_GROWTH_FACTOR,
+    SAMPLE_MODE_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Dataset vigente y sus estructuras derivadas en un mismo instante
+StoreState = namedtuple('StoreState', ['version', 'df', 'index', 'cube', 'distinct', 'quantiles', 'sample'])
+
+def _recode(values, dtype):
+    """
+    Códigos de la categórica `values` en las categorías de `dtype`; las que
+    faltan se agregan al final, como en concat_prepared. Retorna los códigos
+    y el tipo resultante (el mismo `dtype` si no hubo categorías nuevas).
+    """
+    categories = values.cat.categories
+    positions = dtype.categories.get_indexer(categories)
+    missing = positions < 0
+    if missing.any():
+        dtype = pd.CategoricalDtype(dtype.categories.append(categories[missing]), ordered=dtype.ordered)
+        positions = dtype.categories.get_indexer(categories)
+    codes = values.cat.codes.to_numpy()
+    return np.where(codes >= 0, positions[codes], -1), dtype
+
+class ColumnBuffers:
+    """
+    Columnas de un dataset en arreglos NumPy con capacidad de sobra (los
+    códigos en las categóricas), para agregar lotes en tiempo amortizado
+    proporcional al lote en lugar de copiar todo el dataset en cada uno.
+
+    Cada DataFrame que se arma son vistas de las primeras filas de los
+    arreglos; las filas nuevas se escriben después de ellas, de modo que los
+    DataFrames anteriores que siguen en uso no cambian. Cuando la capacidad
+    no alcanza se copian a arreglos `growth` veces más grandes.
+    """
+
+    def __init__(self, df, growth=REFRESH_GROWTH_FACTOR):
+        self.growth = growth
+        self.rows = len(df)
+        self.dtypes = {}
+        self.arrays = {}
+        capacity = max(int(self.rows * growth), self.rows + 1)
+        for col in df.columns:
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.cat.codes
+            self.dtypes[col] = df[col].dtype
+            self.arrays[col] = np.empty(capacity, dtype=values.dtype)
+            self.arrays[col][:self.rows] = values.to_numpy()
+        self.df = df
+
+    @classmethod
+    def supports(cls, df):
+        """True si todas las columnas son arreglos NumPy o categóricas"""
+        return all(isinstance(dtype, (np.dtype, pd.CategoricalDtype)) for dtype in df.dtypes)
+
+    def append(self, new_df):
+        """
+        Agrega las filas preparadas de `new_df` y retorna el nuevo DataFrame,
+        o None si sus columnas o tipos no son compatibles con los del dataset
+        """
+        if list(new_df.columns) != list(self.arrays):
+            return None
+        columns = {}
+        dtypes = {}
+        for col, dtype in self.dtypes.items():
+            values = new_df[col]
+            if isinstance(dtype, pd.CategoricalDtype):
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    return None
+                columns[col], dtypes[col] = _recode(values, dtype)
+            elif values.dtype == dtype:
+                columns[col], dtypes[col] = values.to_numpy(), dtype
+            else:
+                return None
+
+        rows = self.rows + len(new_df)
+        for col, values in columns.items():
+            array = self.arrays[col]
+            dtype = array.dtype
+            if isinstance(dtypes[col], pd.CategoricalDtype):
+                # Más categorías pueden requerir códigos más anchos
+                dtype = np.promote_types(dtype, np.min_scalar_type(-len(dtypes[col].categories)))
+            if rows > len(array) or dtype != array.dtype:
+                # Arreglo nuevo: el anterior sigue respaldando los DataFrames previos
+                capacity = max(int(rows * self.growth), rows) if rows > len(array) else len(array)
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:self.rows] = array[:self.rows]
+                array = self.arrays[col] = grown
+            array[self.rows:rows] = values
+
+        self.rows = rows
+        self.dtypes = dtypes
+        data = {}
+        for col, dtype in dtypes.items():
+            array = self.arrays[col][:rows]
+            if isinstance(dtype, pd.CategoricalDtype):
+                array = pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+            data[col] = array
+        self.df = pd.DataFrame(data, copy=False)
+        return self.df
+
+class DataStore:
+    """
+    Contenedor del DataFrame vigente del dashboard. Las lecturas obtienen
+    siempre un DataFrame completo y consistente; las escrituras arman el
+    nuevo dataset fuera del candado de lectura (serializadas entre sí) y
+    solo reemplazan las referencias bajo él.
+
+    El DataFrame se mantiene ordenado por transactionDateTime y junto a él
+    se guardan su FilterIndex, su cubo de agregados, los sketches de
+    conteos distintos y de percentiles de monto y (en modo aproximado) una
+    muestra estratificada. Los KPIs de ventanas deslizantes y el
+    resumen de comercios con más fraudes se actualizan con cada lote
+    agregado. Los lotes se escriben en ColumnBuffers, sin copiar el
+    dataset completo en cada refresco.
+    """
+
+    def __init__(self, df=None):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._df = None
+        self._index = None
+        self._cube = None
+        self._distinct = None
+        self._quantiles = None
+        self._sample = None
+        self.live = SlidingWindowKPIs()
+        self.fraud_merchants = SpaceSaving()
+        self._buffers = None
+        self.version = 0
+        self.load_error = None
+        if df is not None:
+            self.set(df)
+
+    @property
+    def df(self):
+        return self._df
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def cube(self):
+        return self._cube
+
+    @property
+    def distinct(self):
+        return self._distinct
+
+    @property
+    def quantiles(self):
+        return self._quantiles
+
+    @property
+    def sample(self):
+        return self._sample
+
+    def snapshot(self):
+        """DataFrame vigente y su índice, leídos de forma consistente"""
+        with self._lock:
+            return self._df, self._index
+
+    def state(self):
+        """Dataset vigente, su versión y sus estructuras derivadas, leídos de forma consistente"""
+        with self._lock:
+            return StoreState(self.version, self._df, self._index, self._cube, self._distinct,
+                              self._quantiles, self._sample)
+
+    def is_ready(self):
+        """True cuando ya se cargó el dataset inicial"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """Espera a que el dataset inicial esté cargado"""
+        return self._ready.wait(timeout)
+
+    def set(self, df):
+        """Reemplaza el dataset completo y lo marca como listo"""
+        with self._write_lock:
+            df = sort_by_transaction_time(df)
+            index = FilterIndex(df)
+            cube = AggregateCube(df)
+            distinct = DistinctSketches(df)
+            quantiles = AmountQuantiles(df)
+            sample = StratifiedSample.build(df) if SAMPLE_MODE_ENABLED else None
+            with self._lock:
+                self._df = df
+                self._index = index
+                self._cube = cube
+                self._distinct = distinct
+                self._quantiles = quantiles
+                self._sample = sample
+                self.version += 1
+                self.load_error = None
+            self.live.reset()
+            self.live.add(df)
+            self._track_fraud_merchants(df, seed=True)
+        self._ready.set()
+
+    def mark_ready(self):
+        """Marca el store como listo sin dataset en memoria (motor 'mongo')"""
+        self._ready.set()
+
+    def set_error(self, error):
+        """Registra que la carga inicial falló"""
+        self.load_error = str(error)
+
+    def append(self, new_df):
+        """Agrega filas ya preparadas al final del dataset"""
+        if len(new_df) == 0:
+            return
+        # La copia del dataset y las estructuras derivadas se arman sin bloquear
+        # a los lectores, que siguen viendo la versión anterior hasta el reemplazo
+        with self._write_lock:
+            combined = self._append_rows(new_df)
+            # Normalmente las filas nuevas son posteriores y no hay que reordenar;
+            # en ese caso los bitmaps del índice solo se extienden
+            df = sort_by_transaction_time(combined)
+            previous = self._index if df is combined else None
+            index = FilterIndex(df, previous=previous)
+            cube = AggregateCube(df) if self._cube is None else self._cube.append(new_df)
+            distinct = DistinctSketches(df) if self._distinct is None else self._distinct.append(new_df)
+            quantiles = AmountQuantiles(df) if self._quantiles is None else self._quantiles.append(new_df)
+            sample = None
+            if SAMPLE_MODE_ENABLED:
+                sample = (self._sample.extended(new_df, df) if self._sample is not None and previous is not None
+                          else StratifiedSample.build(df))
+            with self._lock:
+                self._df = df
+                self._index = index
+                self._cube = cube
+                self._distinct = distinct
+                self._quantiles = quantiles
+                self._sample = sample
+                self.version += 1
+            self.live.add(new_df)
+            self._track_fraud_merchants(new_df)
+
+    def _append_rows(self, new_df):
+        """Dataset vigente con `new_df` al final, sin copiarlo completo en cada lote (ver ColumnBuffers)"""
+        if self._df is None or len(self._df) == 0:
+            return new_df.reset_index(drop=True)
+
+        if self._buffers is None or self._buffers.df is not self._df:
+            # Primera vez o el dataset se reemplazó/reordenó: se copia una vez con capacidad de sobra
+            if not ColumnBuffers.supports(self._df):
+                return concat_prepared([self._df, new_df])
+            self._buffers = ColumnBuffers(self._df)
+        combined = self._buffers.append(new_df)
+        if combined is None:
+            self._buffers = None
+            return concat_prepared([self._df, new_df])
+        return combined
+
+    def _track_fraud_merchants(self, df, seed=False):
+        """
+        Cuenta en el resumen Space-Saving los comercios de las transacciones
+        fraudulentas: con `seed` (dataset completo) se reemplaza por los
+        conteos exactos y si no se agrega el lote
+        """
+        if 'merchantName' not in df.columns:
+            if seed:
+                self.fraud_merchants.reset()
+            return
+        merchants = df['merchantName'][df['isFraud'].to_numpy() != 0]
+        if seed:
+            self.fraud_merchants.seed(merchants)
+        else:
+            self.fraud_merchants.update(merchants)
+
+class DataRefresher:
+    """
+    Hilo en segundo plano que consulta la colección por documentos con
+    `field` mayor que la última marca de agua vista, los prepara y los
+    agrega al DataStore.
+
+    La colección se recibe como parámetro, por lo que puede probarse con un
+    mongod local o con una colección de mongomock.
+    """
+
+    def __init__(self, store, collection, field=REFRESH_WATERMARK_FIELD,
+                 interval=REFRESH_INTERVAL_SECONDS, max_batch=REFRESH_MAX_BATCH):
+        self.store = store
+        self.collection = collection
+        self.field = field
+        self.interval = interval
+        self.max_batch = max_batch
+        self.watermark = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def prime(self):
+        """
+        Registra la marca de agua actual de la colección. Debe llamarse antes
+        de la carga inicial, que se acota con initial_query(): los documentos
+        insertados durante ella llegan solo por el refresco, sin perderse ni
+        duplicarse.
+        """
+        self.watermark = latest_watermark(self.collection, self.field)
+        return self.watermark
+
+    def initial_query(self):
+        """Filtro de la carga inicial: los documentos hasta la marca de agua registrada por prime()"""
+        # Los documentos sin el campo nunca los lee el refresco, así que quedan en la carga inicial
+        if self.watermark is None:
+            return {self.field: None}
+        return {'$or': [{self.field: {'$lte': self.watermark}}, {self.field: None}]}
+
+    def poll_once(self):
+        """Agrega al DataStore los documentos nuevos y retorna cuántos fueron"""
+        new_df, self.watermark = load_new_documents(
+            self.collection, self.field, self.watermark, limit=self.max_batch
+        )
+        if len(new_df) > 0:
+            self.store.append(new_df)
+            logger.info(f"Refresco incremental: {len(new_df):,} transacciones nuevas")
+        return len(new_df)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                # Si el lote vino lleno puede haber más documentos pendientes
+                if self.poll_once() >= self.max_batch:
+                    continue
+            except Exception as e:
+                logger.error(f"Error en el refresco incremental: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Inicia el hilo de refresco"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="data-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Detiene el hilo de refresco"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,129 @@
+"""
+Conteos de clientes y cuentas distintos con HyperLogLog. Cada celda
+(fecha, país del comercio, categoría) guarda sus registros en forma
+dispersa, como pares (registro, rango) con el rango máximo, y los registros
+de cualquier combinación de filtros se obtienen con el máximo de los pares
+de las celdas seleccionadas. El error relativo típico es 1.04 / sqrt(2^p).
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data_loader import get_indicator_flags, identity_theft_mask, concat_prepared
+from kpi_cube import filter_mask
+from config import HLL_PRECISION
+
+logger = logging.getLogger(__name__)
+
+# Dimensiones de las celdas de los sketches (las de los filtros del dashboard)
+SKETCH_DIMENSIONS = ['transaction_date', 'merchantCountryCode', 'merchantCategoryCode']
+
+# Conteos distintos: nombre -> (columna contada, filas que cuentan: fraude o robo de identidad)
+DISTINCT_COUNTS = {
+    'fraud_customers': ('customerId', 'fraud'),
+    'id_theft_customers': ('customerId', 'id_theft'),
+    'fraud_accounts': ('accountNumber', 'fraud'),
+}
+
+def hash_values(series):
+    """Hash de 64 bits de cada valor y máscara de los valores no nulos"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Se calcula un hash por categoría y se reparte con los códigos
+        codes = series.cat.codes.to_numpy()
+        category_hashes = pd.util.hash_array(series.cat.categories.to_numpy(dtype=object))
+        return category_hashes[np.maximum(codes, 0)], codes >= 0
+    valid = series.notna().to_numpy()
+    hashes = pd.util.hash_array(series.astype(str).to_numpy(dtype=object))
+    return hashes, valid
+
+def _bit_length(values):
+    """Número de bits significativos de cada entero sin signo de 64 bits"""
+    # Cada mitad cabe exacta en un float64, por lo que frexp da su exponente exacto
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+def registers_and_ranks(hashes, precision=HLL_PRECISION):
+    """Registro (primeros `precision` bits) y rango (posición del primer 1 en el resto) de cada hash"""
+    suffix_bits = 64 - precision
+    registers = (hashes >> np.uint64(suffix_bits)).astype(np.uint16)
+    suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+    ranks = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+    return registers, ranks
+
+def hll_estimate(registers):
+    """Estimación de HyperLogLog con la corrección de conteo lineal para cardinalidades pequeñas"""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros > 0:
+        estimate = m * np.log(m / zeros)
+    return estimate
+
+def build_pairs(df, precision=HLL_PRECISION):
+    """Pares (celda, conteo, registro, rango máximo) de un DataFrame preparado"""
+    row_masks = {
+        'fraud': df['isFraud'].to_numpy() != 0,
+        'id_theft': identity_theft_mask(get_indicator_flags(df)),
+    }
+
+    frames = []
+    for code, (col, rows) in enumerate(DISTINCT_COUNTS.values()):
+        hashes, valid = hash_values(df[col])
+        keep = row_masks[rows] & valid
+        registers, ranks = registers_and_ranks(hashes[keep], precision)
+        frame = pd.DataFrame({dim: df[dim].to_numpy()[keep] for dim in SKETCH_DIMENSIONS})
+        for dim in SKETCH_DIMENSIONS:
+            if isinstance(df[dim].dtype, pd.CategoricalDtype):
+                frame[dim] = pd.Categorical(frame[dim], dtype=df[dim].dtype)
+        frame['sketch'] = np.int8(code)
+        frame['register'] = registers
+        frame['rank'] = ranks
+        frames.append(frame)
+
+    return merge_pairs(concat_prepared(frames))
+
+def merge_pairs(pairs):
+    """Un solo par por (celda, sketch, registro) con el rango máximo"""
+    return (pairs.groupby(SKETCH_DIMENSIONS + ['sketch', 'register'], observed=True, dropna=False, sort=False)['rank']
+            .max().reset_index())
+
+class DistinctSketches:
+    """
+    Sketches HyperLogLog por celda de los conteos de DISTINCT_COUNTS. Los
+    sketches son mezclables: agregar filas solo agrega pares.
+    """
+
+    def __init__(self, df=None, pairs=None, precision=HLL_PRECISION):
+        self.precision = precision
+        self.pairs = pairs if pairs is not None else build_pairs(df, precision)
+        logger.info(f"Sketches de conteos distintos: {len(self.pairs):,} pares")
+
+    @property
+    def relative_error(self):
+        """Error relativo típico (una desviación estándar) de las estimaciones"""
+        return 1.04 / np.sqrt(2 ** self.precision)
+
+    def append(self, new_df):
+        """Nuevos sketches con las filas de `new_df` agregadas"""
+        if len(new_df) == 0:
+            return self
+        # Los pares de celdas ya existentes se mezclan con el máximo
+        pairs = merge_pairs(concat_prepared([self.pairs, build_pairs(new_df, self.precision)]))
+        return DistinctSketches(pairs=pairs, precision=self.precision)
+
+    def estimate(self, start_date, end_date, countries, merchant_categories):
+        """Conteos distintos estimados para los filtros: {nombre: conteo}"""
+        pairs = self.pairs
+        mask = filter_mask(pairs, start_date, end_date, countries, merchant_categories)
+        m = 2 ** self.precision
+
+        # Registros de todos los sketches en un solo arreglo (sketch * m + registro)
+        registers = np.zeros(len(DISTINCT_COUNTS) * m, dtype=np.uint8)
+        slots = pairs['sketch'].to_numpy()[mask].astype(np.intp) * m + pairs['register'].to_numpy()[mask]
+        np.maximum.at(registers, slots, pairs['rank'].to_numpy()[mask])
+
+        return {name: int(round(hll_estimate(registers[code * m:(code + 1) * m])))
+                for code, name in enumerate(DISTINCT_COUNTS)}
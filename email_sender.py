@@ -11,6 +11,9 @@ from typing import Optional, List, Dict, Any
 import logging
 import tempfile
 
+from data_loader import get_indicator_flags, CVV_MISMATCH, CARD_NOT_PRESENT, GEO_MISMATCH, EXP_DATE_MISMATCH
+from config import RISK_HIGH_THRESHOLD, RISK_MEDIUM_THRESHOLD
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,11 +52,15 @@ class EmailAlertSender:
         
         Args:
             alerts_df: DataFrame con las alertas de riesgo
-            summary_stats: Diccionario con estadísticas del dashboard
+            summary_stats: Diccionario con estadísticas del dashboard (y el umbral
+                           vigente de alto riesgo en 'high_risk_threshold')
             
         Returns:
             str: Contenido HTML del reporte
         """
+        high_risk_threshold = summary_stats.get('high_risk_threshold', RISK_HIGH_THRESHOLD)
+        medium_risk_threshold = min(RISK_MEDIUM_THRESHOLD, high_risk_threshold)
+
         html_content = f"""
         <!DOCTYPE html>
         <html>
@@ -139,18 +146,23 @@ class EmailAlertSender:
                         <tbody>
             """
             
-            for _, row in alerts_df.iterrows():
-                risk_class = "risk-high" if row.get('risk_score', 0) > 5 else "risk-medium" if row.get('risk_score', 0) > 3 else "risk-low"
+            # Máscara de bits de indicadores (se calcula si las alertas no la traen)
+            flags = get_indicator_flags(alerts_df)
+            
+            for (_, row), row_flags in zip(alerts_df.iterrows(), flags):
+                risk_score = row.get('risk_score', 0)
+                risk_class = ("risk-high" if risk_score > high_risk_threshold
+                              else "risk-medium" if risk_score > medium_risk_threshold else "risk-low")
                 
                 # Generar badges de indicadores
                 indicators = []
-                if row.get('cardCVV') != row.get('enteredCVV'):
+                if row_flags & CVV_MISMATCH:
                     indicators.append('<span class="badge badge-cvv">CVV Incorrecto</span>')
-                if not row.get('expirationDateKeyInMatch', True):
+                if row_flags & EXP_DATE_MISMATCH:
                     indicators.append('<span class="badge badge-exp">Fecha Exp. Incorrecta</span>')
-                if row.get('acqCountry') != row.get('merchantCountryCode'):
+                if row_flags & GEO_MISMATCH:
                     indicators.append('<span class="badge badge-country">País Diferente</span>')
-                if not row.get('cardPresent', True):
+                if row_flags & CARD_NOT_PRESENT:
                     indicators.append('<span class="badge badge-card">Tarjeta No Presente</span>')
                 
                 html_content += f"""
@@ -372,4 +384,4 @@ def send_dashboard_alerts(alerts_df: pd.DataFrame, summary_stats: Dict[str, Any]
         return False
     except Exception as e:
         logger.error(f"Error al enviar alertas: {str(e)}")
-        return False
\ No newline at end of file
+        return False
\ No newline at end of file
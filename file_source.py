@@ -0,0 +1,152 @@
+"""
+Fuente de datos alternativa a MongoDB: lee el dataset desde archivos locales
+(JSON lines, CSV o Parquet). Los archivos grandes se dividen en rangos de
+bytes que se procesan en paralelo en un pool de procesos; cada bloque pasa
+por prepare_data y el resultado tiene la misma forma que la carga desde
+MongoDB.
+"""
+import io
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_loader import (
+    DASHBOARD_COLUMNS, COLUMN_SCHEMA, documents_to_frame, prepare_data, concat_prepared, sort_by_transaction_time
+)
+from config import DATA_FILE_PATHS, FILE_CHUNK_MB, FILE_LOAD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Formato según la extensión del archivo (el dump de Kaggle es transactions.txt en JSON lines)
+FILE_FORMATS = {
+    '.json': 'jsonl',
+    '.jsonl': 'jsonl',
+    '.txt': 'jsonl',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+}
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FILE_FORMATS:
+        raise ValueError(f"Formato de archivo no soportado: {path}")
+    return FILE_FORMATS[ext]
+
+def _line_ranges(path, chunk_bytes, start=0):
+    """
+    Divide el archivo en rangos de ~`chunk_bytes` alineados al final de línea,
+    de modo que cada rango contiene registros completos.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+# Tipo con el que read_csv lee cada tipo de COLUMN_SCHEMA. Las categóricas se
+# leen como texto ('414' aunque el bloque tenga nulos, no '414.0') y los
+# booleanos como booleanos con nulos; isFraud (int8) viene como True/False o 1/0.
+_CSV_READ_TYPES = {'category': str, 'bool': 'boolean', 'int8': 'boolean', 'float32': 'float64'}
+
+def _csv_dtypes():
+    """Tipos explícitos de read_csv para las columnas del dashboard, iguales en todos los bloques"""
+    dtypes = {col: _CSV_READ_TYPES[COLUMN_SCHEMA[col]] for col in DASHBOARD_COLUMNS if col in COLUMN_SCHEMA}
+    # La fecha se convierte en prepare_data
+    dtypes['transactionDateTime'] = str
+    return dtypes
+
+def _prepare_table(df):
+    """Deja solo las columnas del dashboard (agregando las faltantes) y prepara el bloque"""
+    return prepare_data(df.reindex(columns=list(DASHBOARD_COLUMNS)))
+
+def _parse_range(path, fmt, start, end, header=b''):
+    """Lee y prepara un rango de bytes del archivo (se ejecuta en un proceso del pool)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if fmt == 'jsonl':
+        lines = data.splitlines()
+        documents = (json.loads(line) for line in lines if line.strip())
+        return documents_to_frame(documents, capacity=len(lines))
+
+    # CSV: cada rango se parsea con la línea de encabezado del archivo
+    df = pd.read_csv(io.BytesIO(header + data), usecols=lambda col: col in DASHBOARD_COLUMNS, dtype=_csv_dtypes())
+    return _prepare_table(df)
+
+def _parse_row_group(path, row_group):
+    """Lee y prepara un row group de un archivo Parquet"""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    columns = [col for col in DASHBOARD_COLUMNS if col in parquet_file.schema_arrow.names]
+    return _prepare_table(parquet_file.read_row_group(row_group, columns=columns).to_pandas())
+
+def _plan_tasks(path, chunk_bytes):
+    """Lista de tareas (función, argumentos) en que se divide la lectura del archivo"""
+    fmt = _file_format(path)
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Se requiere pyarrow para leer archivos Parquet")
+        num_row_groups = pq.ParquetFile(path).num_row_groups
+        return [(_parse_row_group, (path, i)) for i in range(num_row_groups)]
+
+    header = b''
+    start = 0
+    if fmt == 'csv':
+        with open(path, 'rb') as f:
+            header = f.readline()
+        start = len(header)
+
+    return [(_parse_range, (path, fmt, s, e, header)) for s, e in _line_ranges(path, chunk_bytes, start)]
+
+def load_data_from_files(paths=DATA_FILE_PATHS, chunk_mb=FILE_CHUNK_MB, workers=FILE_LOAD_WORKERS):
+    """
+    Carga el dataset desde archivos locales. Cada archivo se divide en bloques
+    que se leen y preparan en paralelo; los bloques preparados se concatenan
+    en orden.
+
+    Args:
+        paths: Ruta o lista de rutas (.json/.jsonl/.txt en JSON lines, .csv, .parquet)
+        chunk_mb: Tamaño aproximado de cada rango de bytes en MB
+        workers: Procesos del pool (None = número de CPUs, 1 = sin pool)
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+
+    tasks = []
+    for path in paths:
+        tasks.extend(_plan_tasks(path, int(chunk_mb * 1024 ** 2)))
+    logger.info(f"Leyendo {len(paths)} archivo(s) en {len(tasks)} bloques")
+
+    if workers == 1 or len(tasks) <= 1:
+        frames = [func(*args) for func, args in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(func, *args) for func, args in tasks]
+            frames = [future.result() for future in futures]
+
+    if frames:
+        df = concat_prepared(frames)
+    else:
+        df = documents_to_frame(iter(()))
+    df = sort_by_transaction_time(df)
+
+    logger.info(f"Carga desde archivos completa: {len(df):,} filas, "
+                f"{df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+    return df
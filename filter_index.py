@@ -0,0 +1,116 @@
+"""
+Índices en memoria para resolver los filtros del dashboard sin recorrer ni
+copiar el DataFrame completo. El dataset se mantiene ordenado por
+transactionDateTime, de modo que un rango de fechas es un bloque contiguo de
+filas que se localiza con búsqueda binaria; los filtros de país y categoría
+se resuelven con bitmaps (un bitset empaquetado por valor).
+"""
+import numpy as np
+import pandas as pd
+
+# Columnas con un bitmap por valor para los filtros de selección múltiple
+BITMAP_INDEX_COLUMNS = ['merchantCountryCode', 'merchantCategoryCode']
+
+def _build_bitmaps(series):
+    """Un bitset empaquetado (np.packbits) por cada valor de la columna"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    codes = series.cat.codes.to_numpy()
+    return {value: np.packbits(codes == code) for code, value in enumerate(series.cat.categories)}
+
+def _extend_bitmaps(bitmaps, series, old_rows):
+    """
+    Bitmaps de la columna luego de agregar `series` al final de `old_rows`
+    filas ya indexadas, sin volver a recorrer las filas anteriores.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    codes = series.cat.codes.to_numpy()
+    code_of = {value: code for code, value in enumerate(series.cat.categories)}
+
+    # Solo el último byte de cada bitset puede estar incompleto
+    full_bytes, tail_bits = divmod(old_rows, 8)
+    empty = np.zeros((old_rows + 7) // 8, dtype=np.uint8)
+    extended = {}
+    for value in list(bitmaps) + [v for v in code_of if v not in bitmaps]:
+        old = bitmaps.get(value, empty)
+        new_bits = codes == code_of[value] if value in code_of else np.zeros(len(codes), dtype=bool)
+        tail = np.unpackbits(old[full_bytes:], count=tail_bits).astype(bool)
+        extended[value] = np.concatenate([old[:full_bytes], np.packbits(np.concatenate([tail, new_bits]))])
+    return extended
+
+class FilterIndex:
+    """
+    Índice de un DataFrame ordenado por transactionDateTime. Guarda los
+    timestamps como un arreglo int64 (vista de la columna, sin copia) y los
+    bitmaps de las columnas de BITMAP_INDEX_COLUMNS.
+
+    Si se recibe `previous`, el índice de las primeras filas del mismo
+    DataFrame, los bitmaps solo se extienden con las filas nuevas.
+    """
+
+    def __init__(self, df, columns=BITMAP_INDEX_COLUMNS, previous=None):
+        self.rows = len(df)
+        if 'transactionDateTime' in df.columns:
+            values = df['transactionDateTime'].to_numpy()
+            self.unit = np.datetime_data(values.dtype)[0]
+            self.timestamps = values.view('i8')
+        else:
+            self.unit = 'ns'
+            self.timestamps = None
+
+        self.bitmaps = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            if previous is not None and col in previous.bitmaps and previous.rows <= self.rows:
+                self.bitmaps[col] = _extend_bitmaps(previous.bitmaps[col], df[col].iloc[previous.rows:], previous.rows)
+            else:
+                self.bitmaps[col] = _build_bitmaps(df[col])
+
+    def _day_start(self, date, days=0):
+        """Inicio del día de `date` (más `days` días) como entero en la unidad de la columna"""
+        day = pd.Timestamp(pd.to_datetime(date).date()) + pd.Timedelta(days=days)
+        return day.as_unit(self.unit).value
+
+    def date_slice(self, start_date, end_date):
+        """
+        Rango [inicio, fin) de posiciones cuyas fechas (sin hora) están entre
+        `start_date` y `end_date`, ambas inclusivas. Sin fechas retorna todas
+        las filas.
+        """
+        if not (start_date and end_date) or self.timestamps is None:
+            return 0, self.rows
+
+        lower = self._day_start(start_date)
+        upper = self._day_start(end_date, days=1)
+        start = int(np.searchsorted(self.timestamps, lower, side='left'))
+        end = int(np.searchsorted(self.timestamps, upper, side='left'))
+        return start, max(start, end)
+
+    def select(self, start_date, end_date, filters=None):
+        """
+        Filas que cumplen el rango de fechas y los filtros {columna: valores}.
+        Dentro de una columna los valores se combinan con OR y entre columnas
+        con AND, solo sobre los bytes del rango de fechas.
+
+        Returns:
+            slice si solo hay filtro de fechas, o un arreglo de posiciones
+        """
+        start, end = self.date_slice(start_date, end_date)
+        active = {col: values for col, values in (filters or {}).items() if values}
+        if not active:
+            return slice(start, end)
+
+        first_byte, last_byte = start // 8, (end + 7) // 8
+        combined = None
+        for col, values in active.items():
+            col_bits = np.zeros(last_byte - first_byte, dtype=np.uint8)
+            for value in values:
+                bits = self.bitmaps[col].get(value)
+                if bits is not None:
+                    col_bits |= bits[first_byte:last_byte]
+            combined = col_bits if combined is None else combined & col_bits
+
+        positions = np.flatnonzero(np.unpackbits(combined)) + first_byte * 8
+        return positions[np.searchsorted(positions, start):np.searchsorted(positions, end)]
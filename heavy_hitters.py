@@ -0,0 +1,111 @@
+"""
+Top-K de los gráficos y comercios con más fraudes. Los top-K exactos usan
+np.argpartition sobre las tablas agrupadas (solo se ordenan los K elegidos)
+y los comercios con más fraudes se mantienen durante la ingesta con un
+resumen Space-Saving de memoria acotada, sin agrupar por merchantName.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import TOP_K, HEAVY_HITTERS_CAPACITY
+
+def top_k_positions(values, k=TOP_K):
+    """
+    Posiciones de los `k` mayores valores de mayor a menor. Los empates
+    conservan el orden original y los NaN quedan al final, como
+    sort_values(ascending=False, kind='stable').
+    """
+    keys = np.asarray(values, dtype=np.float64)
+    keys = np.where(np.isnan(keys), -np.inf, keys)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(keys):
+        # El k-ésimo mayor valor; de los empatados con él se toman los primeros
+        threshold = keys[np.argpartition(-keys, k - 1)[k - 1]]
+        above = np.flatnonzero(keys > threshold)
+        tied = np.flatnonzero(keys == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+        candidates.sort()
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.argsort(-keys[candidates], kind='stable')]
+
+def top_k(frame, column, k=TOP_K):
+    """Filas de `frame` con los `k` mayores valores de `column`, como sort_values(column, ascending=False).head(k)"""
+    return frame.iloc[top_k_positions(frame[column].to_numpy(), k)]
+
+class SpaceSaving:
+    """
+    Resumen Space-Saving de los elementos más frecuentes con a lo más
+    `capacity` contadores. Cada lote se cuenta de forma exacta y se combina
+    con el resumen como dos resúmenes mezclables: un elemento que no está en
+    un resumen lleno recibe su mínimo como cota. El conteo de cada elemento
+    sobreestima el real en a lo más su `error`.
+    """
+
+    def __init__(self, capacity=HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.float64)
+        self.errors = pd.Series(dtype=np.float64)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.counts = pd.Series(dtype=np.float64)
+            self.errors = pd.Series(dtype=np.float64)
+            self.total = 0.0
+
+    def seed(self, keys):
+        """
+        Reemplaza el resumen por los conteos exactos de `keys` (Series)
+        truncados a los `capacity` mayores, sin error; los lotes siguientes se
+        agregan con update()
+        """
+        counts = keys.value_counts(sort=False).astype(np.float64)
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(object)
+        counts = counts.iloc[top_k_positions(counts.to_numpy(), self.capacity)]
+        errors = pd.Series(0.0, index=counts.index)
+        with self._lock:
+            self.counts = counts
+            self.errors = errors
+            self.total = float(len(keys) - keys.isna().sum())
+
+    def update(self, keys, weights=None):
+        """Agrega un lote de elementos (Series), opcionalmente con un peso por elemento"""
+        weights = np.ones(len(keys)) if weights is None else np.asarray(weights, dtype=np.float64)
+        batch = pd.Series(weights, index=keys.index).groupby(keys, observed=True, sort=False).sum()
+        batch = batch[batch > 0]
+        if len(batch) == 0:
+            return
+        batch.index = batch.index.astype(object)
+
+        with self._lock:
+            # Cota de los elementos que el resumen pudo haber descartado
+            floor = self.counts.min() if len(self.counts) >= self.capacity else 0.0
+            keys = self.counts.index.union(batch.index)
+            counts = self.counts.reindex(keys, fill_value=floor) + batch.reindex(keys, fill_value=0.0)
+            errors = self.errors.reindex(keys, fill_value=floor)
+
+            keep = top_k_positions(counts.to_numpy(), self.capacity)
+            self.counts = counts.iloc[keep]
+            self.errors = errors.iloc[keep]
+            self.total += float(batch.sum())
+
+    def top(self, k=TOP_K):
+        """
+        Los `k` elementos con mayor conteo: DataFrame con el elemento, su
+        conteo estimado, su cota de error y el conteo garantizado.
+        """
+        with self._lock:
+            counts, errors = self.counts, self.errors
+        positions = top_k_positions(counts.to_numpy(), k)
+        return pd.DataFrame({
+            'key': counts.index[positions],
+            'count': counts.to_numpy()[positions].round().astype(np.int64),
+            'error': errors.to_numpy()[positions].round().astype(np.int64),
+            'guaranteed': (counts.to_numpy()[positions] - errors.to_numpy()[positions]).round().astype(np.int64),
+        })
@@ -0,0 +1,162 @@
+"""
+Cubo de agregados precalculado al cargar el dataset. Cada celda es una
+combinación (fecha, país del comercio, categoría, rango de monto) con sus
+conteos, fraudes y conteos por indicador de robo de identidad. Los KPIs y
+los datos de los gráficos se obtienen sumando las celdas que cumplen los
+filtros, sin recorrer las filas del dataset.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (
+    INDICATOR_FLAGS, KPI_INDICATORS, get_indicator_flags, identity_theft_mask, concat_prepared
+)
+from heavy_hitters import top_k
+
+logger = logging.getLogger(__name__)
+
+# Dimensiones del cubo (columnas del dataset preparado)
+CUBE_DIMENSIONS = ['transaction_date', 'merchantCountryCode', 'merchantCategoryCode', 'amount_range']
+
+def row_measures(df):
+    """Medidas por fila que se suman en cada celda"""
+    flags = get_indicator_flags(df)
+    is_fraud = df['isFraud'].to_numpy().astype(np.int64)
+
+    measures = {
+        'rows': np.ones(len(df), dtype=np.int64),
+        # Los gráficos cuentan transacciones con accountNumber, como el groupby original
+        'transactions': df['accountNumber'].notna().to_numpy().astype(np.int64),
+        'fraud': is_fraud,
+    }
+    # Cada indicador tiene medidas propias en cada celda
+    for flag, key in KPI_INDICATORS.items():
+        has_flag = ((flags & flag) != 0).astype(np.int64)
+        measures[f'{key}_count'] = has_flag
+        measures[f'{key}_fraud'] = has_flag * is_fraud
+    measures['id_theft_count'] = identity_theft_mask(flags).astype(np.int64)
+    return measures
+
+def _aggregate(frame):
+    """Agrupa por las dimensiones y suma las medidas (conserva fechas y montos nulos)"""
+    return frame.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=True).sum().reset_index()
+
+def build_cells(df):
+    """Celdas del cubo para un DataFrame preparado"""
+    frame = pd.DataFrame({col: df[col] for col in CUBE_DIMENSIONS})
+    for name, values in row_measures(df).items():
+        frame[name] = values
+    return _aggregate(frame)
+
+def filter_mask(frame, start_date, end_date, countries, merchant_categories):
+    """Máscara de las filas de `frame` (celdas con fecha, país y categoría) que cumplen los filtros"""
+    mask = np.ones(len(frame), dtype=bool)
+
+    if start_date and end_date:
+        dates = frame['transaction_date']
+        mask &= ((dates >= pd.Timestamp(pd.to_datetime(start_date).date())) &
+                 (dates <= pd.Timestamp(pd.to_datetime(end_date).date()))).to_numpy()
+    if countries:
+        mask &= frame['merchantCountryCode'].isin(countries).to_numpy()
+    if merchant_categories:
+        mask &= frame['merchantCategoryCode'].isin(merchant_categories).to_numpy()
+
+    return mask
+
+def _rate(numerator, denominator):
+    """Tasa (%) con la misma convención que data_loader._fraud_rate: 0 si no hay filas"""
+    return numerator / denominator * 100 if denominator > 0 else 0
+
+class AggregateCube:
+    """
+    Cubo de agregados de un DataFrame preparado. Las celdas son un DataFrame
+    pequeño con las dimensiones y las medidas sumadas; sus resultados son los
+    mismos que calculate_identity_theft_kpis y prepare_visualization_data.
+    """
+
+    def __init__(self, df=None, cells=None):
+        self.cells = cells if cells is not None else build_cells(df)
+        logger.info(f"Cubo de agregados: {len(self.cells):,} celdas")
+
+    def append(self, new_df):
+        """Nuevo cubo con las filas de `new_df` agregadas (solo se reagrupan las celdas)"""
+        if len(new_df) == 0:
+            return self
+        cells = concat_prepared([self.cells, build_cells(new_df)])
+        return AggregateCube(cells=_aggregate(cells))
+
+    def select(self, start_date, end_date, countries, merchant_categories):
+        """Celdas que cumplen los mismos filtros que get_filtered_data"""
+        return self.cells[filter_mask(self.cells, start_date, end_date, countries, merchant_categories)]
+
+    def dashboard(self, start_date, end_date, countries, merchant_categories):
+        """Retorna (kpis, viz_data) para los filtros"""
+        cells = self.select(start_date, end_date, countries, merchant_categories)
+        return kpis_from_cells(cells), viz_from_cells(cells)
+
+def kpis_from_cells(cells):
+    """Mismo resultado que data_loader.calculate_identity_theft_kpis, sumando celdas"""
+    return kpis_from_totals(cells.drop(columns=CUBE_DIMENSIONS).sum())
+
+def kpis_from_totals(totals):
+    """KPIs a partir de las medidas ya sumadas (Series indexada por nombre de medida)"""
+    kpis = {}
+
+    kpis['total_transactions'] = int(totals['rows'])
+    kpis['fraud_transactions'] = totals['fraud']
+    kpis['fraud_rate'] = kpis['fraud_transactions'] / kpis['total_transactions'] * 100
+
+    for key in KPI_INDICATORS.values():
+        kpis[f'{key}_count'] = totals[f'{key}_count']
+        kpis[f'{key}_fraud_rate'] = _rate(totals[f'{key}_fraud'], totals[f'{key}_count'])
+
+    kpis['potential_identity_theft_count'] = totals['id_theft_count']
+    kpis['potential_identity_theft_rate'] = kpis['potential_identity_theft_count'] / kpis['total_transactions'] * 100
+    return kpis
+
+def viz_from_cells(cells):
+    """Mismo resultado que data_loader.prepare_visualization_data, sumando celdas"""
+    viz_data = {}
+
+    # Tendencia temporal de fraudes
+    fraud_trend = cells.groupby('transaction_date').agg(
+        transactions=('transactions', 'sum'),
+        fraud_cases=('fraud', 'sum')
+    ).reset_index()
+    fraud_trend['fraud_rate'] = fraud_trend['fraud_cases'] / fraud_trend['transactions'] * 100
+    viz_data['fraud_trend'] = fraud_trend
+
+    # Distribución geográfica de fraudes
+    fraud_by_country = cells[cells['fraud'] > 0].groupby('merchantCountryCode', observed=True)['fraud'].sum().reset_index(name='fraud_count')
+    fraud_by_country = top_k(fraud_by_country, 'fraud_count')
+    viz_data['fraud_by_country'] = fraud_by_country
+
+    # Categorías de comercios con mayor tasa de fraude
+    merchant_fraud = cells.groupby('merchantCategoryCode', observed=True).agg(
+        transactions=('transactions', 'sum'),
+        fraud_cases=('fraud', 'sum')
+    ).reset_index()
+    merchant_fraud['fraud_rate'] = merchant_fraud['fraud_cases'] / merchant_fraud['transactions'] * 100
+    merchant_fraud = top_k(merchant_fraud, 'fraud_rate')
+    viz_data['merchant_fraud'] = merchant_fraud
+
+    # Distribución por montos de transacción
+    amount_dist = cells.groupby('amount_range', observed=False).agg(
+        transactions=('transactions', 'sum'),
+        fraud_cases=('fraud', 'sum')
+    ).reset_index()
+    amount_dist['fraud_rate'] = amount_dist['fraud_cases'] / amount_dist['transactions'] * 100
+    viz_data['amount_dist'] = amount_dist
+
+    # Indicadores de robo de identidad
+    totals = cells.drop(columns=CUBE_DIMENSIONS).sum()
+    viz_data['id_theft_indicators'] = pd.DataFrame({
+        'indicador': [name for name, _ in INDICATOR_FLAGS],
+        'casos': [totals[f'{KPI_INDICATORS[flag]}_count'] for _, flag in INDICATOR_FLAGS],
+        'tasa_fraude': [_rate(totals[f'{KPI_INDICATORS[flag]}_fraud'], totals[f'{KPI_INDICATORS[flag]}_count'])
+                        for _, flag in INDICATOR_FLAGS]
+    })
+
+    return viz_data
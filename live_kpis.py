@@ -0,0 +1,98 @@
+"""
+KPIs de ventanas deslizantes (última hora, 24 horas y 7 días) que se
+mantienen al día con cada lote de transacciones ingerido. Las medidas se
+acumulan en un buffer circular de cubetas por minuto, de modo que leer una
+ventana cuesta O(cubetas) y no depende del tamaño del dataset.
+
+El reloj de las ventanas es la transacción más reciente ingerida (tiempo del
+evento), no la hora del servidor.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from kpi_cube import row_measures, kpis_from_totals
+from config import LIVE_KPI_WINDOWS
+
+class SlidingWindowKPIs:
+    """
+    Acumuladores por minuto en un buffer circular del tamaño de la ventana
+    más larga. Cada cubeta guarda las mismas medidas que una celda del cubo
+    de agregados y se reinicia cuando la ventana la deja atrás.
+    """
+
+    def __init__(self, windows=LIVE_KPI_WINDOWS):
+        self.windows = dict(windows)
+        self.size = max(self.windows.values())
+        self.measures = None
+        self._buckets = None
+        self._head = None  # minuto absoluto de la transacción más reciente
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._buckets = None
+            self._head = None
+
+    def add(self, df):
+        """Acumula un lote de transacciones preparadas en sus cubetas por minuto"""
+        if len(df) == 0 or 'transactionDateTime' not in df.columns:
+            return
+
+        # Minuto absoluto de cada fila, cualquiera que sea la unidad de la columna
+        timestamps = df['transactionDateTime'].to_numpy().astype('datetime64[m]')
+        valid = ~np.isnat(timestamps)
+        if not valid.any():
+            return
+        minutes = timestamps.view('i8')
+
+        with self._lock:
+            head = int(minutes[valid].max()) if self._head is None else self._head
+            new_head = max(head, int(minutes[valid].max()))
+
+            # Solo se procesan las filas dentro de la ventana más larga
+            keep = valid & (minutes > new_head - self.size)
+            if not keep.all():
+                df = df[keep]
+                minutes = minutes[keep]
+            measures = row_measures(df)
+
+            if self._buckets is None:
+                self.measures = list(measures)
+                self._buckets = np.zeros((self.size, len(self.measures)), dtype=np.int64)
+
+            # Avanza el reloj y reinicia las cubetas que salen de la ventana
+            if new_head - head >= self.size:
+                self._buckets[:] = 0
+            elif new_head > head:
+                expired = np.arange(head + 1, new_head + 1) % self.size
+                self._buckets[expired] = 0
+            self._head = new_head
+
+            slots = minutes % self.size
+            for j, name in enumerate(self.measures):
+                self._buckets[:, j] += np.bincount(slots, weights=measures[name], minlength=self.size).astype(np.int64)
+
+    def totals(self, minutes):
+        """Medidas sumadas de los últimos `minutes` minutos (Series por medida)"""
+        with self._lock:
+            if self._buckets is None:
+                return None
+            slots = (self._head - np.arange(min(minutes, self.size))) % self.size
+            return pd.Series(self._buckets[slots].sum(axis=0), index=self.measures)
+
+    def window_kpis(self):
+        """KPIs de cada ventana configurada: {nombre: kpis} (None si aún no hay datos)"""
+        result = {}
+        for name, minutes in self.windows.items():
+            totals = self.totals(minutes)
+            result[name] = kpis_from_totals(totals) if totals is not None and totals['rows'] > 0 else None
+        return result
+
+    @property
+    def latest(self):
+        """Minuto de la transacción más reciente ingerida"""
+        if self._head is None:
+            return None
+        return pd.Timestamp(np.datetime64(self._head, 'm'))
@@ -0,0 +1,282 @@
+"""
+Motor alternativo que calcula los KPIs y los datos de las visualizaciones
+dentro de MongoDB con pipelines de agregación, para datasets que no caben
+en memoria. Devuelve las mismas estructuras (diccionario de KPIs y
+DataFrames de viz_data) que las funciones de data_loader.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (
+    DASHBOARD_COLUMNS,
+    INDICATOR_FLAGS,
+    CVV_MISMATCH,
+    CARD_NOT_PRESENT,
+    GEO_MISMATCH,
+    EXP_DATE_MISMATCH,
+    documents_to_frame
+)
+from heavy_hitters import top_k
+from risk_rules import mongo_score_expression
+
+# Rangos de monto equivalentes a los de pd.cut en prepare_data (límite superior incluido)
+AMOUNT_BINS = [(50, '0-50'), (200, '51-200'), (500, '201-500'), (1000, '501-1000')]
+AMOUNT_LABELS = [label for _, label in AMOUNT_BINS] + ['>1000']
+
+# Campo del documento normalizado con cada indicador de robo de identidad
+INDICATOR_FIELDS = {
+    CVV_MISMATCH: 'cvv_mismatch',
+    CARD_NOT_PRESENT: 'card_not_present',
+    GEO_MISMATCH: 'geo_mismatch',
+    EXP_DATE_MISMATCH: 'exp_date_mismatch',
+}
+
+def _text_or_unknown(field):
+    """Expresión que convierte el campo a texto y usa 'Unknown' si falta (como prepare_data)"""
+    return {'$ifNull': [{'$toString': f'${field}'}, 'Unknown']}
+
+def _normalize_stage():
+    """
+    Etapa $project que normaliza los campos igual que prepare_data y calcula
+    los cuatro indicadores de robo de identidad.
+    """
+    return {'$project': {
+        '_id': 0,
+        'ts': {'$toDate': '$transactionDateTime'},
+        'amount': '$transactionAmount',
+        'country': _text_or_unknown('merchantCountryCode'),
+        'category': {'$toString': '$merchantCategoryCode'},
+        'fraud': {'$cond': [{'$in': [{'$ifNull': ['$isFraud', False]}, [True, 1]]}, 1, 0]},
+        'has_account': {'$cond': [{'$eq': [{'$ifNull': ['$accountNumber', None]}, None]}, 0, 1]},
+        'cvv_mismatch': {'$ne': [_text_or_unknown('cardCVV'), _text_or_unknown('enteredCVV')]},
+        'card_not_present': {'$eq': [{'$ifNull': ['$cardPresent', False]}, False]},
+        'geo_mismatch': {'$ne': [_text_or_unknown('acqCountry'), _text_or_unknown('merchantCountryCode')]},
+        'exp_date_mismatch': {'$eq': [{'$ifNull': ['$expirationDateKeyInMatch', False]}, False]},
+    }}
+
+def _identity_theft_expr():
+    """(CVV | fecha exp. | país) y tarjeta no presente"""
+    return {'$and': [
+        {'$or': ['$cvv_mismatch', '$exp_date_mismatch', '$geo_mismatch']},
+        '$card_not_present'
+    ]}
+
+def _filter_conditions(start_date, end_date, countries, merchant_categories):
+    """Condiciones del $match equivalentes a los filtros de get_filtered_data"""
+    conditions = {}
+
+    if start_date and end_date:
+        # get_filtered_data compara fechas completas: el día final se incluye
+        start = pd.to_datetime(start_date).normalize().to_pydatetime()
+        end = (pd.to_datetime(end_date).normalize() + timedelta(days=1)).to_pydatetime()
+        conditions['ts'] = {'$gte': start, '$lt': end}
+
+    if countries and len(countries) > 0:
+        conditions['country'] = {'$in': [str(c) for c in countries]}
+
+    if merchant_categories and len(merchant_categories) > 0:
+        conditions['category'] = {'$in': [str(c) for c in merchant_categories]}
+
+    return conditions
+
+def build_match(start_date, end_date, countries, merchant_categories, normalize=None):
+    """
+    Traduce los filtros de get_filtered_data a las etapas iniciales del
+    pipeline: normalización de campos y $match.
+    """
+    stages = [normalize or _normalize_stage()]
+    conditions = _filter_conditions(start_date, end_date, countries, merchant_categories)
+    if conditions:
+        stages.append({'$match': conditions})
+    return stages
+
+def _sum_if(condition):
+    return {'$sum': {'$cond': [condition, 1, 0]}}
+
+def _group_counts(key):
+    """$group por `key` con transacciones (accountNumber no nulo, como count() en pandas) y fraudes"""
+    return {'$group': {
+        '_id': key,
+        'transactions': {'$sum': '$has_account'},
+        'fraud_cases': {'$sum': '$fraud'},
+    }}
+
+def _totals_group():
+    """Totales, fraudes y conteos por indicador en un solo $group"""
+    # Los totales cuentan todas las filas, como len(df) en calculate_identity_theft_kpis
+    group = {
+        '_id': None,
+        'transactions': {'$sum': 1},
+        'fraud_cases': {'$sum': '$fraud'},
+        'identity_theft': _sum_if(_identity_theft_expr()),
+    }
+    for field in INDICATOR_FIELDS.values():
+        group[f'{field}_count'] = _sum_if(f'${field}')
+        group[f'{field}_fraud'] = _sum_if({'$and': [f'${field}', {'$eq': ['$fraud', 1]}]})
+    return group
+
+def _amount_range_expr():
+    """Rango de monto con los mismos límites que pd.cut (montos <= 0 quedan fuera)"""
+    branches = [
+        {'case': {'$and': [{'$gt': ['$amount', 0]}, {'$lte': ['$amount', upper]}]}, 'then': label}
+        for upper, label in AMOUNT_BINS
+    ]
+    branches.append({'case': {'$gt': ['$amount', 1000]}, 'then': '>1000'})
+    return {'$switch': {'branches': branches, 'default': None}}
+
+def _dashboard_facets():
+    return {
+        'totals': [{'$group': _totals_group()}],
+        'fraud_trend': [
+            # Como en el groupby de pandas, las filas sin fecha no forman grupo
+            {'$match': {'ts': {'$ne': None}}},
+            _group_counts({'$dateToString': {'format': '%Y-%m-%d', 'date': '$ts'}}),
+            {'$sort': {'_id': 1}},
+        ],
+        'fraud_by_country': [
+            {'$match': {'fraud': 1}},
+            {'$group': {'_id': '$country', 'fraud_count': {'$sum': 1}}},
+            {'$sort': {'fraud_count': -1}},
+            {'$limit': 10},
+        ],
+        'merchant_fraud': [
+            {'$match': {'category': {'$ne': None}}},
+            _group_counts('$category'),
+        ],
+        'amount_dist': [
+            _group_counts(_amount_range_expr()),
+        ],
+    }
+
+def _rate(cases, total):
+    return cases / total * 100 if total > 0 else 0
+
+def _kpis_from_totals(totals):
+    """Construye el diccionario de KPIs con las mismas llaves que calculate_identity_theft_kpis"""
+    total = totals.get('transactions', 0)
+    kpis = {
+        'total_transactions': total,
+        'fraud_transactions': totals.get('fraud_cases', 0),
+    }
+    kpis['fraud_rate'] = kpis['fraud_transactions'] / total * 100 if total > 0 else np.nan
+
+    for field in INDICATOR_FIELDS.values():
+        count = totals.get(f'{field}_count', 0)
+        kpis[f'{field}_count'] = count
+        kpis[f'{field}_fraud_rate'] = _rate(totals.get(f'{field}_fraud', 0), count)
+
+    kpis['potential_identity_theft_count'] = totals.get('identity_theft', 0)
+    kpis['potential_identity_theft_rate'] = (
+        kpis['potential_identity_theft_count'] / total * 100 if total > 0 else np.nan
+    )
+    return kpis
+
+def _with_fraud_rate(df):
+    df['fraud_rate'] = df['fraud_cases'] / df['transactions'] * 100
+    return df
+
+def _viz_from_facets(facets, totals):
+    """Construye viz_data con las mismas columnas que prepare_visualization_data"""
+    viz_data = {}
+
+    fraud_trend = pd.DataFrame(facets['fraud_trend'], columns=['_id', 'transactions', 'fraud_cases'])
+    fraud_trend = fraud_trend.rename(columns={'_id': 'transaction_date'})
+    fraud_trend['transaction_date'] = pd.to_datetime(fraud_trend['transaction_date'])
+    viz_data['fraud_trend'] = _with_fraud_rate(fraud_trend)
+
+    fraud_by_country = pd.DataFrame(facets['fraud_by_country'], columns=['_id', 'fraud_count'])
+    viz_data['fraud_by_country'] = fraud_by_country.rename(columns={'_id': 'merchantCountryCode'})
+
+    merchant_fraud = pd.DataFrame(facets['merchant_fraud'], columns=['_id', 'transactions', 'fraud_cases'])
+    merchant_fraud = _with_fraud_rate(merchant_fraud.rename(columns={'_id': 'merchantCategoryCode'}))
+    viz_data['merchant_fraud'] = top_k(merchant_fraud, 'fraud_rate')
+
+    # Todos los rangos de monto aparecen aunque no tengan transacciones
+    amount_dist = pd.DataFrame(facets['amount_dist'], columns=['_id', 'transactions', 'fraud_cases'])
+    amount_dist = amount_dist.dropna(subset=['_id']).set_index('_id').reindex(AMOUNT_LABELS, fill_value=0)
+    amount_dist.index = pd.CategoricalIndex(AMOUNT_LABELS, categories=AMOUNT_LABELS, ordered=True,
+                                            name='amount_range')
+    viz_data['amount_dist'] = _with_fraud_rate(amount_dist.reset_index())
+
+    viz_data['id_theft_indicators'] = pd.DataFrame({
+        'indicador': [name for name, _ in INDICATOR_FLAGS],
+        'casos': [totals.get(f'{INDICATOR_FIELDS[flag]}_count', 0) for _, flag in INDICATOR_FLAGS],
+        'tasa_fraude': [
+            _rate(totals.get(f'{INDICATOR_FIELDS[flag]}_fraud', 0),
+                  totals.get(f'{INDICATOR_FIELDS[flag]}_count', 0))
+            for _, flag in INDICATOR_FLAGS
+        ]
+    })
+    return viz_data
+
+def compute_dashboard(collection, start_date, end_date, countries, merchant_categories):
+    """
+    Calcula los KPIs y todos los datos de las visualizaciones en una sola
+    agregación con $facet.
+
+    Returns:
+        tuple: (kpis, viz_data)
+    """
+    pipeline = build_match(start_date, end_date, countries, merchant_categories)
+    pipeline.append({'$facet': _dashboard_facets()})
+    facets = next(collection.aggregate(pipeline, allowDiskUse=True))
+
+    totals = facets['totals'][0] if facets['totals'] else {}
+    return _kpis_from_totals(totals), _viz_from_facets(facets, totals)
+
+def calculate_identity_theft_kpis(collection, start_date, end_date, countries, merchant_categories):
+    """Equivalente en MongoDB de data_loader.calculate_identity_theft_kpis"""
+    pipeline = build_match(start_date, end_date, countries, merchant_categories)
+    pipeline.append({'$group': _totals_group()})
+    totals = next(collection.aggregate(pipeline, allowDiskUse=True), {})
+    return _kpis_from_totals(totals)
+
+def prepare_visualization_data(collection, start_date, end_date, countries, merchant_categories):
+    """Equivalente en MongoDB de data_loader.prepare_visualization_data"""
+    return compute_dashboard(collection, start_date, end_date, countries, merchant_categories)[1]
+
+def load_alert_candidates(collection, start_date, end_date, countries, merchant_categories, limit, rules):
+    """
+    Trae solo las `limit` transacciones con posible robo de identidad de
+    mayor score según `rules` (ver risk_rules), ya preparadas como en la
+    carga inicial, para construir la tabla de alertas sin cargar el dataset
+    completo.
+    """
+    normalize = _normalize_stage()
+    # Se conservan los campos originales junto a los normalizados
+    normalize['$project'].update({col: 1 for col in DASHBOARD_COLUMNS})
+
+    pipeline = build_match(start_date, end_date, countries, merchant_categories, normalize=normalize)
+    pipeline += [
+        {'$match': {'$expr': _identity_theft_expr()}},
+        {'$addFields': {'risk_score': mongo_score_expression(rules)}},
+        {'$sort': {'risk_score': -1}},
+        {'$limit': int(limit)},
+    ]
+
+    return documents_to_frame(collection.aggregate(pipeline, allowDiskUse=True), capacity=limit)
+
+def filter_options(collection):
+    """
+    Rango de fechas y valores de los filtros de país y categoría, calculados
+    en MongoDB para inicializar el layout.
+    """
+    pipeline = [_normalize_stage(), {'$group': {
+        '_id': None,
+        'min_ts': {'$min': '$ts'},
+        'max_ts': {'$max': '$ts'},
+        'countries': {'$addToSet': '$country'},
+        'categories': {'$addToSet': '$category'},
+    }}]
+    result = next(collection.aggregate(pipeline, allowDiskUse=True), None)
+    if not result:
+        return {'min_date': None, 'max_date': None, 'countries': [], 'categories': []}
+
+    return {
+        'min_date': pd.Timestamp(result['min_ts']).date() if result['min_ts'] else None,
+        'max_date': pd.Timestamp(result['max_ts']).date() if result['max_ts'] else None,
+        'countries': sorted(c for c in result['countries'] if c is not None),
+        'categories': sorted(c for c in result['categories'] if c is not None),
+    }
@@ -0,0 +1,173 @@
+"""
+Percentiles de transactionAmount de las transacciones fraudulentas y
+legítimas para cualquier combinación de filtros. Cada celda (fecha, país
+del comercio, categoría) y etiqueta de fraude guarda un histograma con
+cubetas logarítmicas (al estilo de DDSketch): los conteos de las cubetas se
+suman al mezclar celdas y cada percentil tiene un error relativo acotado
+por QUANTILE_RELATIVE_ACCURACY, sin ordenar los montos en cada consulta.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from data_loader import concat_prepared
+from kpi_cube import filter_mask
+from distinct_sketch import SKETCH_DIMENSIONS
+from config import QUANTILE_RELATIVE_ACCURACY
+
+logger = logging.getLogger(__name__)
+
+# Percentiles que se reportan (en %)
+AMOUNT_PERCENTILES = [5, 25, 50, 75, 95, 99]
+
+# Etiqueta de cada valor de isFraud en los resultados
+FRAUD_LABELS = {0: 'Legítimas', 1: 'Fraudulentas'}
+
+# Cubeta de los montos cero (el logaritmo no está definido)
+_ZERO_BUCKET = np.iinfo(np.int16).min
+_KEY_RANGE = 2 ** 16
+
+def _gamma(relative_accuracy):
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+def bucket_keys(amounts, relative_accuracy=QUANTILE_RELATIVE_ACCURACY):
+    """Cubeta de cada monto: ceil(log_gamma(x)) para x > 0 y una cubeta propia para el cero"""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        keys = np.ceil(np.log(amounts) / np.log(_gamma(relative_accuracy)))
+    return np.where(amounts > 0, keys, _ZERO_BUCKET).astype(np.int16)
+
+def bucket_values(keys, relative_accuracy=QUANTILE_RELATIVE_ACCURACY):
+    """Valor representativo de cada cubeta (error relativo de a lo más `relative_accuracy`)"""
+    gamma = _gamma(relative_accuracy)
+    values = 2 * np.power(gamma, keys.astype(np.float64)) / (gamma + 1)
+    return np.where(keys == _ZERO_BUCKET, 0.0, values)
+
+def build_buckets(df, relative_accuracy=QUANTILE_RELATIVE_ACCURACY):
+    """Conteos por (celda, isFraud, cubeta) de un DataFrame preparado"""
+    amounts = df['transactionAmount'].to_numpy()
+    valid = ~np.isnan(amounts)
+    frame = pd.DataFrame({dim: df[dim][valid] for dim in SKETCH_DIMENSIONS})
+    frame['isFraud'] = df['isFraud'].to_numpy()[valid]
+    frame['bucket'] = bucket_keys(amounts[valid], relative_accuracy)
+    return (frame.groupby(SKETCH_DIMENSIONS + ['isFraud', 'bucket'], observed=True, dropna=False, sort=False)
+            .size().reset_index(name='count'))
+
+def merge_buckets(buckets):
+    """Una sola fila por (celda, isFraud, cubeta) con la suma de los conteos"""
+    return (buckets.groupby(SKETCH_DIMENSIONS + ['isFraud', 'bucket'], observed=True, dropna=False, sort=False)['count']
+            .sum().reset_index())
+
+def _percentiles(keys, counts, relative_accuracy):
+    """Percentiles de un histograma (cubetas ordenadas y sus conteos)"""
+    cumulative = np.cumsum(counts)
+    # Rango (base 0) de cada percentil, como el método 'lower' de np.percentile
+    ranks = np.floor(np.array(AMOUNT_PERCENTILES) / 100 * (cumulative[-1] - 1))
+    positions = np.searchsorted(cumulative, ranks, side='right')
+    return bucket_values(keys[positions], relative_accuracy)
+
+def _code_mask(codes, categories, values):
+    """Filas cuyos códigos categóricos corresponden a alguno de `values` (como isin)"""
+    allowed = np.zeros(len(categories) + 1, dtype=bool)
+    positions = categories.get_indexer(list(values))
+    allowed[positions[positions >= 0] + 1] = True
+    return allowed[codes.astype(np.intp) + 1]
+
+class AmountQuantiles:
+    """
+    Histogramas logarítmicos de montos por celda y etiqueta de fraude. Se
+    guardan en forma dispersa (solo las cubetas con conteo) y agregar filas
+    solo agrega conteos.
+
+    Para las consultas las cubetas se ordenan por fecha y se guardan los
+    histogramas acumulados por día: un rango de fechas sin otros filtros es
+    la resta de dos filas, y con filtros de país o categoría solo se recorren
+    las cubetas de los días del rango.
+    """
+
+    def __init__(self, df=None, buckets=None, relative_accuracy=QUANTILE_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.buckets = buckets if buckets is not None else build_buckets(df, relative_accuracy)
+        self._build_index()
+        logger.info(f"Sketches de percentiles de monto: {len(self.buckets):,} cubetas")
+
+    def _build_index(self):
+        """Cubetas ordenadas por día, claves densas e histogramas acumulados por día"""
+        buckets = self.buckets
+        # Días como enteros; NaT (el mínimo de int64) queda al inicio
+        days = buckets['transaction_date'].to_numpy().astype('datetime64[D]').view('i8')
+        order = np.argsort(days, kind='stable')
+        days = days[order]
+
+        # Claves de cubeta presentes (ordenadas, la del cero primero) y la posición de cada cubeta en ellas
+        self._keys, slots = np.unique(buckets['bucket'].to_numpy(), return_inverse=True)
+        self._slots = (buckets['isFraud'].to_numpy().astype(np.intp)[order] * len(self._keys)
+                       + slots.reshape(-1)[order])
+        self._counts = buckets['count'].to_numpy()[order]
+        self._codes = {}
+        for col in ['merchantCountryCode', 'merchantCategoryCode']:
+            values = buckets[col]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            self._codes[col] = (values.cat.codes.to_numpy()[order], values.cat.categories)
+
+        self._days, day_starts = np.unique(days, return_index=True)
+        self._day_bounds = np.append(day_starts, len(days))
+        size = len(FRAUD_LABELS) * len(self._keys)
+        day_of = np.repeat(np.arange(len(self._days)), np.diff(self._day_bounds))
+        per_day = np.bincount(day_of * size + self._slots, weights=self._counts,
+                              minlength=len(self._days) * size).reshape(len(self._days), size)
+        self._prefix = np.zeros((len(self._days) + 1, size))
+        np.cumsum(per_day, axis=0, out=self._prefix[1:])
+
+    def append(self, new_df):
+        """Nuevos histogramas con las filas de `new_df` agregadas"""
+        if len(new_df) == 0:
+            return self
+        # Las cubetas de celdas ya existentes suman sus conteos
+        buckets = merge_buckets(concat_prepared([self.buckets, build_buckets(new_df, self.relative_accuracy)]))
+        return AmountQuantiles(buckets=buckets, relative_accuracy=self.relative_accuracy)
+
+    def _day_range(self, start_date, end_date):
+        """Rango [inicio, fin) de días indexados entre `start_date` y `end_date` (inclusivas), como filter_mask"""
+        if not (start_date and end_date):
+            return 0, len(self._days)
+        lower = np.datetime64(pd.Timestamp(start_date).date(), 'D').astype(np.int64)
+        upper = np.datetime64(pd.Timestamp(end_date).date(), 'D').astype(np.int64) + 1
+        first = int(np.searchsorted(self._days, lower, side='left'))
+        last = int(np.searchsorted(self._days, upper, side='left'))
+        return first, max(first, last)
+
+    def percentiles(self, start_date, end_date, countries, merchant_categories):
+        """
+        Percentiles de monto por etiqueta de fraude para los filtros: un
+        DataFrame con la etiqueta, el número de transacciones y una columna
+        p{n} por percentil (solo las etiquetas con transacciones).
+        """
+        first, last = self._day_range(start_date, end_date)
+        filters = {col: values for col, values in [('merchantCountryCode', countries),
+                                                   ('merchantCategoryCode', merchant_categories)] if values}
+        size = len(FRAUD_LABELS) * len(self._keys)
+        if not filters:
+            histograms = self._prefix[last] - self._prefix[first]
+        else:
+            rows = slice(self._day_bounds[first], self._day_bounds[last])
+            mask = np.ones(rows.stop - rows.start, dtype=bool)
+            for col, values in filters.items():
+                codes, categories = self._codes[col]
+                mask &= _code_mask(codes[rows], categories, values)
+            histograms = np.bincount(self._slots[rows][mask], weights=self._counts[rows][mask], minlength=size)
+        histograms = histograms.reshape(len(FRAUD_LABELS), len(self._keys))
+
+        rows = []
+        for label, name in FRAUD_LABELS.items():
+            histogram = histograms[label]
+            present = np.flatnonzero(histogram)
+            if len(present) == 0:
+                continue
+            total = int(histogram[present].sum())
+            values = _percentiles(self._keys[present], histogram[present], self.relative_accuracy)
+            rows.append({'label': name, 'transactions': total,
+                         **{f'p{p}': value for p, value in zip(AMOUNT_PERCENTILES, values)}})
+        return pd.DataFrame(rows, columns=['label', 'transactions'] + [f'p{p}' for p in AMOUNT_PERCENTILES])
@@ -0,0 +1,143 @@
+"""
+Caché LRU en memoria de los resultados calculados para un estado de filtros,
+compartida por los callbacks del dashboard. El límite es el tamaño total
+estimado en bytes de las entradas, no su número.
+"""
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from config import RESULT_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+def estimate_bytes(value):
+    """Tamaño aproximado en memoria de un resultado (DataFrames, arreglos y contenedores)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+def normalize_filters(start_date, end_date, countries, merchant_categories):
+    """
+    Clave canónica de un estado de filtros: fechas sin hora (solo si vienen
+    ambas, igual que el filtro) y listas ordenadas sin repetidos.
+    """
+    if start_date and end_date:
+        dates = (pd.to_datetime(start_date).date().isoformat(), pd.to_datetime(end_date).date().isoformat())
+    else:
+        dates = (None, None)
+    return dates + (tuple(sorted(set(countries or []))), tuple(sorted(set(merchant_categories or []))))
+
+class ResultCache:
+    """
+    Caché LRU con límite de `max_bytes`. Los valores guardados se comparten
+    entre llamadas, por lo que no deben modificarse. Cada clave se calcula
+    una sola vez a la vez: los hilos que la piden mientras otro la calcula
+    esperan ese resultado.
+    """
+
+    def __init__(self, max_mb=RESULT_CACHE_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 ** 2) if max_mb else 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Valor guardado para `key` (None si no está) y lo marca como reciente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        """Indica si `key` está guardada, sin contar un acierto o fallo ni cambiar su orden"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value):
+        """Guarda `value` y expulsa las entradas menos recientes que excedan el límite"""
+        nbytes = estimate_bytes(value)
+        if not self.max_bytes or nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Retorna el valor de `key`, calculándolo con `compute()` si no está en la caché"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            # Otro hilo ya lo está calculando: se espera su resultado (o su error)
+            return future.result()
+
+        try:
+            value = compute()
+            self.put(key, value)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Contadores de la caché"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'in_progress': len(self._inflight),
+                'mb': round(self.total_bytes / 1024 ** 2, 2),
+                'max_mb': round(self.max_bytes / 1024 ** 2, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,203 @@
+"""
+Motor de reglas del score de riesgo de las alertas. Las reglas se definen
+en config.RISK_RULES o en el archivo JSON RISK_RULES_FILE, que se vuelve a
+leer cuando cambia, de modo que los pesos y umbrales pueden ajustarse sin
+reiniciar el servidor.
+
+Cada regla suma su peso cuando se cumple:
+    {'name': ..., 'indicator': 'cvv_mismatch', 'weight': 3}
+    {'name': ..., 'column': 'transactionAmount', 'op': '>=', 'value': 1000, 'weight': 1}
+
+Las reglas se evalúan como una matriz de indicadores (filas x reglas) sobre
+los arreglos de las columnas y el score es su producto con el vector de
+pesos.
+"""
+import os
+import json
+import threading
+import logging
+
+import numpy as np
+
+from data_loader import DASHBOARD_COLUMNS, KPI_INDICATORS, get_indicator_flags, identity_theft_mask
+from heavy_hitters import top_k_positions
+from config import RISK_RULES, RISK_HIGH_THRESHOLD, RISK_RULES_FILE
+
+logger = logging.getLogger(__name__)
+
+# Bit de cada indicador por su nombre en las reglas
+INDICATOR_BITS = {key: flag for flag, key in KPI_INDICATORS.items()}
+
+# Columnas que pueden usar las reglas de umbral: las numéricas y booleanas del
+# dashboard, que existen tanto en el DataFrame preparado como en el pipeline de MongoDB
+RULE_COLUMNS = [col for col, dtype in DASHBOARD_COLUMNS.items() if dtype is not object]
+
+# Operadores de las reglas de umbral: función de NumPy y operador de MongoDB
+RULE_OPERATORS = {
+    '>': (np.greater, '$gt'),
+    '>=': (np.greater_equal, '$gte'),
+    '<': (np.less, '$lt'),
+    '<=': (np.less_equal, '$lte'),
+    '==': (np.equal, '$eq'),
+    '!=': (np.not_equal, '$ne'),
+}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_rules(rules):
+    """Verifica las reglas y retorna una copia; lanza ValueError si alguna no es válida"""
+    if not isinstance(rules, list):
+        raise ValueError("Las reglas deben ser una lista")
+    validated = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"La regla {i + 1} no es un objeto")
+        name = rule.get('name', f'regla {i + 1}')
+        if not _is_number(rule.get('weight')):
+            raise ValueError(f"La regla '{name}' no tiene un peso numérico")
+        if 'indicator' in rule:
+            if rule['indicator'] not in INDICATOR_BITS:
+                raise ValueError(f"La regla '{name}' usa un indicador desconocido: {rule['indicator']}")
+        elif rule.get('op') not in RULE_OPERATORS or 'column' not in rule or 'value' not in rule:
+            raise ValueError(f"La regla '{name}' debe tener 'indicator' o 'column', 'op' y 'value'")
+        elif rule['column'] not in RULE_COLUMNS:
+            raise ValueError(f"La regla '{name}' usa una columna no permitida: {rule['column']} "
+                             f"(columnas válidas: {', '.join(RULE_COLUMNS)})")
+        elif not isinstance(rule['value'], (int, float)):
+            raise ValueError(f"La regla '{name}' no tiene un valor numérico")
+        validated.append(dict(rule, name=name))
+    return validated
+
+def validate_threshold(threshold):
+    """Verifica el umbral de alto riesgo; lanza ValueError si no es numérico"""
+    if not _is_number(threshold):
+        raise ValueError(f"El umbral de alto riesgo debe ser numérico: {threshold!r}")
+    return threshold
+
+def mongo_score_expression(rules):
+    """Expresión de MongoDB con el mismo score, sobre los campos normalizados del pipeline de alertas"""
+    terms = []
+    for rule in rules:
+        if 'indicator' in rule:
+            condition = f"${rule['indicator']}"
+        else:
+            condition = {RULE_OPERATORS[rule['op']][1]: [f"${rule['column']}", rule['value']]}
+        terms.append({'$cond': [condition, rule['weight'], 0]})
+    return {'$add': terms} if terms else 0
+
+class RiskScorer:
+    """
+    Reglas vigentes y su evaluación vectorizada. `version` cambia cada vez
+    que se recargan las reglas, para invalidar resultados calculados con
+    las anteriores.
+    """
+
+    def __init__(self, path=RISK_RULES_FILE):
+        self.path = path
+        self.version = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._apply(RISK_RULES, RISK_HIGH_THRESHOLD)
+        self._reload_if_changed()
+
+    def _apply(self, rules, high_risk_threshold):
+        """Reemplaza de una vez las reglas, su vector de pesos y el umbral"""
+        rules = validate_rules(rules)
+        high_risk_threshold = validate_threshold(high_risk_threshold)
+        weights = np.array([rule['weight'] for rule in rules], dtype=np.float64)
+        self._state = (rules, weights, high_risk_threshold)
+        self.version += 1
+
+    def _current(self):
+        self._reload_if_changed()
+        return self._state
+
+    def _reload_if_changed(self):
+        """Vuelve a leer el archivo de reglas si cambió (sin archivo se usan las de config)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns if self.path else None
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                if mtime is None:
+                    rules, threshold = RISK_RULES, RISK_HIGH_THRESHOLD
+                else:
+                    with open(self.path, encoding='utf-8') as f:
+                        config = json.load(f)
+                    if not isinstance(config, dict):
+                        raise ValueError("El archivo debe contener un objeto con 'rules' y 'high_risk_threshold'")
+                    rules = config.get('rules', RISK_RULES)
+                    threshold = config.get('high_risk_threshold', RISK_HIGH_THRESHOLD)
+                self._apply(rules, threshold)
+                logger.info(f"Reglas de riesgo cargadas ({len(rules)} reglas, umbral de alto riesgo {threshold})")
+            except Exception as e:
+                # Un archivo con errores no reemplaza las reglas vigentes y no se
+                # vuelve a intentar hasta que cambie
+                logger.error(f"No se pudieron cargar las reglas de riesgo de {self.path}: {e}")
+            self._mtime = mtime
+
+    @property
+    def rules(self):
+        return self._current()[0]
+
+    @property
+    def high_risk_threshold(self):
+        return self._current()[2]
+
+    def indicator_matrix(self, df, rows=None, rules=None):
+        """Matriz (filas x reglas) con 1 donde la regla se cumple, para las posiciones `rows` (todas si es None)"""
+        rules = self.rules if rules is None else rules
+        rows = slice(None) if rows is None else rows
+        flags = get_indicator_flags(df)[rows]
+        matrix = np.zeros((len(flags), len(rules)), dtype=np.uint8)
+        for j, rule in enumerate(rules):
+            if 'indicator' in rule:
+                matrix[:, j] = (flags & INDICATOR_BITS[rule['indicator']]) != 0
+            else:
+                compare = RULE_OPERATORS[rule['op']][0]
+                matrix[:, j] = compare(df[rule['column']].to_numpy()[rows], rule['value'])
+        return matrix
+
+    def score(self, df, rows=None):
+        """Score de riesgo de cada fila: matriz de indicadores por vector de pesos"""
+        rules, weights, _ = self._current()
+        scores = self.indicator_matrix(df, rows, rules) @ weights
+        # Con pesos enteros el score se mantiene entero, como el original
+        return scores.astype(np.int64) if np.all(weights == np.round(weights)) else scores
+
+    def rank_positions(self, df, rows=None, high_risk_only=False, limit=None):
+        """
+        Posiciones en `df` de las alertas de posible robo de identidad entre
+        `rows` (un slice o arreglo de posiciones; todas si es None) y sus
+        scores, de mayor a menor score (los empates conservan el orden del
+        dataset). Con `limit` solo se ordenan las `limit` de mayor score.
+        """
+        threshold = self.high_risk_threshold
+        flags = get_indicator_flags(df)
+        if rows is None:
+            candidates = np.flatnonzero(identity_theft_mask(flags))
+        else:
+            selected = np.arange(*rows.indices(len(df))) if isinstance(rows, slice) else np.asarray(rows)
+            candidates = selected[identity_theft_mask(flags[selected])]
+        scores = self.score(df, candidates)
+
+        if high_risk_only:
+            keep = scores > threshold
+            candidates, scores = candidates[keep], scores[keep]
+
+        order = top_k_positions(scores, len(scores) if limit is None else limit)
+        return candidates[order], scores[order]
+
+    def rank(self, df, high_risk_only=False, limit=None):
+        """Alertas de rank_positions como DataFrame con la columna risk_score"""
+        positions, scores = self.rank_positions(df, high_risk_only=high_risk_only, limit=limit)
+        alerts = df.iloc[positions].copy()
+        alerts['risk_score'] = scores
+        return alerts
@@ -0,0 +1,163 @@
+"""
+Muestra estratificada del dataset para el modo aproximado del dashboard.
+Los estratos son el día de la transacción y isFraud: las transacciones
+fraudulentas (poco frecuentes) se incluyen todas y las legítimas con una
+fracción fija y un mínimo por día. Cada fila guarda su peso (inverso de su
+probabilidad de inclusión), por lo que los conteos estimados son insesgados.
+
+Cada fila del dataset tiene un número uniforme fijo derivado de su
+posición, y entra a la muestra si es menor que su probabilidad. Así, al
+agregar filas, los días afectados se vuelven a muestrear con los conteos
+del día completo, y las filas ya elegidas se conservan mientras su
+probabilidad no baje.
+"""
+import math
+import logging
+
+import numpy as np
+
+from data_loader import (
+    compute_dashboard_data, get_indicator_flags, identity_theft_mask, concat_prepared, KPI_INDICATORS
+)
+from filter_index import FilterIndex
+from config import SAMPLE_FRACTION, SAMPLE_MIN_ROWS_PER_DAY, SAMPLE_CONFIDENCE_Z
+
+logger = logging.getLogger(__name__)
+
+# Llaves de los KPIs y columnas de viz_data que son conteos (se redondean)
+_COUNT_COLUMNS = ['transactions', 'fraud_cases', 'fraud_count', 'casos']
+
+def inclusion_probabilities(df, fraction=SAMPLE_FRACTION, min_rows_per_day=SAMPLE_MIN_ROWS_PER_DAY):
+    """
+    Probabilidad de inclusión de cada fila: 1 para las fraudulentas y, para
+    las legítimas, `fraction` o la necesaria para tener `min_rows_per_day`
+    filas de ese día.
+    """
+    is_fraud = df['isFraud'].to_numpy() != 0
+    days = df['transaction_date'].to_numpy().view('i8')
+    _, day_codes = np.unique(days, return_inverse=True)
+    legit_per_day = np.bincount(day_codes, weights=~is_fraud)
+    p_day = np.minimum(1.0, np.maximum(fraction, min_rows_per_day / np.maximum(legit_per_day, 1)))
+    return np.where(is_fraud, 1.0, p_day[day_codes])
+
+def row_uniforms(positions, seed=0):
+    """Número uniforme en [0, 1) fijo para cada posición del dataset (hash splitmix64)"""
+    mask = (1 << 64) - 1
+    z = positions.astype(np.uint64) + np.uint64(((seed + 1) * 0x9E3779B97F4A7C15) & mask)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+def _sample_rows(df, first_position, fraction, min_rows_per_day, seed):
+    """Filas de `df` (días completos; la primera es la posición `first_position` del dataset) que entran a la muestra y sus pesos"""
+    probabilities = inclusion_probabilities(df, fraction, min_rows_per_day)
+    keep = row_uniforms(np.arange(first_position, first_position + len(df)), seed) < probabilities
+    return df[keep].reset_index(drop=True), 1.0 / probabilities[keep]
+
+def wilson_interval(p, n, z=SAMPLE_CONFIDENCE_Z):
+    """Intervalo de Wilson (en %) para una proporción `p` estimada con `n` observaciones"""
+    if n <= 0:
+        return (0.0, 0.0)
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, center - half_width) * 100, min(1.0, center + half_width) * 100)
+
+def rate_intervals(sample, weights, z=SAMPLE_CONFIDENCE_Z):
+    """
+    Intervalos de confianza de las tasas de los KPIs. Las proporciones son
+    estimaciones ponderadas y el tamaño efectivo de cada denominador es el
+    de Kish, (Σw)² / Σw².
+    """
+    flags = get_indicator_flags(sample).astype(np.intp)
+    is_fraud = sample['isFraud'].to_numpy()
+    weighted = np.bincount(flags * 2 + is_fraud, weights=weights, minlength=32).reshape(16, 2)
+    squared = np.bincount(flags, weights=weights * weights, minlength=16)
+    combos = np.arange(16)
+
+    def interval(selected, numerator):
+        total = weighted[selected].sum()
+        if total <= 0:
+            return (0.0, 0.0)
+        n_effective = total * total / squared[selected].sum()
+        return wilson_interval(numerator / total, n_effective, z)
+
+    everything = np.ones(16, dtype=bool)
+    intervals = {
+        'fraud_rate': interval(everything, weighted[:, 1].sum()),
+        'potential_identity_theft_rate': interval(everything, weighted[identity_theft_mask(combos)].sum()),
+    }
+    for flag, key in KPI_INDICATORS.items():
+        selected = (combos & flag) != 0
+        intervals[f'{key}_fraud_rate'] = interval(selected, weighted[selected, 1].sum())
+    return intervals
+
+def _round_counts(kpis, viz_data):
+    """Redondea los conteos estimados a enteros"""
+    for key, value in kpis.items():
+        if key.endswith('_count') or key in ('total_transactions', 'fraud_transactions'):
+            kpis[key] = int(round(value))
+    for table in viz_data.values():
+        for col in _COUNT_COLUMNS:
+            if col in table.columns:
+                table[col] = table[col].round().astype(np.int64)
+    return kpis, viz_data
+
+class StratifiedSample:
+    """
+    Muestra ordenada por transactionDateTime con sus pesos y su propio
+    FilterIndex, de modo que los filtros se aplican igual que en el dataset.
+    """
+
+    def __init__(self, df, weights, fraction=SAMPLE_FRACTION, min_rows_per_day=SAMPLE_MIN_ROWS_PER_DAY, seed=0):
+        self.df = df
+        self.weights = weights
+        self.fraction = fraction
+        self.min_rows_per_day = min_rows_per_day
+        self.seed = seed
+        self.index = FilterIndex(df)
+
+    @classmethod
+    def build(cls, df, fraction=SAMPLE_FRACTION, min_rows_per_day=SAMPLE_MIN_ROWS_PER_DAY, seed=0):
+        """Toma la muestra de un DataFrame preparado y ordenado por fecha"""
+        rows, weights = _sample_rows(df, 0, fraction, min_rows_per_day, seed)
+        sample = cls(rows, weights, fraction, min_rows_per_day, seed)
+        logger.info(f"Muestra estratificada: {len(sample.df):,} de {len(df):,} filas")
+        return sample
+
+    def extended(self, new_df, df):
+        """
+        Nueva muestra tras agregar `new_df` al final de `df` (el dataset
+        completo, ya con las filas nuevas y sin reordenar). Los días de las
+        filas nuevas se vuelven a muestrear con sus conteos en `df`, por lo
+        que el resultado es el mismo que con build(df).
+        """
+        if len(new_df) == 0:
+            return self
+        # Los días afectados forman el final del dataset y de la muestra
+        days = df['transaction_date'].to_numpy().view('i8')
+        first_day = new_df['transaction_date'].to_numpy().view('i8').min()
+        start = int(np.searchsorted(days, first_day, side='left'))
+        keep = int(np.searchsorted(self.df['transaction_date'].to_numpy().view('i8'), first_day, side='left'))
+
+        rows, weights = _sample_rows(df.iloc[start:], start, self.fraction, self.min_rows_per_day, self.seed)
+        return StratifiedSample(concat_prepared([self.df.iloc[:keep], rows]),
+                                np.concatenate([self.weights[:keep], weights]),
+                                self.fraction, self.min_rows_per_day, self.seed)
+
+    def estimate(self, start_date, end_date, countries, merchant_categories, z=SAMPLE_CONFIDENCE_Z):
+        """
+        KPIs y datos de gráficos estimados con la muestra para los filtros.
+
+        Returns:
+            tuple: (kpis, viz_data, intervalos de las tasas, filas de la muestra seleccionadas)
+        """
+        rows = self.index.select(start_date, end_date, {
+            'merchantCountryCode': countries,
+            'merchantCategoryCode': merchant_categories,
+        })
+        sample = self.df.iloc[rows]
+        weights = self.weights[rows]
+        kpis, viz_data = _round_counts(*compute_dashboard_data(sample, weights=weights))
+        return kpis, viz_data, rate_intervals(sample, weights, z), sample
@@ -0,0 +1,55 @@
+"""
+Configuración común de las pruebas: el directorio del proyecto en el path
+y documentos sintéticos con la forma de la colección de transacciones.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COUNTRIES = ['US', 'CAN', 'MEX', 'PR', None]
+CATEGORIES = ['online_retail', 'fastfood', 'entertainment', 'food', 'rideshare', 'airline', 'hotels', 'fuel']
+
+# Estados de filtros (fechas, países, categorías) con los que se comparan los resultados
+FILTER_STATES = [
+    (None, None, None, None),
+    ('2016-03-01', '2016-06-01', ['US', 'CAN'], ['fuel', 'food']),
+    ('2016-07-15', '2016-07-15', None, None),
+    (None, None, ['MEX'], None),
+    (None, None, None, ['airline', 'hotels', 'rideshare']),
+]
+
+def make_documents(n, seed=0, start=datetime(2016, 1, 1), span=timedelta(days=365)):
+    """Documentos de transacciones aleatorios entre `start` y `start + span` (con países nulos y campos ausentes, como los reales)"""
+    minutes = max(int(span.total_seconds() // 60), 1)
+    rng = np.random.default_rng(seed)
+    documents = []
+    for _ in range(n):
+        cvv = int(rng.integers(100, 999))
+        document = {
+            'accountNumber': str(int(rng.integers(1e8, 1e8 + 2000))),
+            'customerId': str(int(rng.integers(1e8, 1e8 + 1500))),
+            'transactionDateTime': start + timedelta(minutes=int(rng.integers(0, minutes))),
+            'transactionAmount': float(round(rng.gamma(2, 80), 2)),
+            'merchantName': f"M{int(rng.integers(0, 300))}",
+            'acqCountry': COUNTRIES[int(rng.integers(0, 5))] if rng.random() < 0.2 else 'US',
+            'merchantCountryCode': COUNTRIES[int(rng.integers(0, 4))] if rng.random() < 0.2 else 'US',
+            'merchantCategoryCode': CATEGORIES[int(rng.integers(0, len(CATEGORIES)))],
+            'cardCVV': cvv,
+            'enteredCVV': cvv if rng.random() > 0.05 else int(rng.integers(100, 999)),
+            'cardPresent': bool(rng.random() < 0.5),
+            'expirationDateKeyInMatch': bool(rng.random() < 0.98),
+            'isFraud': bool(rng.random() < 0.03),
+        }
+        if rng.random() < 0.01:
+            del document['cardPresent']
+        documents.append(document)
+    return documents
+
+@pytest.fixture(scope='session')
+def documents():
+    return make_documents(3000)
@@ -0,0 +1,122 @@
+"""
+Equivalencia de compute_dashboard_data (bincount en una sola pasada) con la
+implementación anterior basada en groupby, que se conserva aquí como
+referencia. La única diferencia aceptada es el orden de los empates en los
+top-10: el kernel los deja en el orden de las categorías (como
+sort_values(kind='stable')), mientras que el sort_values por defecto de la
+referencia no garantiza ningún orden.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from data_loader import INDICATOR_FLAGS, CVV_MISMATCH, CARD_NOT_PRESENT, GEO_MISMATCH, EXP_DATE_MISMATCH
+from kpi_cube import filter_mask
+
+from conftest import FILTER_STATES, make_documents
+
+def _reference_fraud_rate(is_fraud, mask):
+    count = mask.sum()
+    return is_fraud[mask].mean() * 100 if count > 0 else 0
+
+def reference_kpis(df):
+    """calculate_identity_theft_kpis antes del kernel fusionado"""
+    kpis = {}
+    kpis['total_transactions'] = len(df)
+    kpis['fraud_transactions'] = df['isFraud'].sum()
+    kpis['fraud_rate'] = kpis['fraud_transactions'] / kpis['total_transactions'] * 100
+
+    flags = data_loader.get_indicator_flags(df)
+    is_fraud = df['isFraud'].to_numpy()
+    for key, flag in [('cvv_mismatch', CVV_MISMATCH), ('card_not_present', CARD_NOT_PRESENT),
+                      ('geo_mismatch', GEO_MISMATCH), ('exp_date_mismatch', EXP_DATE_MISMATCH)]:
+        mask = (flags & flag) != 0
+        kpis[f'{key}_count'] = mask.sum()
+        kpis[f'{key}_fraud_rate'] = _reference_fraud_rate(is_fraud, mask)
+
+    kpis['potential_identity_theft_count'] = data_loader.identity_theft_mask(flags).sum()
+    kpis['potential_identity_theft_rate'] = kpis['potential_identity_theft_count'] / kpis['total_transactions'] * 100
+    return kpis
+
+def reference_viz_data(df):
+    """prepare_visualization_data antes del kernel fusionado (con orden estable en los empates)"""
+    df = df.copy()
+    viz_data = {}
+    if 'transaction_date' not in df.columns:
+        df['transaction_date'] = pd.to_datetime(df['transactionDateTime']).dt.normalize()
+
+    fraud_trend = df.groupby('transaction_date').agg(
+        transactions=('accountNumber', 'count'),
+        fraud_cases=('isFraud', 'sum')
+    ).reset_index()
+    fraud_trend['fraud_rate'] = fraud_trend['fraud_cases'] / fraud_trend['transactions'] * 100
+    viz_data['fraud_trend'] = fraud_trend
+
+    fraud_by_country = df[df['isFraud'] == True].groupby('merchantCountryCode', observed=True).size().reset_index(name='fraud_count')
+    viz_data['fraud_by_country'] = fraud_by_country.sort_values('fraud_count', ascending=False, kind='stable').head(10)
+
+    merchant_fraud = df.groupby('merchantCategoryCode', observed=True).agg(
+        transactions=('accountNumber', 'count'),
+        fraud_cases=('isFraud', 'sum')
+    ).reset_index()
+    merchant_fraud['fraud_rate'] = merchant_fraud['fraud_cases'] / merchant_fraud['transactions'] * 100
+    viz_data['merchant_fraud'] = merchant_fraud.sort_values('fraud_rate', ascending=False, kind='stable').head(10)
+
+    if 'amount_range' not in df.columns:
+        df['amount_range'] = pd.cut(df['transactionAmount'], bins=data_loader.AMOUNT_BINS, labels=data_loader.AMOUNT_LABELS)
+    amount_dist = df.groupby('amount_range', observed=False).agg(
+        transactions=('accountNumber', 'count'),
+        fraud_cases=('isFraud', 'sum')
+    ).reset_index()
+    amount_dist['fraud_rate'] = amount_dist['fraud_cases'] / amount_dist['transactions'] * 100
+    viz_data['amount_dist'] = amount_dist
+
+    flags = data_loader.get_indicator_flags(df)
+    is_fraud = df['isFraud'].to_numpy()
+    indicator_masks = [(flags & flag) != 0 for _, flag in INDICATOR_FLAGS]
+    viz_data['id_theft_indicators'] = pd.DataFrame({
+        'indicador': [name for name, _ in INDICATOR_FLAGS],
+        'casos': [mask.sum() for mask in indicator_masks],
+        'tasa_fraude': [_reference_fraud_rate(is_fraud, mask) for mask in indicator_masks]
+    })
+    return viz_data
+
+@pytest.fixture(scope='module')
+def df(documents):
+    # Algunas filas sin accountNumber: no cuentan como transacciones en las tablas de los gráficos
+    documents = [{key: value for key, value in document.items() if key != 'accountNumber' or i % 37}
+                 for i, document in enumerate(documents)]
+    return data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents))
+
+def _assert_same_dashboard(frame):
+    before = frame.copy()
+    kpis, viz_data = data_loader.compute_dashboard_data(frame)
+    pd.testing.assert_frame_equal(frame, before)
+
+    expected_kpis = reference_kpis(frame)
+    assert set(kpis) == set(expected_kpis)
+    for key, value in expected_kpis.items():
+        assert np.isclose(kpis[key], value), key
+
+    expected_viz = reference_viz_data(frame)
+    assert set(viz_data) == set(expected_viz)
+    for key, table in expected_viz.items():
+        pd.testing.assert_frame_equal(viz_data[key].reset_index(drop=True), table.reset_index(drop=True),
+                                      check_dtype=False, obj=key)
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_kernel_matches_groupby(df, filters):
+    _assert_same_dashboard(df[filter_mask(df, *filters)])
+
+def test_kernel_matches_groupby_without_derived_columns(df):
+    _assert_same_dashboard(df.drop(columns=['transaction_date', 'amount_range']))
+
+def test_merchant_ties_keep_category_order():
+    # Pocas filas por categoría: varias categorías empatan en la tasa de fraude
+    frame = data_loader.documents_to_frame(make_documents(40, seed=3))
+    merchant_fraud = data_loader.prepare_visualization_data(frame)['merchant_fraud']
+    ordered = merchant_fraud.assign(code=merchant_fraud['merchantCategoryCode'].cat.codes)
+    assert ordered['fraud_rate'].duplicated().any()
+    expected = ordered.sort_values(['fraud_rate', 'code'], ascending=[False, True])
+    assert ordered.index.tolist() == expected.index.tolist()
@@ -0,0 +1,100 @@
+"""
+Refresco incremental: el DataStore al agregar lotes coincide con concatenar
+todo el dataset, sin alterar los DataFrames ya entregados, y DataRefresher
+(prime, initial_query, poll_once) no pierde ni duplica documentos insertados
+durante la carga inicial.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import data_loader
+from data_store import DataStore, DataRefresher
+
+from conftest import make_documents
+
+def _batches(count, rows, start=datetime(2017, 1, 1)):
+    """Lotes preparados y ordenados, cada uno posterior al anterior"""
+    return [data_loader.sort_by_transaction_time(data_loader.documents_to_frame(
+                make_documents(rows, seed=i, start=start + timedelta(hours=i), span=timedelta(minutes=50))))
+            for i in range(count)]
+
+def _with_new_category(df):
+    df = df.copy()
+    df['merchantCategoryCode'] = df['merchantCategoryCode'].cat.rename_categories(lambda category: f"{category}_nueva")
+    return df
+
+def test_append_matches_concat_and_keeps_previous_frames(documents):
+    initial = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents))
+    batches = _batches(12, 20)
+    batches[6] = _with_new_category(batches[6])
+    store = DataStore(initial)
+
+    seen = []
+    for batch in batches:
+        store.append(batch)
+        seen.append((store.df, store.df.copy()))
+
+    expected = data_loader.concat_prepared([initial] + batches)
+    pd.testing.assert_frame_equal(store.df, expected)
+    for frame, copy in seen:
+        pd.testing.assert_frame_equal(frame, copy)
+
+def test_append_out_of_order_batch_is_sorted(documents):
+    initial = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents))
+    later, earlier = _batches(1, 20)[0], _batches(1, 20, start=datetime(2016, 6, 1))[0]
+    store = DataStore(initial)
+    store.append(later)
+    store.append(earlier)
+    store.append(_batches(1, 20, start=datetime(2018, 1, 1))[0])
+
+    assert store.df['transactionDateTime'].is_monotonic_increasing
+    assert len(store.df) == len(initial) + 60
+
+def test_fraud_merchants_are_seeded_exactly_and_bound_later_batches(documents):
+    initial = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents))
+    store = DataStore(initial)
+    store.fraud_merchants.capacity = 20
+    store.set(initial)
+
+    def fraud_counts(frame):
+        return frame['merchantName'][frame['isFraud'] == 1].astype(str).value_counts()
+
+    top = store.fraud_merchants.top()
+    exact = fraud_counts(initial)
+    assert (top['error'] == 0).all()
+    assert top.set_index('key')['count'].to_dict() == exact[top['key']].to_dict()
+    assert top['count'].tolist() == exact.head(len(top)).tolist()
+
+    for batch in _batches(5, 40):
+        store.append(batch)
+    exact = fraud_counts(store.df).reindex(store.fraud_merchants.top()['key'], fill_value=0).to_numpy()
+    top = store.fraud_merchants.top()
+    assert ((top['guaranteed'] <= exact) & (exact <= top['count'])).all()
+
+def _rows(frame):
+    return Counter(zip(frame['transactionDateTime'], frame['accountNumber'].astype(str), frame['transactionAmount']))
+
+def test_refresher_neither_loses_nor_duplicates_documents():
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db.transactions
+    before, during, after = (make_documents(n, seed=seed) for n, seed in [(500, 1), (120, 2), (90, 3)])
+
+    collection.insert_many(before)
+    store = DataStore()
+    refresher = DataRefresher(store, collection, max_batch=50)
+    refresher.prime()
+    # Documentos que llegan mientras corre la carga inicial
+    collection.insert_many(during)
+    store.set(data_loader.load_data_from_collection(collection, limit=None, query=refresher.initial_query()))
+    assert len(store.df) == len(before)
+
+    collection.insert_many(after)
+    while refresher.poll_once():
+        pass
+
+    expected = _rows(data_loader.documents_to_frame(before + during + after))
+    assert _rows(store.df) == expected
+    assert refresher.poll_once() == 0
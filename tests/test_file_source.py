@@ -0,0 +1,45 @@
+"""
+Carga desde archivos: el mismo dataset en CSV y en JSON lines, leído en
+bloques pequeños, da el mismo DataFrame que la carga desde documentos, sin
+importar qué valores (o nulos) traiga cada bloque.
+"""
+import csv
+import json
+
+import pandas as pd
+
+import data_loader
+from file_source import load_data_from_files
+
+from conftest import make_documents
+
+def _documents():
+    documents = make_documents(400, seed=5)
+    # Un bloque con CVV nulos no debe leer los demás como '414.0'
+    for document in documents[:40]:
+        document['enteredCVV'] = None
+    return documents
+
+def _write(documents, tmp_path):
+    csv_path = tmp_path / 'transactions.csv'
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(data_loader.DASHBOARD_COLUMNS))
+        writer.writeheader()
+        writer.writerows(documents)
+
+    jsonl_path = tmp_path / 'transactions.jsonl'
+    with open(jsonl_path, 'w') as f:
+        for document in documents:
+            f.write(json.dumps(document, default=str) + '\n')
+    return csv_path, jsonl_path
+
+def _comparable(df):
+    return df.astype({col: str for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+def test_chunked_files_match_documents(tmp_path):
+    documents = _documents()
+    expected = _comparable(data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents)))
+
+    for path in _write(documents, tmp_path):
+        df = load_data_from_files(str(path), chunk_mb=0.004, workers=1)
+        pd.testing.assert_frame_equal(_comparable(df), expected, check_categorical=False, obj=path.name)
@@ -0,0 +1,28 @@
+"""
+KPIs de ventanas deslizantes: el resultado no depende de la unidad de
+datetime64 de transactionDateTime.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import data_loader
+from live_kpis import SlidingWindowKPIs
+
+from conftest import make_documents
+
+@pytest.mark.parametrize('unit', ['s', 'ms', 'us'])
+def test_windows_do_not_depend_on_datetime_unit(unit):
+    df = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(
+        make_documents(600, start=datetime(2016, 5, 1), span=timedelta(days=9))))
+    expected = SlidingWindowKPIs()
+    expected.add(df)
+
+    converted = df.assign(transactionDateTime=df['transactionDateTime'].astype(f'datetime64[{unit}]'))
+    live = SlidingWindowKPIs()
+    for start in range(0, len(converted), 150):
+        live.add(converted.iloc[start:start + 150])
+
+    assert live.latest == expected.latest
+    assert live.window_kpis() == expected.window_kpis()
+    assert all(kpis is not None for kpis in live.window_kpis().values())
@@ -0,0 +1,113 @@
+"""
+Equivalencia del motor 'mongo' (mongo_aggregations) con el motor 'pandas'
+para los mismos documentos y filtros. Con MONGODB_TEST_URI se usa un
+mongod real; si no, mongomock, que no implementa $toDate ni $toString: se
+quitan del pipeline y los documentos se guardan ya con fechas y CVV
+numéricos, de modo que las conversiones no cambian el resultado.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+import mongo_aggregations
+from kpi_cube import AggregateCube, filter_mask
+from risk_rules import RiskScorer, RISK_RULES
+
+from conftest import FILTER_STATES, make_documents
+
+def _strip_conversions(stage):
+    """Reemplaza {'$toDate': x} y {'$toString': x} por x"""
+    if isinstance(stage, dict):
+        if len(stage) == 1 and next(iter(stage)) in ('$toDate', '$toString'):
+            return _strip_conversions(next(iter(stage.values())))
+        return {key: _strip_conversions(value) for key, value in stage.items()}
+    if isinstance(stage, list):
+        return [_strip_conversions(value) for value in stage]
+    return stage
+
+@pytest.fixture(scope='module')
+def documents(documents):
+    """Documentos de prueba más algunos sin accountNumber, sin fecha o sin categoría"""
+    incomplete = make_documents(60, seed=7)
+    for i, document in enumerate(incomplete):
+        del document[['accountNumber', 'transactionDateTime', 'merchantCategoryCode'][i % 3]]
+    return documents + incomplete
+
+@pytest.fixture(scope='module')
+def collection(documents):
+    uri = os.environ.get('MONGODB_TEST_URI')
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+        collection = client['fraud_dashboard_test']['transactions']
+        collection.drop()
+        collection.insert_many([dict(document) for document in documents])
+        yield collection
+        collection.drop()
+        client.close()
+        return
+
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db.transactions
+    collection.insert_many([dict(document) for document in documents])
+
+    original = mongomock.collection.Collection.aggregate
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        kwargs.pop('allowDiskUse', None)
+        return original(self, _strip_conversions(pipeline), *args, **kwargs)
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(mongomock.collection.Collection, 'aggregate', aggregate)
+    yield collection
+    patch.undo()
+
+@pytest.fixture(scope='module')
+def df(collection):
+    return data_loader.sort_by_transaction_time(data_loader.load_data_from_collection(collection, limit=None))
+
+def _comparable(frame):
+    """Tabla con las categorías como texto y ordenada por su primera columna (el orden de los empates puede variar)"""
+    frame = frame.reset_index(drop=True)
+    frame = frame.astype({col: str for col in frame.columns if isinstance(frame[col].dtype, pd.CategoricalDtype)})
+    return frame.sort_values(frame.columns[0], kind='stable').reset_index(drop=True)
+
+def _assert_same_results(expected, actual):
+    expected_kpis, expected_viz = expected
+    kpis, viz_data = actual
+    assert set(kpis) == set(expected_kpis)
+    for key, value in expected_kpis.items():
+        assert np.isclose(kpis[key], value), key
+    assert set(viz_data) == set(expected_viz)
+    for key, table in expected_viz.items():
+        pd.testing.assert_frame_equal(_comparable(viz_data[key]), _comparable(table), check_dtype=False, obj=key)
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_dashboard_matches_pandas(collection, df, filters):
+    filtered = df[filter_mask(df, *filters)]
+    expected = (data_loader.calculate_identity_theft_kpis(filtered),
+                data_loader.prepare_visualization_data(filtered.copy()))
+    _assert_same_results(expected, mongo_aggregations.compute_dashboard(collection, *filters))
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_dashboard_matches_cube(collection, df, filters):
+    _assert_same_results(AggregateCube(df).dashboard(*filters), mongo_aggregations.compute_dashboard(collection, *filters))
+
+@pytest.mark.parametrize('filters', FILTER_STATES)
+def test_alert_candidates_match_pandas_ranking(collection, df, filters):
+    scorer = RiskScorer(path=None)
+    limit = 50
+    expected = scorer.rank(df[filter_mask(df, *filters)].reset_index(drop=True), limit=limit)
+    candidates = mongo_aggregations.load_alert_candidates(collection, *filters, limit=limit, rules=RISK_RULES)
+    assert len(candidates) == len(expected)
+    assert sorted(scorer.score(candidates), reverse=True) == expected['risk_score'].tolist()
+
+def test_filter_options_match_dataset(collection, df):
+    options = mongo_aggregations.filter_options(collection)
+    assert options['min_date'] == df['transaction_date'].min().date()
+    assert options['max_date'] == df['transaction_date'].max().date()
+    assert options['countries'] == sorted(df['merchantCountryCode'].dropna().astype(str).unique())
+    assert options['categories'] == sorted(df['merchantCategoryCode'].dropna().astype(str).unique())
@@ -0,0 +1,46 @@
+"""
+Percentiles de monto de AmountQuantiles: para cada estado de filtros (y
+luego de agregar lotes) coinciden con la cubeta del percentil 'lower' de
+los montos de las filas filtradas.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from kpi_cube import filter_mask
+from quantile_sketch import AmountQuantiles, AMOUNT_PERCENTILES, FRAUD_LABELS, bucket_keys, bucket_values
+
+from conftest import FILTER_STATES, make_documents
+
+@pytest.fixture(scope='module')
+def df(documents):
+    return data_loader.sort_by_transaction_time(data_loader.documents_to_frame(documents))
+
+def _expected(frame, filters):
+    frame = frame[filter_mask(frame, *filters)]
+    rows = []
+    for label, name in FRAUD_LABELS.items():
+        amounts = frame['transactionAmount'].to_numpy()[frame['isFraud'].to_numpy() == label].astype(np.float64)
+        amounts = amounts[~np.isnan(amounts)]
+        if len(amounts) == 0:
+            continue
+        values = bucket_values(bucket_keys(np.percentile(amounts, AMOUNT_PERCENTILES, method='lower')))
+        rows.append({'label': name, 'transactions': len(amounts),
+                     **{f'p{p}': value for p, value in zip(AMOUNT_PERCENTILES, values)}})
+    return pd.DataFrame(rows, columns=['label', 'transactions'] + [f'p{p}' for p in AMOUNT_PERCENTILES])
+
+@pytest.mark.parametrize('filters', FILTER_STATES + [('2016-06-01', '2016-05-01', None, None),
+                                                     (None, None, ['XX'], None)])
+def test_percentiles_match_filtered_rows(df, filters):
+    pd.testing.assert_frame_equal(AmountQuantiles(df).percentiles(*filters), _expected(df, filters))
+
+def test_percentiles_after_append(df):
+    batch = data_loader.sort_by_transaction_time(data_loader.documents_to_frame(
+        make_documents(300, seed=11, start=datetime(2016, 12, 20), span=timedelta(days=30))))
+    quantiles = AmountQuantiles(df).append(batch)
+    combined = data_loader.concat_prepared([df, batch])
+    for filters in FILTER_STATES:
+        pd.testing.assert_frame_equal(quantiles.percentiles(*filters), _expected(combined, filters))
@@ -0,0 +1,56 @@
+"""
+Muestra estratificada del modo aproximado (sampling) mantenida con el
+refresco incremental del DataStore.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from data_store import DataStore
+from sampling import StratifiedSample
+from conftest import make_documents
+from config import SAMPLE_FRACTION
+
+START = datetime(2016, 1, 1)
+DAYS = 10
+
+def _frame(n, seed, start, span):
+    return data_loader.sort_by_transaction_time(
+        data_loader.documents_to_frame(make_documents(n, seed=seed, start=start, span=span))
+    )
+
+def test_small_batches_keep_the_sample_fraction():
+    store = DataStore(_frame(30000, 0, START, timedelta(days=DAYS)))
+    initial_fraction = len(store.sample.df) / len(store.df)
+
+    # 50 lotes de 40 filas, cada uno posterior al anterior (cruzan un cambio de día)
+    batch_start = START + timedelta(days=DAYS)
+    for i in range(50):
+        store.append(_frame(40, i + 1, batch_start + timedelta(minutes=30 * i), timedelta(minutes=30)))
+
+    sample = store.sample
+    new_rows = len(store.df) - 30000
+    new_sampled = int((sample.df['transaction_date'] >= pd.Timestamp(batch_start)).sum())
+    # El mínimo por día se aplica a los días completos y no a cada lote: de las
+    # 2,000 filas nuevas (casi todas de un mismo día) solo entra una fracción
+    assert new_sampled < 0.2 * new_rows
+    assert abs(len(sample.df) / len(store.df) - initial_fraction) < 0.01
+
+    # Mantener la muestra por lotes da el mismo resultado que tomarla del dataset completo
+    rebuilt = StratifiedSample.build(store.df)
+    pd.testing.assert_frame_equal(sample.df, rebuilt.df)
+    np.testing.assert_allclose(sample.weights, rebuilt.weights)
+
+def test_batches_within_a_large_day_are_subsampled():
+    # Un solo día con muchas filas: los lotes nuevos de ese día se muestrean con la fracción del día completo
+    store = DataStore(_frame(20000, 0, START, timedelta(hours=12)))
+    for i in range(20):
+        store.append(_frame(40, i + 1, START + timedelta(hours=12, minutes=10 * i), timedelta(minutes=10)))
+
+    fraud = store.df['isFraud'].to_numpy() != 0
+    legit_sampled = int((store.sample.df['isFraud'].to_numpy() == 0).sum())
+    assert abs(legit_sampled / (~fraud).sum() - SAMPLE_FRACTION) < 0.01
+    # Los pesos reconstruyen el total de filas
+    assert abs(store.sample.weights.sum() - len(store.df)) / len(store.df) < 0.05
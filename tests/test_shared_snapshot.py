@@ -0,0 +1,120 @@
+"""
+Modo de dataset compartido (SHARED_DATASET): varios procesos que adjuntan
+el snapshot con load_snapshot(..., mmap=True) comparten las páginas de las
+columnas, por lo que la memoria total no crece con el número de workers.
+Se mide con /proc/self/smaps (solo Linux).
+"""
+import gc
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+import data_loader
+from conftest import make_documents
+
+WORKERS = 3
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists('/proc/self/smaps') or 'fork' not in multiprocessing.get_all_start_methods(),
+    reason="requiere /proc/self/smaps y procesos con fork"
+)
+
+def _memory_kb(path):
+    """
+    Memoria del proceso actual (kB): Rss, Pss y privada de los mapeos de los
+    archivos bajo `path` ('mapped_*') y memoria anónima privada ('anon_private')
+    """
+    path = os.path.realpath(path)
+    totals = {'mapped_rss': 0, 'mapped_pss': 0, 'mapped_private': 0, 'anon_private': 0}
+    mapped = False
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            parts = line.split()
+            if not parts[0].endswith(':'):
+                # Encabezado de un mapeo: rango, permisos, offset, dispositivo, inodo y ruta
+                mapped = len(parts) >= 6 and parts[5].startswith(path)
+                anonymous = len(parts) < 6 or parts[5] in ('[heap]', '[stack]')
+            elif mapped and parts[0] == 'Rss:':
+                totals['mapped_rss'] += int(parts[1])
+            elif mapped and parts[0] == 'Pss:':
+                totals['mapped_pss'] += int(parts[1])
+            elif parts[0] in ('Private_Clean:', 'Private_Dirty:'):
+                if mapped:
+                    totals['mapped_private'] += int(parts[1])
+                elif anonymous:
+                    totals['anon_private'] += int(parts[1])
+    return totals
+
+def _attach_worker(path, mmap, barrier, results):
+    """Worker: adjunta el snapshot, lee todas sus columnas y reporta cuánta memoria agregó"""
+    barrier.wait()
+    before = _memory_kb(path)
+    df = data_loader.load_snapshot(path, mmap=mmap)
+    for col in df.columns:
+        values = df[col].cat.codes.to_numpy() if hasattr(df[col], 'cat') else df[col].to_numpy()
+        if values.dtype != object:
+            values.view(np.uint8).sum()
+    # Se mide cuando todos los workers ya adjuntaron, para que las páginas se repartan entre ellos
+    barrier.wait()
+    after = _memory_kb(path)
+    results.put({key: after[key] - before[key] for key in after})
+    barrier.wait()
+
+def _run_workers(path, mmap, workers=WORKERS):
+    """Lanza `workers` procesos con fork que adjuntan el snapshot a la vez y retorna sus mediciones"""
+    # Los objetos del proceso padre quedan fuera del recolector, para que los
+    # workers no copien sus páginas (copy-on-write) al recorrerlos
+    gc.collect()
+    gc.freeze()
+    try:
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [context.Process(target=_attach_worker, args=(path, mmap, barrier, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        deltas = [results.get(timeout=120) for _ in processes]
+        for process in processes:
+            process.join(timeout=30)
+            assert process.exitcode == 0
+    finally:
+        gc.unfreeze()
+    return deltas
+
+@pytest.fixture(scope='module')
+def snapshot(tmp_path_factory):
+    """Snapshot de 1M filas y el tamaño de sus columnas (kB)"""
+    base = data_loader.documents_to_frame(make_documents(20000, seed=1), capacity=20000)
+    df = data_loader.concat_prepared([base] * 50)
+    size_kb = int(df.memory_usage(deep=False).sum()) // 1024
+    path = str(tmp_path_factory.mktemp('snapshot') / 'data')
+    data_loader.save_snapshot(df, path, {'test': 1})
+    # Una carga previa en este proceso deja hechas las importaciones diferidas
+    data_loader.load_snapshot(path, mmap=True)
+    return path, size_kb
+
+def test_mapped_workers_share_the_dataset(snapshot):
+    path, size_kb = snapshot
+    deltas = _run_workers(path, mmap=True)
+
+    for delta in deltas:
+        # Cada worker lee todas las columnas desde los archivos mapeados...
+        assert delta['mapped_rss'] > 0.8 * size_kb
+        # ...que no son memoria privada de ningún worker
+        assert delta['mapped_private'] < 0.05 * size_kb
+        # y no se copian al heap (queda solo lo que crece el asignador con los
+        # temporales de la carga, muy por debajo de una copia)
+        assert delta['anon_private'] < 0.2 * size_kb
+    # Entre todos los workers el dataset ocupa una sola copia, no una por worker
+    assert sum(delta['mapped_pss'] for delta in deltas) < 1.1 * size_kb
+
+def test_private_copies_grow_with_workers(snapshot):
+    """Control de la medición: sin mmap cada worker tiene su propia copia en el heap"""
+    path, size_kb = snapshot
+    deltas = _run_workers(path, mmap=False)
+
+    for delta in deltas:
+        assert delta['anon_private'] > 0.8 * size_kb
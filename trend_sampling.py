@@ -0,0 +1,94 @@
+"""
+Reducción de puntos del gráfico de tendencia: elige cubetas de día, semana o
+mes según el rango de fechas y un presupuesto de puntos, y opcionalmente
+submuestrea las series de línea con LTTB (largest-triangle-three-buckets),
+que conserva los picos y la forma visual de la serie.
+"""
+import numpy as np
+import pandas as pd
+
+from config import TREND_MAX_POINTS, TREND_LTTB_POINTS
+
+# Frecuencias candidatas de menor a mayor, con su duración aproximada en días
+TREND_FREQUENCIES = [
+    ('D', 1, 'Día'),
+    ('W-MON', 7, 'Semana'),
+    ('MS', 30.44, 'Mes'),
+]
+
+def choose_trend_frequency(start, end, max_points=TREND_MAX_POINTS):
+    """Frecuencia más fina cuyo número de cubetas entre `start` y `end` cabe en `max_points`"""
+    span_days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for freq, days, label in TREND_FREQUENCIES:
+        if span_days / days <= max_points:
+            return freq, label
+    return TREND_FREQUENCIES[-1][0], TREND_FREQUENCIES[-1][2]
+
+def bucket_fraud_trend(fraud_trend, max_points=TREND_MAX_POINTS):
+    """
+    Reagrupa la tendencia diaria (transaction_date, transactions, fraud_cases)
+    en la cubeta elegida para su rango. Las sumas son aditivas, por lo que
+    la tasa de fraude se recalcula sobre cada cubeta.
+
+    Returns:
+        tuple: (DataFrame con las mismas columnas, etiqueta de la cubeta)
+    """
+    if len(fraud_trend) == 0:
+        return fraud_trend, TREND_FREQUENCIES[0][2]
+
+    dates = fraud_trend['transaction_date']
+    freq, label = choose_trend_frequency(dates.min(), dates.max(), max_points)
+    if freq == 'D':
+        return fraud_trend, label
+
+    bucketed = (fraud_trend.set_index('transaction_date')[['transactions', 'fraud_cases']]
+                .resample(freq, label='left', closed='left').sum())
+    bucketed = bucketed[bucketed['transactions'] > 0].reset_index()
+    bucketed['fraud_rate'] = bucketed['fraud_cases'] / bucketed['transactions'] * 100
+    return bucketed, label
+
+def lttb_indices(x, y, threshold):
+    """
+    Posiciones de los `threshold` puntos que elige LTTB para la serie (x, y).
+    Siempre conserva el primero y el último; si la serie ya es pequeña
+    retorna todas las posiciones.
+    """
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Límites de las cubetas intermedias (sin el primer y el último punto)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Punto promedio de la cubeta siguiente (el último punto en la última cubeta)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Área del triángulo (punto anterior, candidato, promedio siguiente)
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous]) -
+                      (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+def downsample_lines(trend, columns, threshold=TREND_LTTB_POINTS, x='transaction_date'):
+    """
+    Series de línea en formato largo (x, variable, value), cada una
+    submuestreada con LTTB por separado.
+    """
+    x_values = trend[x].to_numpy()
+    x_numeric = x_values.astype('datetime64[ns]').view('i8') if np.issubdtype(x_values.dtype, np.datetime64) else x_values
+    frames = []
+    for col in columns:
+        keep = lttb_indices(x_numeric, trend[col].to_numpy(), threshold)
+        frames.append(pd.DataFrame({x: x_values[keep], 'variable': col, 'value': trend[col].to_numpy()[keep]}))
+    return pd.concat(frames, ignore_index=True)